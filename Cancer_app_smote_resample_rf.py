@@ -1,10 +1,23 @@
 import streamlit as st
+import numpy as np
 import pandas as pd
-import joblib
 import os
 # from flask import Flask, render_template, request
 from PIL import Image
-import base64
+
+from assets import asset_src, get_centered_image_html
+from codebook import answers_to_features
+from label_maps import FEATURE_LABELS, compute_bmi, raw_features_for_pipeline_input, smoke_categories
+from model_registry import registry
+from model_bundle import load_scorer
+from prediction_cache import cached_explain_one, cached_predict_proba_one, encoded_row
+from admin_panel import is_admin, render_admin_panel
+from profiling import profiler
+from scoring import risk_band_codes
+from session_store import CompactAnswers, deep_sizeof, session_registry
+from theme import apply_theme
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+from what_if import WhatIf, changed_features
 
 
 # --- Configuration de la Page ---
@@ -14,183 +27,30 @@ st.set_page_config(
     initial_sidebar_state="auto"
 )
 
+# Per-phase timings of this rerun, no-op unless FIGHTCANCER_PROFILE=1 (see profiling.py)
+timed_step = st.session_state.get("step", 0)
+timer = profiler.rerun(timed_step)
+
 # Load and display main logo
 try:
-    with open("images/Logo_fight_cancer_app.png", "rb") as image_file:
-        encoded = base64.b64encode(image_file.read()).decode()
-
+    # Resized once and served as a cacheable static file (see assets.py)
     # HTML to center image
     image_html = f"""
         <div style="display: flex; justify-content: center; align-items: center; margin-top: 10px; margin-bottom: 20px;">
-            <img src="data:image/png;base64,{encoded}" alt="Logo" width="400">
+            <img src="{asset_src('logo')}" alt="Logo" width="400">
         </div>
     """
     with st.container():
         st.markdown(image_html, unsafe_allow_html=True)
 except FileNotFoundError:
     st.error("Error: 'images/Logo_fight_cancer_app.png' not found. Please ensure the image exists in the 'images' directory.")
+timer.lap("logo")
 
 
 # --- Custom CSS for styling ---
-st.markdown(f"""
-<style>
-    :root {{
-        /* --- Base Colors & Gradients --- */
-        --app-background: linear-gradient(to bottom, #fcd2e2, #fff8cc); /* User's fixed gradient */
-        --accent-pink: #FF69B4; /* Original button pink */
-        --accent-pink-hover: #E05BA2; /* Original button hover pink */
-        --header-footer-dark: #966618; /* Dark maroon for headers/number input buttons (consistent) */
-
-        /* --- Light Mode Specific Variables --- */
-        --lm-text-primary: #1a1f2b; /* Very dark almost black for general text & labels */
-        --lm-bg-input: #fff3f0; /* Light background for inputs */
-        --lm-border-input: #ffffff; /* White border for inputs */
-        --lm-text-input: #4b2b3a; /* Dark text inside inputs */
-            
-        --lm-alert-bg: #f2e1ce;
-        --lm-alert-text: #164a45;
-        --lm-info-bg: #f2e1ce; /* Warm beige for info/alert */
-        --lm-info-text: #164a45; /* Dark teal for info/alert text */
-        --lm-success-bg: #d9ead3; /* Soft sage green for success */
-        --lm-success-text: #1a1f2b; /* Dark text for success */
-        --lm-warning-bg: #ffe0b2; /* Light apricot/peach for warning */
-        --lm-warning-text: #1a1f2b; /* Dark text for warning */           
-        --lm-button-text: white; /* Button text */
-
-        /* --- Dark Mode Specific Variables (OPTIMIZED FOR READABILITY ON LIGHT GRADIENT, NO PURE WHITE FONT) --- */
-        --dm-text-primary: #1a1f2b; /* General text (st.write) on light gradient - remains very dark */
-        --dm-label-text: #000000; /* Pure BLACK for labels on the light gradient */
-
-        --dm-bg-input: black; /* Input backgrounds are PURE BLACK */
-        --dm-border-input: #5c626b; /* Muted grey border for inputs */
-        --dm-text-input: #454444; /* Input text inside black box - now VERY LIGHT GREY (NOT WHITE) */
-        --dm-alert-bg: black; /* Alert backgrounds are PURE BLACK */
-        --dm-alert-text: #454444; /* Alert text inside black box - now VERY LIGHT GREY (NOT WHITE) */
-        --dm-button-text: white; /* Button text (on pink button, not on app background) */
-
-        /* --- General / Shared Colors --- */
-        --focus-shadow-color: rgba(255, 105, 180, 0.4); /* Pink focus shadow for inputs */
-        --radio-accent-color: #ff69b4; /* Pink accent for radio buttons */
-    }}
-
-    /* === App Background & Primary Text === */
-    .stApp {{
-        background: var(--app-background);
-        color: var(--lm-text-primary); 
-        font-size:1.1rem !important;
-    }}
-
-    /* === Header Bar Image === */
-    .header-bar img {{
-        max-height: 80px;
-    }}
-
-    /* === H1 & H2 Headings === */
-    .header-bar h1, h2 {{
-        color: var(--header-footer-dark);
-        margin: 0;
-        font-size: 2rem;
-        text-align: center;
-    }}
-
-    /* === Submit Buttons === */
-    .stButton > button, div.stFormSubmitButton > button {{
-        display: block;
-        margin: auto;
-        background-color: var(--accent-pink) !important;
-        color: white !important;
-        border-radius: 5px;
-        border: none;
-        padding: 8px 15px;
-        font-weight: bold;
-        cursor: pointer;
-    }}
-    .stButton > button p, div.stFormSubmitButton > button p {{
-        color: var(--lm-button-text) !important; font-size: 1.1rem !important; /* Apply white text directly to the paragraph */
-    }}
-    .stButton > button:hover, div.stFormSubmitButton > button:hover {{
-        background-color: var(--accent-pink-hover) !important; 
-        color: var(--lm-button-text) !important;
-    }}
-    .stButton > button:hover p, div.stFormSubmitButton > button:hover p {{
-        color: var(--lm-button-text) !important; /* Apply white text directly to the paragraph on hover */
-    }}
-
-    /* --- RETURN BUTTON STYLING (Link-style) --- */
-    /* `kind="secondary"' feature in Streamlit that helps distinguish buttons*/
-    .stButton button[kind="secondary"] {{
-        background-color: transparent !important;
-        border: none !important;
-        color: var(--accent-pink) !important;
-        padding: 0 !important;
-        margin: 0 !important;
-        text-align: left !important;
-        cursor: pointer;
-        white-space: nowrap !important; 
-    }}
-
-    /* This targets the paragraph element inside the button to style the text */
-    .stButton button[kind="secondary"] p {{
-        font-size: 1.1rem !important;
-        font-weight: normal !important;
-        color: var(--accent-pink) !important;
-        margin: 0 !important;
-    }}
-
-    .stButton button[kind="secondary"]:hover {{
-        background-color: transparent !important;
-        color: var(--accent-pink-hover) !important;
-        text-decoration: underline !important; /* Adds an underline like a real link */
-    }}
-
-    /* This ensures the paragraph text also changes color on hover. */
-    .stButton button[kind="secondary"]:hover p {{
-        color: var(--accent-pink-hover) !important;
-    }}   
-
-    /* --- FORM LABEL STYLING within form--- */
-    .stForm label, .stForm p, .stForm .st-emotion-cache-1jmve36.e1qnf0wv3 {{ 
-        color: #000000 !important; 
-        font-size: 1rem !important;
-    }}
-
-    /* Ensure selectbox, radio, slider text is also readable */
-    .st-emotion-cache-1jmve36.e1qnf0wv3, .st-emotion-cache-12qu8x0.eqr7sfq3, .st-emotion-cache-1w0rc60.e1gfzcvj1 {{
-        color: #1a1f2b !important; 
-    }}
-    
-    /* Input text color */
-    .st-emotion-cache-1c7y2gy.e1qnf0wv3, .st-emotion-cache-1jmve36.e1qnf0wv3 {{ 
-        color: #1a1f2b !important; 
-    }}
-
-    /* Specifically target radio button options for readability */
-    div[data-testid="stRadio"] label span {{
-        color: #1a1f2b !important; 
-    }}
-    /* Specifically target selectbox options for readability */
-    div[data-testid="stSelectbox"] div.st-emotion-cache-nahz7x.ezrtsby2 span, /* Main displayed value */
-    div[data-testid="stSelectbox"] div[role="listbox"] div.st-emotion-cache-1jmve36.e1qnf0wv3 {{ 
-        color: #1a1f2b !important; 
-    }}
-
-    /* Ensure text within st.markdown is readable (personal response) */
-    .st-emotion-cache-ue6h4q.e1nzilhr2 p, /* General paragraph text for st.markdown */
-    .st-emotion-cache-ue6h4q.e1nzilhr2 div {{
-        color: #1a1f2b !important; 
-    }}
-    /* --- ALERT/SUCCESS/WARNING MESSAGE STYLING --- */
-    /* Personalized Result Messages (st.success, st.warning, st.error background) */
-    div[data-testid="stAlert"] > div:first-child  {{
-        background-color: transparent;
-        color: #966618; 
-        border-radius: 10px;
-        padding: 15px;
-        font-size: 1.3rem;
-        border: 2px solid #966618;;
-    }}
-</style>
-""", unsafe_allow_html=True)
+# Compiled once per process from theme.css and sent once per session (see theme.py)
+apply_theme()
+timer.lap("css")
 
 # --- Header with Logo and Title ---
 st.markdown('<div class="header-bar"> <h1>Votre risque de cancer en quelques questions</h1> </div>', unsafe_allow_html=True)
@@ -200,50 +60,62 @@ st.markdown("""
     Ce questionnaire vise à estimer votre **risque potentiel de développer un cancer** en se basant sur divers facteurs de mode de vie et de santé. <br> <br>
     **⚠️ Ce n'est pas un diagnostic médical.** Pour toute préoccupation de santé, veuillez consulter un professionnel.
 """, unsafe_allow_html=True)
+timer.lap("header")
 
 
-raw_features_for_pipeline_input = [
-    'SmokeNow', 'GeneralHealth', 'Nervous',
-    'IncomeRanges', 'Education', 'Fruit2', 'Vegetables2', 'CutSkipMeals2',
-    'DiffPayMedBills',
-    'BirthSex', 
-    'Birthcountry', 
-    'BMI', 'Age', 'SleepWeekdayHr', 'TimesSunburned', 
-    'TimesStrengthTraining', 'ChildrenInHH', 'TotalHousehold', 'Drink_nb_PerMonth',
-    'MedConditions_Diabetes', 'MedConditions_HighBP', 'MedConditions_HeartCondition',
-    'MedConditions_LungDisease', 'MedConditions_Depression', 'FamilyEverHadCancer2',
-    'HealthLimits_Pain'
-]
 
 pipeline = None # Initialize pipeline to None
+scorer = None # Fast path (lookup-table preprocessing + compiled forest), see scoring.py
 model_output_features = raw_features_for_pipeline_input # Default value
 
 try:
-    pipeline = joblib.load("modele_cancer_resample_rf.pkl")
-    print("✅ Pipeline loaded successfully")
-    with open("data/features_cancer_resample_rf.txt", "r") as f:
-        model_output_features = [line.strip() for line in f.readlines()]
+    # Memory-mapped model bundle when present, otherwise derived from the pickle (see model_bundle.py)
+    scorer = load_scorer()
+    model_output_features = scorer.plan.output_names
 except Exception as e:
-    st.error(f"❌ Erreur lors du chargement du pipeline : {e}")
-    
-    class MockPipeline:
-        def predict(self, X): return [0] * len(X)
-        def predict_proba(self, X): return [[0.9, 0.1] for _ in range(X.shape[0])]
-    
-    pipeline = MockPipeline()
-
-# Secure initialization of session states
-if "step" not in st.session_state:
-    st.session_state.step = 0
-if "inputs" not in st.session_state: # Ensure inputs dictionary is always there
-    st.session_state.inputs = {}
-if "form_submitted" not in st.session_state:
-    st.session_state.form_submitted = False
+    # The sklearn pipeline still works, only slower
+    print(f"⚠️ Fast scoring path unavailable, falling back to pipeline.predict_proba: {e}")
+
+if scorer is None:
+    try:
+        # Loaded once per process and shared by every session (see model_registry.py)
+        pipeline, loaded_features = registry.get()
+        if loaded_features:
+            model_output_features = loaded_features
+    except Exception as e:
+        st.error(f"❌ Erreur lors du chargement du pipeline : {e}")
+
+        class MockPipeline:
+            def predict(self, X): return [0] * len(X)
+            def predict_proba(self, X): return [[0.9, 0.1] for _ in range(X.shape[0])]
+
+        pipeline = MockPipeline()
+timer.lap("model_load")
+
+# --- Functions to rerun only the questionnaire fragment ---
+def in_fragment_rerun():
+    # True when only the fragment runs (one of its widgets, or st.rerun(scope="fragment"))
+    ctx = get_script_run_ctx()
+    return ctx is not None and bool(ctx.fragment_ids_this_run)
+
+def rerun_questionnaire():
+    # A fragment-scoped rerun is not allowed while the whole script runs (first visit)
+    st.rerun(scope="fragment" if in_fragment_rerun() else "app")
 
 # --- Function to handle going back a step ---
 def go_back():
     st.session_state.step -= 1
-    st.rerun()
+    rerun_questionnaire()
+
+# --- Function to list the answers that moved the score (result page) ---
+def format_points(contribution):
+    # Calibrated contributions can be below one point: keep a decimal there
+    points = contribution * 100
+    return f"{points:+.0f}" if abs(points) >= 1 else f"{points:+.1f}"
+
+def describe_factors(factors):
+    parts = [f"{FEATURE_LABELS.get(feature, feature)} ({format_points(contribution)} pts)" for feature, contribution in factors]
+    return parts[0] if len(parts) == 1 else ", ".join(parts[:-1]) + " et " + parts[-1]
 
 # --- Function to add the return button ---
 def add_return_button():
@@ -257,360 +129,346 @@ def add_return_button():
                 if st.button("⬅ Retour", key=button_key, help="Retour à la page précédente"):
                     go_back()
 
-# --- HTML PROGRESS BAR CODE ---
-if st.session_state.step < 4:
-    current_step = st.session_state.step + 1
-    total_steps = 4
-    progress_percentage = round((current_step / total_steps) * 100)
-    
-    # Define the colors from your app's style
-    track_color = "#edebeb"
-    fill_gradient = "linear-gradient(90deg, #c6f1c6 0%, #f7c6c7 100%)" 
-
-    st.markdown(f"""
-        <div style="margin-top: 1.5rem; color: #1a1f2b; font-weight: 600;">
-            Progression du questionnaire: étape {current_step} / 4
-        </div>
-        <div style="background-color: {track_color}; border-radius: 20px; height: 10px; width: 100%; margin-bottom: 1rem;">
-            <div style="background: {fill_gradient}; border-radius: 20px; height: 100%; width: {progress_percentage}%;"></div>
-        </div>
-    """, unsafe_allow_html=True)
-
-# --- Form Steps ---
-if st.session_state.step == 0:
-    with st.form("step_0_form"):
-        st.markdown("<h2>Un peu de vous</h2>", unsafe_allow_html=True)
-
-        BirthSex = st.radio("Quel est votre sexe de naissance ?", ["Femme", "Homme", "Ne souhaite pas répondre"])
-
-        col_age, col_bmi = st.columns(2)
-        with col_age:
-            prenom = st.text_input("Quel est votre prénom ou surnom ?", help="facultatif, il sera utilisé pour personnaliser les résultats")
-            poids = st.number_input("Quel est votre poids (kg) ?", 30.0, 200.0, 70.0, step=0.1, format="%.1f")
-            
-        with col_bmi:
-            Age = st.number_input("Quel est votre âge ?", 18, 120, 30)
-            taille_m = st.number_input("Quelle est votre taille (en mètres) ?", 1.0, 2.4, 1.70)
-        st.markdown("<br>", unsafe_allow_html=True)
-        submit_step0 = st.form_submit_button("Continuer")
-
-        if submit_step0:
+# --- Questionnaire steps and result page ---
+# A fragment: form submits, "⬅ Retour" and the what-if widgets rerun only this
+# function, not the logo, stylesheet, header, model loading and footer around it.
+@st.fragment
+def questionnaire(timer):
+    fragment_rerun = in_fragment_rerun()
+    if fragment_rerun:
+        # The top of the script did not run: time this rerun on its own
+        timer = profiler.rerun(st.session_state.get("step", 0))
+    timed_step = st.session_state.get("step", 0)
+
+    # Secure initialization of session states
+    if "step" not in st.session_state:
+        st.session_state.step = 0
+    if "inputs" not in st.session_state: # Ensure inputs dictionary is always there
+        # Answers stored as int16 codes, read back as labels (see session_store.py)
+        st.session_state.inputs = CompactAnswers()
+    elif not isinstance(st.session_state.inputs, CompactAnswers):
+        st.session_state.inputs = CompactAnswers(st.session_state.inputs)
+    if st.session_state.inputs.evicted:
+        # Answers dropped after a long inactivity: start over
+        st.session_state.step = 0
+        st.session_state.inputs = CompactAnswers()
+        st.info("Votre session est restée inactive trop longtemps, merci de recommencer le questionnaire.")
+    if "form_submitted" not in st.session_state:
+        st.session_state.form_submitted = False
+
+    # Activity and state size of this session, for idle eviction and the operator panel
+    run_ctx = get_script_run_ctx()
+    if run_ctx is not None:
+        session_registry.track(run_ctx.session_id, st.session_state.inputs, st.session_state.step,
+                               deep_sizeof(st.session_state.to_dict()))
+
+    # --- HTML PROGRESS BAR CODE ---
+    if st.session_state.step < 4:
+        current_step = st.session_state.step + 1
+        total_steps = 4
+        progress_percentage = round((current_step / total_steps) * 100)
+
+        # Colors and layout in theme.css
+        st.markdown(f"""
+            <div class="step-progress-label">Progression du questionnaire: étape {current_step} / 4</div>
+            <div class="step-progress-track"><div class="step-progress-fill" style="width: {progress_percentage}%;"></div></div>
+        """, unsafe_allow_html=True)
+
+    timer.lap("progress_bar")
+
+    # --- Form Steps ---
+    if st.session_state.step == 0:
+        with st.form("step_0_form"):
+            st.markdown("<h2>Un peu de vous</h2>", unsafe_allow_html=True)
+
+            BirthSex = st.radio("Quel est votre sexe de naissance ?", ["Femme", "Homme", "Ne souhaite pas répondre"])
+
+            col_age, col_bmi = st.columns(2)
+            with col_age:
+                prenom = st.text_input("Quel est votre prénom ou surnom ?", help="facultatif, il sera utilisé pour personnaliser les résultats")
+                poids = st.number_input("Quel est votre poids (kg) ?", 30.0, 200.0, 70.0, step=0.1, format="%.1f")
+
+            with col_bmi:
+                Age = st.number_input("Quel est votre âge ?", 18, 120, 30)
+                taille_m = st.number_input("Quelle est votre taille (en mètres) ?", 1.0, 2.4, 1.70)
+            st.markdown("<br>", unsafe_allow_html=True)
+            submit_step0 = st.form_submit_button("Continuer")
+
+            if submit_step0:
+                # Store inputs for this step
+                st.session_state.inputs.update({
+                    "BirthSex": BirthSex,
+                    "prenom": prenom,
+                    "Age": Age,
+                    "poids": poids,
+                    "taille_m": taille_m
+                })
+                st.session_state.step = 1 # Move to next step
+                rerun_questionnaire() # Rerun to display the next step
+
+    elif st.session_state.step == 1:
+
+        with st.form("step_1_form"):                  
+            st.markdown("<h2> Votre mode de vie </h2>", unsafe_allow_html=True)
+            col_smoke, col_alcohol = st.columns(2)
+            with col_smoke:
+                fumeur = st.selectbox("Fumez-vous actuellement ?", ["Jamais", "Quelques fois", "Tous les jours"], help="Indiquez si vous êtes un fumeur actuel.")
+            with col_alcohol:
+                alcohol = st.number_input("Nombre de verres d'alcool par mois ?", 0, 500, 7, help="Estimation du nombre de verres standards d'alcool consommés par mois.")
+
+            col_sun, col_sleep = st.columns(2)
+            with col_sun:
+                soleil = st.number_input("Les 12 derniers mois, avez-vous eu des coups de soleil ? Si oui, combien ?", 0, 300, 7, help="Le nombre de fois où votre peau a été brûlée par le soleil, causant rougeur et douleur.")
+            with col_sleep:
+                sommeil_moy = st.number_input("Durée moyenne de sommeil par jour (en heures) ?", 0, 24, 7, help="Nombre moyen d'heures de sommeil par 24 heures")
+            st.markdown("<br>", unsafe_allow_html=True)
+
+            st.markdown("<h2>Nutrition et Activités</h2>", unsafe_allow_html=True)
+            col_fruit, col_veg, col_sport = st.columns(3)
+            with col_fruit:
+                fruits = st.select_slider("Combien de portions de fruits mangez-vous par jour ?", [
+                    "0", "1/2 portion ou moins", "1/2 à 1 portion", "1 à 2 portions",
+                    "2 à 3 portions", "3 à 4 portions", "plus de 4"], help="Une portion correspond à une pomme moyenne, une banane, ou une tasse de petits fruits.")
+            with col_veg:
+                legumes = st.select_slider("Combien de portions de légumes mangez-vous par jour ?", [
+                    "0", "1/2 portion ou moins", "1/2 à 1 portion", "1 à 2 portions",
+                    "2 à 3 portions", "3 à 4 portions", "plus de 4"], help="Une portion correspond à une tasse de légumes verts à feuilles ou une demi-tasse de légumes coupés.")
+            with col_sport:
+                sport = st.select_slider("Combien de jours par semaine faites-vous de l'exercice intense ?", ["0", "1", "2", "3", "4", "5", "6", "7"], help="Nombre de séance de cardio, renforcement musculaire par semaine.")
+
+            submit_step1 = st.form_submit_button("Continuer")
+        add_return_button()   
+
+        if submit_step1:
             # Store inputs for this step
             st.session_state.inputs.update({
-                "BirthSex": BirthSex,
-                "prenom": prenom,
-                "Age": Age,
-                "poids": poids,
-                "taille_m": taille_m
+                "fumeur": fumeur,
+                "alcohol": alcohol,
+                "soleil": soleil,
+                "sommeil_moy": sommeil_moy,
+                "fruits": fruits,
+                "legumes": legumes,
+                 "sport": sport
             })
-            st.session_state.step = 1 # Move to next step
-            st.rerun() # Rerun to display the next step
- 
-elif st.session_state.step == 1:
-           
-    with st.form("step_1_form"):                  
-        st.markdown("<h2> Votre mode de vie </h2>", unsafe_allow_html=True)
-        col_smoke, col_alcohol = st.columns(2)
-        with col_smoke:
-            fumeur = st.selectbox("Fumez-vous actuellement ?", ["Jamais", "Quelques fois", "Tous les jours"], help="Indiquez si vous êtes un fumeur actuel.")
-        with col_alcohol:
-            alcohol = st.number_input("Nombre de verres d'alcool par mois ?", 0, 500, 7, help="Estimation du nombre de verres standards d'alcool consommés par mois.")
-        
-        col_sun, col_sleep = st.columns(2)
-        with col_sun:
-            soleil = st.number_input("Les 12 derniers mois, avez-vous eu des coups de soleil ? Si oui, combien ?", 0, 300, 7, help="Le nombre de fois où votre peau a été brûlée par le soleil, causant rougeur et douleur.")
-        with col_sleep:
-            sommeil_moy = st.number_input("Durée moyenne de sommeil par jour (en heures) ?", 0, 24, 7, help="Nombre moyen d'heures de sommeil par 24 heures")
-        st.markdown("<br>", unsafe_allow_html=True)
-
-        st.markdown("<h2>Nutrition et Activités</h2>", unsafe_allow_html=True)
-        col_fruit, col_veg, col_sport = st.columns(3)
-        with col_fruit:
-            fruits = st.select_slider("Combien de portions de fruits mangez-vous par jour ?", [
-                "0", "1/2 portion ou moins", "1/2 à 1 portion", "1 à 2 portions",
-                "2 à 3 portions", "3 à 4 portions", "plus de 4"], help="Une portion correspond à une pomme moyenne, une banane, ou une tasse de petits fruits.")
-        with col_veg:
-            legumes = st.select_slider("Combien de portions de légumes mangez-vous par jour ?", [
-                "0", "1/2 portion ou moins", "1/2 à 1 portion", "1 à 2 portions",
-                "2 à 3 portions", "3 à 4 portions", "plus de 4"], help="Une portion correspond à une tasse de légumes verts à feuilles ou une demi-tasse de légumes coupés.")
-        with col_sport:
-            sport = st.select_slider("Combien de jours par semaine faites-vous de l'exercice intense ?", ["0", "1", "2", "3", "4", "5", "6", "7"], help="Nombre de séance de cardio, renforcement musculaire par semaine.")
-
-        submit_step1 = st.form_submit_button("Continuer")
-    add_return_button()   
-
-    if submit_step1:
-        # Store inputs for this step
-        st.session_state.inputs.update({
-            "fumeur": fumeur,
-            "alcohol": alcohol,
-            "soleil": soleil,
-            "sommeil_moy": sommeil_moy,
-            "fruits": fruits,
-            "legumes": legumes,
-             "sport": sport
-        })
-
-        st.session_state.step = 2 # Move to next step
-        st.rerun() # Rerun to display the next step
-
-
-elif st.session_state.step == 2:
-           
-    with st.form("step_2_form"):
-        st.markdown("<h2>Votre santé</h2>", unsafe_allow_html=True)
-        col_health1, col_health2, col_health3 = st.columns(3)
-        with col_health1:
-            diabete = st.radio("Avez-vous du diabète ?", ["Oui", "Non"])
-            cardiaque = st.radio("Avez-vous des problèmes cardiaques ?", ["Oui", "Non"])
-            
-        with col_health2:
-            hypertension = st.radio("Avez-vous de l'hypertension ?", ["Oui", "Non"])
-            poumon = st.radio("Avez-vous des problèmes pulmonaires ?", ["Oui", "Non"])
-        with col_health3:
-            depression = st.radio("Souffrez-vous de dépression ?", ["Oui", "Non"])
-            douleur = st.radio("Souffrez-vous de douleur chronique ?", ["Oui", "Non"])
-        FamilyEverHadCancer2=st.radio("L’un de vos parents biologiques au premier ou au deuxième degré (parents, frères ou sœurs, enfants, grands-parents, oncles ou tantes, neveux ou nièces) a-t-il déjà eu un cancer ?", ["Oui", "Non"])
-        nervous = st.selectbox("Quel est votre niveau de stress ?", [
-                "Très faible, je suis relax", "Faible, quelques fois",
-                "Modéré, sous pression la moitié du temps", "Élevé, stressé(e) tous les jours"])
-        Sante_general = st.selectbox("Comment évaluez-vous votre santé générale ?", ["Faible", "Moyen", "Bon", "Très bon : On va danser ce soir ?", "Excellent : Je pète la forme !"])
-        st.markdown("<br>", unsafe_allow_html=True)      
-        submit_step2 = st.form_submit_button("Continuer")
-    add_return_button()   
-
-    if submit_step2:
-        # Store inputs for this step
-        st.session_state.inputs.update({
-            "diabete": diabete,
-            "cardiaque": cardiaque,
-            "hypertension": hypertension,
-            "poumon": poumon,
-            "depression": depression,
-            "nervous": nervous,
-            "douleur": douleur,
-            "Sante_general": Sante_general,
-            "FamilyEverHadCancer2": FamilyEverHadCancer2
-        })
-        st.session_state.step = 3 # Move to next step
-        st.rerun() # Rerun to display the next step
-
-elif st.session_state.step == 3:
-    with st.form("step_3_form"): 
-        st.markdown("<h2>Home, sweet home </h2>", unsafe_allow_html=True)
-        revenu = st.select_slider("Quel est votre revenu annuel net approximatif ?", [
-            " 0 à 730€ mensuel", "730€ à 1099€ mensuel", "1100€ à 1469€ mensuel",
-            "1470€ à 2569€ mensuel", "2570€ à 3669€ mensuel", "3670 à 5499€ mensuel",
-            "5500€ à 7339€ mensuel", "7340€ à 14669€ mensuel", "14670€ mensuel et plus"], help="Veuillez sélectionner la tranche qui correspond le mieux à votre revenu annuel net.")
-        etude = st.select_slider("Quel est votre niveau d'études le plus élevé atteint ?", [
-            "Primaire", "Collège / brevet", "Lycée / BAC", "Universitaire : BTS / DUT / filière technique",
-            "Universitaire : Licence / Maîtrise / DEUG", "Universitaire : Master / DEA / DESS",
-            "Doctorat ou plus"], help="Votre plus haut diplôme ou niveau de scolarité atteint.")
-        
-        col_children, col_household = st.columns(2)
-        with col_children:
-            enfants = st.number_input("Combien d'enfants avez-vous?", 0, 30, 1)
-        with col_household:
-            foyer = st.number_input("Combien de personnes vivent avec vous?", 0, 30, 1, help="Adultes, enfants et vous compris")
-
-        Diff_financiere = st.selectbox("Avez-vous des difficultés à payer vos factures médicales ?", ["Jamais", "Un peu", "Souvent"], help="Indiquez la fréquence de vos difficultés à couvrir les frais médicaux.")
-        Skip_meal = st.selectbox("Avez-vous déjà sauté des repas en raison de difficultés financières au cours des 12 derniers mois ?", ["Jamais", "Un peu", "Souvent"], help="Indiquez si vous avez dû sauter des repas en raison de contraintes financières.")
-        ethnie = st.selectbox("Quelle est votre origine ethnique ?", [
-            "Blanc", "Noir Africain ou Noir Americain", "Indien Américain, Américain du nord",
-            "Indien d'Asie", "Chinois", "Philippin", "Japonais", "Coréen", "Vietnamien",
-            "Autre Asiatique", "Autre île du Pacifique", "Autre origine"], help="Cette information est utilisée à des fins statistiques et d'amélioration du modèle.")
-        st.markdown("<br>", unsafe_allow_html=True)
-        submit = st.form_submit_button("Calculer")
-    add_return_button()   
-
-    if submit:
-            # Store inputs for this step (all remaining inputs)
+
+            st.session_state.step = 2 # Move to next step
+            rerun_questionnaire() # Rerun to display the next step
+
+
+    elif st.session_state.step == 2:
+
+        with st.form("step_2_form"):
+            st.markdown("<h2>Votre santé</h2>", unsafe_allow_html=True)
+            col_health1, col_health2, col_health3 = st.columns(3)
+            with col_health1:
+                diabete = st.radio("Avez-vous du diabète ?", ["Oui", "Non"])
+                cardiaque = st.radio("Avez-vous des problèmes cardiaques ?", ["Oui", "Non"])
+
+            with col_health2:
+                hypertension = st.radio("Avez-vous de l'hypertension ?", ["Oui", "Non"])
+                poumon = st.radio("Avez-vous des problèmes pulmonaires ?", ["Oui", "Non"])
+            with col_health3:
+                depression = st.radio("Souffrez-vous de dépression ?", ["Oui", "Non"])
+                douleur = st.radio("Souffrez-vous de douleur chronique ?", ["Oui", "Non"])
+            FamilyEverHadCancer2=st.radio("L’un de vos parents biologiques au premier ou au deuxième degré (parents, frères ou sœurs, enfants, grands-parents, oncles ou tantes, neveux ou nièces) a-t-il déjà eu un cancer ?", ["Oui", "Non"])
+            nervous = st.selectbox("Quel est votre niveau de stress ?", [
+                    "Très faible, je suis relax", "Faible, quelques fois",
+                    "Modéré, sous pression la moitié du temps", "Élevé, stressé(e) tous les jours"])
+            Sante_general = st.selectbox("Comment évaluez-vous votre santé générale ?", ["Faible", "Moyen", "Bon", "Très bon : On va danser ce soir ?", "Excellent : Je pète la forme !"])
+            st.markdown("<br>", unsafe_allow_html=True)      
+            submit_step2 = st.form_submit_button("Continuer")
+        add_return_button()   
+
+        if submit_step2:
+            # Store inputs for this step
             st.session_state.inputs.update({
-                "revenu": revenu,
-                "etude": etude,
-                "enfants": enfants,
-                "foyer": foyer,
-                "Diff_financiere": Diff_financiere,
-                "Skip_meal": Skip_meal,
-                "ethnie": ethnie
+                "diabete": diabete,
+                "cardiaque": cardiaque,
+                "hypertension": hypertension,
+                "poumon": poumon,
+                "depression": depression,
+                "nervous": nervous,
+                "douleur": douleur,
+                "Sante_general": Sante_general,
+                "FamilyEverHadCancer2": FamilyEverHadCancer2
             })
-            # Combine all stored inputs (from all steps) for final processing
-            #st.session_state.form_submitted = True
-            st.session_state.step = 4 # Move to next step
-            st.rerun() 
-
-# --- Display Results ---
-elif st.session_state.step == 4:  
-#if st.session_state.form_submitted:
-    data = st.session_state.inputs
-    imc = round(data["poids"] / (data["taille_m"] ** 2), 2) if data["taille_m"] > 0 else 0.0
-    nom = data["prenom"].strip() or "Cher utilisateur" # More professional default
-    BirthSex_map = {"Ne souhaite pas répondre": 0, "Femme": 1, "Homme": 2}
-    fumeur_num = {"Jamais": 0, "Quelques fois": 1, "Tous les jours": 2}
-    stress_map = {"Très faible, je suis relax": 0, "Faible, quelques fois": 1, "Modéré, sous pression la moitié du temps": 2, "Élevé, stressé(e) tous les jours": 3}
-    revenu_map = {
-        " 0 à 730€ mensuel": 1, "730€ à 1099€ mensuel": 2, "1100€ à 1469€ mensuel": 3,
-        "1470€ à 2569€ mensuel": 4, "2570€ à 3669€ mensuel": 5, "3670 à 5499€ mensuel": 6,
-        "5500€ à 7339€ mensuel": 7, "7340€ à 14669€ mensuel": 8, "14670€ mensuel et plus": 9
-    }
-    etude_map = {
-        "Primaire": 1, "Collège / brevet": 2, "Lycée / BAC": 3, "Universitaire : BTS / DUT / filière technique": 4,
-        "Universitaire : Licence / Maîtrise / DEUG": 5, "Universitaire : Master / DEA / DESS": 6,
-        "Doctorat ou plus": 7
-    }
-    bool_map = {"Oui": 1, "Non": 0}
-    sante_general_map = {"Faible": 0, "Moyen": 1, "Bon": 2, "Très bon : On va danser ce soir ?": 3, "Excellent : Je pète la forme !": 4}
-    fruits_map = {"0": 0, "1/2 portion ou moins": 1, "1/2 à 1 portion": 2, "1 à 2 portions": 3,
-                  "2 à 3 portions": 4, "3 à 4 portions": 5, "plus de 4": 6}
-    legumes_map = fruits_map
-    diff_map = {"Jamais": 0, "Un peu": 1, "Souvent": 2}
-    ethnie_map = { # change english to french 
-        "Blanc": "White", "Noir Africain ou Noir Americain": "Black", "Indien Américain, Américain du nord": "AmerInd",
-        "Indien d'Asie": "AsInd", "Chinois": "Chinese", "Philippin": "Filipino", "Japonais": "Japanese",
-        "Coréen": "Korean", "Vietnamien": "Vietnamese", "Autre Asiatique": "OthAsian",
-        "Autre île du Pacifique": "OthPacIsl", "Autre origine": "Other"
-    }
-
-    input_data_for_pipeline = {
-        "Age": data["Age"],
-        "BMI": imc,
-        "SmokeNow": fumeur_num[data["fumeur"]],
-        "BirthSex": BirthSex_map[data["BirthSex"]],
-        "SleepWeekdayHr": data["sommeil_moy"],
-        "Nervous": stress_map[data["nervous"]],
-        "IncomeRanges": revenu_map[data["revenu"]],
-        "Education": etude_map[data["etude"]],
-        "MedConditions_Diabetes": bool_map[data["diabete"]],
-        "MedConditions_HighBP": bool_map[data["hypertension"]],
-        "MedConditions_HeartCondition": bool_map[data["cardiaque"]],
-        "MedConditions_LungDisease": bool_map[data["poumon"]],
-        "MedConditions_Depression": bool_map[data["depression"]],
-        "HealthLimits_Pain": bool_map[data["douleur"]],
-        "Fruit2": fruits_map[data["fruits"]],
-        "Vegetables2": legumes_map[data["legumes"]],
-        "TimesStrengthTraining": int(data["sport"]),
-        "Drink_nb_PerMonth": data["alcohol"],
-        "ChildrenInHH": data["enfants"],
-        "TotalHousehold": data["foyer"],
-        "TimesSunburned": data["soleil"],
-        "GeneralHealth": sante_general_map[data["Sante_general"]],
-        "Birthcountry": ethnie_map[data["ethnie"]],
-        "CutSkipMeals2": diff_map[data["Skip_meal"]],
-        "DiffPayMedBills": diff_map[data["Diff_financiere"]],
-        "FamilyEverHadCancer2": bool_map[data["FamilyEverHadCancer2"]]
-    }
-
-    df_form = pd.DataFrame([input_data_for_pipeline])
-    df_form = df_form.reindex(columns=raw_features_for_pipeline_input)
-
-    try:
-        Y_prediction_proba = pipeline.predict_proba(df_form)
-        score = round(Y_prediction_proba[0][1] * 100, 0)
-
-        st.markdown(f"<h2> {nom}, résultat de votre test</h2>", unsafe_allow_html=True)
-        
-
-    # Result slider
-        st.markdown(f"""
-            <style>
-                .progress-bar-container {{
-                    background: #edebeb;
-                    border-radius: 20px;
-                    height: 30px;
-                    width: 100%;
-                    max-width: 100%;
-                    box-shadow: inset 0 1px 2px rgba(0,0,0,0.1);
-                    position: relative;
-                    margin: 15px 0;
-                }}
-                .progress-bar-fill {{
-                    height: 100%;
-                    width: {score}%;
-                    background: linear-gradient(90deg, #c6f1c6 0%, #f7c6c7 100%);
-                    border-radius: 20px 0 0 20px;
-                    box-shadow: 0 0 4px rgba(247, 198, 199, 0.3);
-                }}
-                .progress-bar-text {{
-                    position: absolute;
-                    width: 100%;
-                    text-align: center;
-                    top: 0;
-                    line-height: 30px;
-                    font-weight: 600;
-                    color: #333;
-                    font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-                    user-select: none;
-                }}
-                .risk-level-labels {{
-                display: flex;
-                justify-content: space-between;
-                font-weight: 600;
-                font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-                color: #555;
-                margin: 0 5px 15px 5px;
-                user-select: none;
-                font-size: 0.9rem;}}
-            </style>
-
-            <div class="progress-bar-container">
-                <div class="progress-bar-fill"></div>
-                <div class="progress-bar-text">{score} %</div>
-            </div>
-
-            <div class="risk-level-labels">
-            <span>Faible</span>
-            <span>Modéré</span>
-            <span>Fort</span>
-            </div>
-        """, unsafe_allow_html=True)
-
-
-        # Function to generate centered image HTML
-        def get_centered_image_html(image_path, width, caption):
-            with open(image_path, "rb") as image_file:
-                encoded = base64.b64encode(image_file.read()).decode()
-
-            # Apply text-align: center to the parent div
-            # And display: block, margin: auto for the image itself for robust centering
-            return f"""
-                <div style="text-align: center; margin-top: 20px; margin-bottom: 20px;">
-                    <img src="data:image/png;base64,{encoded}" alt="Image" width="{width}" style="display: block; margin: auto;">
-                    <p style="text-align: center; font-size: 0.9em; color: gray;">{caption}</p>
+            st.session_state.step = 3 # Move to next step
+            rerun_questionnaire() # Rerun to display the next step
+
+    elif st.session_state.step == 3:
+        with st.form("step_3_form"): 
+            st.markdown("<h2>Home, sweet home </h2>", unsafe_allow_html=True)
+            revenu = st.select_slider("Quel est votre revenu annuel net approximatif ?", [
+                " 0 à 730€ mensuel", "730€ à 1099€ mensuel", "1100€ à 1469€ mensuel",
+                "1470€ à 2569€ mensuel", "2570€ à 3669€ mensuel", "3670 à 5499€ mensuel",
+                "5500€ à 7339€ mensuel", "7340€ à 14669€ mensuel", "14670€ mensuel et plus"], help="Veuillez sélectionner la tranche qui correspond le mieux à votre revenu annuel net.")
+            etude = st.select_slider("Quel est votre niveau d'études le plus élevé atteint ?", [
+                "Primaire", "Collège / brevet", "Lycée / BAC", "Universitaire : BTS / DUT / filière technique",
+                "Universitaire : Licence / Maîtrise / DEUG", "Universitaire : Master / DEA / DESS",
+                "Doctorat ou plus"], help="Votre plus haut diplôme ou niveau de scolarité atteint.")
+
+            col_children, col_household = st.columns(2)
+            with col_children:
+                enfants = st.number_input("Combien d'enfants avez-vous?", 0, 30, 1)
+            with col_household:
+                foyer = st.number_input("Combien de personnes vivent avec vous?", 0, 30, 1, help="Adultes, enfants et vous compris")
+
+            Diff_financiere = st.selectbox("Avez-vous des difficultés à payer vos factures médicales ?", ["Jamais", "Un peu", "Souvent"], help="Indiquez la fréquence de vos difficultés à couvrir les frais médicaux.")
+            Skip_meal = st.selectbox("Avez-vous déjà sauté des repas en raison de difficultés financières au cours des 12 derniers mois ?", ["Jamais", "Un peu", "Souvent"], help="Indiquez si vous avez dû sauter des repas en raison de contraintes financières.")
+            ethnie = st.selectbox("Quelle est votre origine ethnique ?", [
+                "Blanc", "Noir Africain ou Noir Americain", "Indien Américain, Américain du nord",
+                "Indien d'Asie", "Chinois", "Philippin", "Japonais", "Coréen", "Vietnamien",
+                "Autre Asiatique", "Autre île du Pacifique", "Autre origine"], help="Cette information est utilisée à des fins statistiques et d'amélioration du modèle.")
+            st.markdown("<br>", unsafe_allow_html=True)
+            submit = st.form_submit_button("Calculer")
+        add_return_button()   
+
+        if submit:
+                # Store inputs for this step (all remaining inputs)
+                st.session_state.inputs.update({
+                    "revenu": revenu,
+                    "etude": etude,
+                    "enfants": enfants,
+                    "foyer": foyer,
+                    "Diff_financiere": Diff_financiere,
+                    "Skip_meal": Skip_meal,
+                    "ethnie": ethnie
+                })
+                # Combine all stored inputs (from all steps) for final processing
+                #st.session_state.form_submitted = True
+                st.session_state.step = 4 # Move to next step
+                rerun_questionnaire() 
+
+    # --- Display Results ---
+    elif st.session_state.step == 4:  
+    #if st.session_state.form_submitted:
+        data = st.session_state.inputs
+        nom = data["prenom"].strip() or "Cher utilisateur" # More professional default
+        # French labels -> pipeline codes (mapping dicts shared with batch scoring, see label_maps.py)
+        input_data_for_pipeline = answers_to_features(data)
+        timer.lap("mapping")
+
+        try:
+            if scorer is not None:
+                # Encoded once, shared by the prediction, the explanation and the what-if panel
+                row = encoded_row(scorer, input_data_for_pipeline)
+                # Memoized across sessions, e.g. when answers are resubmitted after "⬅ Retour" (see prediction_cache.py)
+                Y_prediction_proba = cached_predict_proba_one(scorer, input_data_for_pipeline, row=row)
+            else:
+                df_form = pd.DataFrame([input_data_for_pipeline])
+                df_form = df_form.reindex(columns=raw_features_for_pipeline_input)
+                timer.lap("dataframe")
+                Y_prediction_proba = pipeline.predict_proba(df_form)
+            score = round(Y_prediction_proba[0][1] * 100, 0)
+            # With a calibration (see calibration.py) the score is calibrated and the limits with it
+            band = scorer.risk_bands([Y_prediction_proba[0][1]])[0] if scorer is not None else risk_band_codes([score])[0]
+            timer.lap("predict")
+
+            st.markdown(f"<h2> {nom}, résultat de votre test</h2>", unsafe_allow_html=True)
+
+
+        # Result slider
+            st.markdown(f"""
+                <div class="progress-bar-container">
+                    <div class="progress-bar-fill" style="width: {score}%;"></div>
+                    <div class="progress-bar-text">{score} %</div>
                 </div>
-            """
-
-        if score <= 20:
-            st.success(f"**Félicitations {nom} !** ton score de risque est faible. Cela suggère que vos habitudes actuelles sont globalement favorables à une bonne santé. Continuez à prendre soin de vous et à maintenir ces pratiques saines")
-            st.markdown(get_centered_image_html("images/Smile.png", 150, "Continuez sur cette voie de bien-être !"), unsafe_allow_html=True)
-        elif score <= 38:
-            st.warning(f"**Attention {nom},** ton score indique un risque modéré. Ce n'est pas une fatalité, mais un signal pour envisager quelques ajustements dans votre mode de vie. De petits changements peuvent faire une grande différence pour votre bien-être futur. Nous vous encourageons à explorer les facteurs qui pourraient contribuer à ce risque et à discuter de ces points avec un professionnel de la santé.")
-            st.markdown(get_centered_image_html("images/soso_smiley.png", 150, "De petits pas peuvent mener à de grands changements."), unsafe_allow_html=True)
-        else:
-            st.error(f"**Important {nom} :** ton score est élevé. Il est crucial de comprendre que ceci n’est pas un diagnostic médical, mais un indicateur d'un risque potentiellement plus élevé. Nous vous recommandons vivement de consulter un professionnel de la santé pour une évaluation approfondie et des conseils personnalisés. Un examen médical permettra de mieux comprendre votre situation et de discuter des mesures préventives ou de suivi appropriées.")
-            st.markdown(get_centered_image_html("images/sad-emoji.png", 150, "Prenez votre santé en main, consultez un professionnel"), unsafe_allow_html=True)
-
 
-    except Exception as e:
-        st.error(f"Une erreur est survenue lors du calcul de la prédiction. Veuillez vérifier vos données et réessayer. Détails de l'erreur : {e}")
-
-    st.markdown("---")
-    if st.button(" Recommencer l'évaluation", type="primary"):
-        st.session_state.step = 0 # Reset to the first step
-        st.session_state.inputs = {}
-        st.rerun()
+                <div class="risk-level-labels">
+                <span>Faible</span>
+                <span>Modéré</span>
+                <span>Fort</span>
+                </div>
+            """, unsafe_allow_html=True)
+
+
+            if band == 0:
+                st.success(f"**Félicitations {nom} !** ton score de risque est faible. Cela suggère que vos habitudes actuelles sont globalement favorables à une bonne santé. Continuez à prendre soin de vous et à maintenir ces pratiques saines")
+                st.markdown(get_centered_image_html("smile", "Continuez sur cette voie de bien-être !"), unsafe_allow_html=True)
+            elif band == 1:
+                st.warning(f"**Attention {nom},** ton score indique un risque modéré. Ce n'est pas une fatalité, mais un signal pour envisager quelques ajustements dans votre mode de vie. De petits changements peuvent faire une grande différence pour votre bien-être futur. Nous vous encourageons à explorer les facteurs qui pourraient contribuer à ce risque et à discuter de ces points avec un professionnel de la santé.")
+                st.markdown(get_centered_image_html("soso_smiley", "De petits pas peuvent mener à de grands changements."), unsafe_allow_html=True)
+            else:
+                st.error(f"**Important {nom} :** ton score est élevé. Il est crucial de comprendre que ceci n’est pas un diagnostic médical, mais un indicateur d'un risque potentiellement plus élevé. Nous vous recommandons vivement de consulter un professionnel de la santé pour une évaluation approfondie et des conseils personnalisés. Un examen médical permettra de mieux comprendre votre situation et de discuter des mesures préventives ou de suivi appropriées.")
+                st.markdown(get_centered_image_html("sad_emoji", "Prenez votre santé en main, consultez un professionnel"), unsafe_allow_html=True)
+
+            if scorer is not None:
+                # Per-user explanation from the forest paths, cached with the prediction (see explanations.py)
+                raising, lowering = cached_explain_one(scorer, input_data_for_pipeline, row=row).top()
+                lines = []
+                if raising:
+                    lines.append(f"**Ce qui a augmenté votre score :** {describe_factors(raising)}.")
+                if lowering:
+                    lines.append(f"**Ce qui l'a fait baisser :** {describe_factors(lowering)}.")
+                if lines:
+                    lines.append("*Contributions estimées par le modèle, pas des causes médicales.*")
+                    st.info("  \n".join(lines))
+                timer.lap("explain")
+
+                # What-if panel: variants of the same encoded row, scored in one batch (see what_if.py)
+                with st.expander("🔍 Et si je changeais certaines habitudes ?"):
+                    simulator = WhatIf(scorer, row)
+                    col1, col2 = st.columns(2)
+                    with col1:
+                        sim_fumeur = st.select_slider("Tabac", smoke_categories, value=data["fumeur"], key="whatif_fumeur")
+                        sim_poids = st.slider("Poids (kg)", 30.0, 200.0, float(data["poids"]), step=0.5, key="whatif_poids")
+                    with col2:
+                        sim_alcohol = st.slider("Verres d'alcool par mois", 0, 500, int(data["alcohol"]), key="whatif_alcohol")
+                        sim_sport = st.select_slider("Jours d'exercice intense par semaine", [str(i) for i in range(8)],
+                                                     value=str(data["sport"]), key="whatif_sport")
+                    simulated = answers_to_features({**data, "fumeur": sim_fumeur, "poids": sim_poids,
+                                                     "alcohol": sim_alcohol, "sport": sim_sport})
+                    changes = changed_features(input_data_for_pipeline, simulated)
+                    sim_score = round(simulator.score(changes) * 100, 0) if changes else score
+                    st.metric("Score simulé", f"{sim_score:.0f} %", f"{sim_score - score:+.0f} pts", delta_color="inverse")
+
+                    # Score over the whole range of one field, the other changes applied
+                    curve = st.radio("Évolution du score selon", ["Poids (kg)", "Verres d'alcool par mois"],
+                                     horizontal=True, key="whatif_curve")
+                    if curve == "Poids (kg)":
+                        grid = np.arange(30.0, 201.0, 1.0)
+                        probas = simulator.sweep("BMI", [compute_bmi(p, data["taille_m"]) for p in grid], changes)
+                    else:
+                        grid = np.arange(0, 501, 5)
+                        probas = simulator.sweep("Drink_nb_PerMonth", grid, changes)
+                    st.line_chart(pd.DataFrame({"Score (%)": np.round(probas * 100, 0)}, index=pd.Index(grid, name=curve)))
+                timer.lap("what_if")
+
+
+        except Exception as e:
+            st.error(f"Une erreur est survenue lors du calcul de la prédiction. Veuillez vérifier vos données et réessayer. Détails de l'erreur : {e}")
+
+        st.markdown("---")
+        if st.button(" Recommencer l'évaluation", type="primary"):
+            st.session_state.step = 0 # Reset to the first step
+            st.session_state.inputs = CompactAnswers()
+            # What-if sliders start again from the next answers
+            for key in [k for k in st.session_state if k.startswith("whatif_")]:
+                del st.session_state[key]
+            rerun_questionnaire()
+    timer.lap("result_html" if timed_step == 4 else "form")
+    if fragment_rerun:
+        timer.finish()
+
+
+questionnaire(timer)
 
 
 # --- Footer Logo ---
 try:
-    with open("images/Onco-sisters_logo-nobackground.png", "rb") as image_file:
-        logo_encoded = base64.b64encode(image_file.read()).decode()
-
     logo_html = f"""
     <div style="text-align: center; margin-top: 10px; margin-bottom: 20px;">
-        <img src="data:image/png;base64,{logo_encoded}" alt="Onco-Sisters Logo" width="120">
+        <img src="{asset_src('footer_logo')}" alt="Onco-Sisters Logo" width="120">
         <p style="margin-top: 5px; font-size: 14px; color: gray;">Powered by Onco-Sisters</p>
     </div>
 """
     st.markdown(logo_html, unsafe_allow_html=True)
 except FileNotFoundError:
-    st.error("Error: 'images/Onco-sisters_logo-nobackground.png' not found. Please ensure the image exists in the 'images' directory.")
\ No newline at end of file
+    st.error("Error: 'images/Onco-sisters_logo-nobackground.png' not found. Please ensure the image exists in the 'images' directory.")
+timer.lap("footer")
+
+# --- Operator panel (only with ?admin=<FIGHTCANCER_ADMIN_TOKEN>) ---
+if is_admin():
+    render_admin_panel()
+    timer.lap("admin_panel")
+timer.finish()
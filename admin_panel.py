@@ -0,0 +1,67 @@
+# Operator panel for the Streamlit app (hidden from regular users)
+#
+# Shown in the sidebar only when FIGHTCANCER_ADMIN_TOKEN is set on the server
+# and the page is opened with ?admin=<token>.
+
+import hmac
+import os
+
+import streamlit as st
+
+from model_bundle import bundle_loader
+from model_registry import registry
+from prediction_cache import prediction_cache
+from profiling import PROFILE_ENV, profiler
+from session_store import session_registry
+
+ADMIN_TOKEN_ENV = "FIGHTCANCER_ADMIN_TOKEN"
+
+
+def is_admin():
+    token = os.environ.get(ADMIN_TOKEN_ENV)
+    # Constant-time comparison: the response time does not leak how much of the token matched
+    return bool(token) and hmac.compare_digest(st.query_params.get("admin", "").encode(), token.encode())
+
+
+def render_admin_panel():
+    with st.sidebar:
+        st.markdown("### 🔧 Exploitation")
+
+        st.markdown("**Cache des prédictions**")
+        cache = prediction_cache.stats()
+        col_hits, col_rate, col_mem = st.columns(3)
+        col_hits.metric("Entrées", f"{cache['entries']} / {cache['max_entries']}")
+        col_rate.metric("Taux de succès", f"{cache['hit_rate']:.0%}")
+        col_mem.metric("Mémoire", f"{cache['memory_kb']:.1f} KB")
+        st.json(cache, expanded=False)
+        if st.button("Vider le cache"):
+            prediction_cache.clear()
+
+        st.markdown("**Sessions**")
+        sessions = session_registry.stats()
+        col_n, col_mean, col_total = st.columns(3)
+        col_n.metric("Actives", sessions["sessions"])
+        col_mean.metric("Moyenne", f"{sessions['mean_bytes'] / 1024:.1f} KB")
+        col_total.metric("Total", f"{sessions['total_kb']:.0f} KB")
+        st.caption(f"État de session (st.session_state) par session ; p95 {sessions['p95_bytes'] / 1024:.1f} KB, "
+                   f"{sessions['evictions']} sessions inactives vidées (après {sessions['idle_ttl_seconds']} s)")
+        rows = session_registry.sessions()
+        if rows:
+            st.dataframe(sorted(rows, key=lambda row: -row["octets"])[:50], hide_index=True)
+
+        st.markdown("**Temps par phase (ms)**")
+        if profiler.enabled:
+            rows = profiler.percentiles()
+            st.caption(f"{profiler.reruns} exécutions enregistrées, {profiler.window} dernières par phase")
+            if rows:
+                st.dataframe(rows, hide_index=True)
+        else:
+            st.caption(f"Désactivé (lancer avec {PROFILE_ENV}=1)")
+
+        st.markdown("**Modèle**")
+        bundle = bundle_loader.get()
+        st.json({
+            "bundle": bundle.path if bundle is not None else None,
+            "bundle_open_ms": round(bundle_loader.open_time * 1000, 2),
+            "pickle_registry": registry.stats(),
+        }, expanded=False)
@@ -0,0 +1,97 @@
+# Static image assets for the Streamlit cancer risk application
+#
+# The source PNGs in images/ are much larger than their display size. They are
+# resized once to their display width into static/ (run `python assets.py`
+# after changing an image) and served by Streamlit's static file server
+# (server.enableStaticServing in .streamlit/config.toml), so the browser can
+# cache them instead of receiving base64 data URIs on every rerun.
+
+import base64
+import functools
+import os
+
+from PIL import Image
+
+STATIC_DIR = "static"
+STATIC_URL = "app/static"
+
+# name -> (source image, display width in px)
+ASSETS = {
+    "logo": ("images/Logo_fight_cancer_app.png", 400),
+    "footer_logo": ("images/Onco-sisters_logo-nobackground.png", 120),
+    "smile": ("images/Smile.png", 150),
+    "soso_smiley": ("images/soso_smiley.png", 150),
+    "sad_emoji": ("images/sad-emoji.png", 150),
+}
+
+
+def static_path(name):
+    return os.path.join(STATIC_DIR, f"{name}.png")
+
+
+def build_asset(name):
+    """Resize one source image to its display width and write it to static/."""
+    source, width = ASSETS[name]
+    os.makedirs(STATIC_DIR, exist_ok=True)
+    with Image.open(source) as im:
+        if im.width > width:
+            height = round(im.height * width / im.width)
+            im = im.resize((width, height), Image.LANCZOS)
+        im.save(static_path(name), format="PNG", optimize=True)
+    return static_path(name)
+
+
+def build_assets():
+    return [build_asset(name) for name in ASSETS]
+
+
+def _ensure_built(name):
+    # static/ is committed; only rebuild when a resized file is missing
+    if not os.path.exists(static_path(name)):
+        build_asset(name)
+
+
+def _static_serving_enabled():
+    try:
+        import streamlit as st
+        return bool(st.get_option("server.enableStaticServing"))
+    except Exception:
+        return False
+
+
+@functools.lru_cache(maxsize=None)
+def encoded_asset(name):
+    """Base64 of the resized image, computed once per process."""
+    _ensure_built(name)
+    with open(static_path(name), "rb") as f:
+        return base64.b64encode(f.read()).decode()
+
+
+@functools.lru_cache(maxsize=None)
+def asset_src(name):
+    """Value for an <img src="..."> attribute.
+
+    A cacheable static URL when static serving is on, otherwise a data URI of
+    the resized (not the original) image.
+    """
+    if _static_serving_enabled():
+        _ensure_built(name)
+        return f"{STATIC_URL}/{name}.png"
+    return f"data:image/png;base64,{encoded_asset(name)}"
+
+
+def get_centered_image_html(name, caption, width=None):
+    width = width or ASSETS[name][1]
+    # Apply text-align: center to the parent div
+    # And display: block, margin: auto for the image itself for robust centering
+    return f"""
+        <div style="text-align: center; margin-top: 20px; margin-bottom: 20px;">
+            <img src="{asset_src(name)}" alt="Image" width="{width}" style="display: block; margin: auto;">
+            <p style="text-align: center; font-size: 0.9em; color: gray;">{caption}</p>
+        </div>
+    """
+
+
+if __name__ == "__main__":
+    for path in build_assets():
+        print(f"✅ {path} ({os.path.getsize(path) / 1024:.1f} KB)")
@@ -0,0 +1,214 @@
+# Headless batch scoring of questionnaire tables (CSV or Parquet)
+#
+# Each input row is one respondent, either with the app's French answers
+# (columns fumeur, revenu, etude, poids, taille_m, ... as in
+# st.session_state.inputs) or already coded under the pipeline's feature
+# names. The file is streamed chunk by chunk, so memory stays bounded by
+# --chunk-size whatever the input size.
+#
+# With --workers N, chunks are scored by a pool of N processes. The forest is
+# compiled once to a single file that every worker memory-maps read-only, so
+# the node arrays are shared instead of copied into each process. Chunks are
+# written back in input order, and the output does not depend on N.
+# The NumPy engine walks large chunks about 4x slower per core than sklearn's
+# Cython loop; --engine sklearn gives each worker a private copy of the trees
+# instead (~1 MB each), which is faster when memory is not the constraint.
+# Both engines return bit-identical probabilities.
+#
+# Usage: python batch_score.py respondents.csv scores.parquet [--chunk-size 50000] [--id-column id] [--workers 4]
+
+import argparse
+import collections
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import joblib
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from codebook import CATEGORICAL, answers_frame_to_features
+from forest_engine import DEFAULT_FOREST_PATH, CompiledForest
+from label_maps import ANSWER_FIELDS, missing_answer_columns, raw_features_for_pipeline_input
+from model_registry import MODEL_PATH, FEATURES_PATH, ModelRegistry
+from scoring import RISK_BANDS, Scorer, get_scorer, risk_score
+
+LABEL_COLUMNS = {key for key, _ in CATEGORICAL.values()}
+
+OUTPUT_SCHEMA = [
+    ("probability", pa.float64()),
+    ("score", pa.int8()),
+    ("risk_band", pa.string()),
+]
+
+
+def input_columns():
+    """Every column the scorer may read; anything else in the file is skipped."""
+    answer_keys = {key for key, _ in ANSWER_FIELDS.values()}
+    return answer_keys | set(raw_features_for_pipeline_input) | {"poids", "taille_m"}
+
+
+def read_header(path):
+    if path.endswith(".parquet"):
+        return pq.ParquetFile(path).schema_arrow.names
+    return list(pd.read_csv(path, nrows=0).columns)
+
+
+def iter_chunks(path, chunk_size, columns):
+    if path.endswith(".parquet"):
+        # String answers come out as categoricals: the codebook then maps each
+        # chunk's few distinct labels instead of hashing every row
+        schema = pq.read_schema(path)
+        labels = [c for c in columns if c in LABEL_COLUMNS
+                  and (pa.types.is_string(schema.field(c).type) or pa.types.is_large_string(schema.field(c).type))]
+        parquet = pq.ParquetFile(path, read_dictionary=labels)
+        for batch in parquet.iter_batches(batch_size=chunk_size, columns=columns):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunk_size, usecols=columns)
+
+
+def score_chunk(scorer, chunk, id_column=None):
+    """Score one chunk; rows with missing or unknown answers get null outputs."""
+    features = answers_frame_to_features(chunk)
+    valid = features.notna().all(axis=1).to_numpy()
+
+    proba = np.full(len(features), np.nan)
+    if valid.any():
+        proba[valid] = scorer.predict_frame(features[valid])
+    scores = risk_score(proba)
+    bands = scorer.risk_bands(proba)
+
+    arrays = {
+        "probability": pa.array(proba, mask=~valid),
+        "score": pa.array(np.nan_to_num(scores).astype(np.int8), mask=~valid),
+        "risk_band": pa.array(np.array(RISK_BANDS + (None,), dtype=object)[bands]),
+    }
+    if id_column:
+        arrays = {id_column: pa.array(chunk[id_column].to_numpy()), **arrays}
+    return pa.table(arrays), int((~valid).sum())
+
+
+# --- Process pool ---
+_worker_scorer = None
+
+
+def _init_worker(plan, calibration, engine, path):
+    global _worker_scorer
+    if engine == "sklearn":
+        _worker_scorer = Scorer(plan, forest=None, model=joblib.load(path).named_steps["model"],
+                                calibration=calibration)
+    else:
+        _worker_scorer = Scorer(plan, CompiledForest.load(path, mmap_mode="r"), model=None, calibration=calibration)
+
+
+def _score_in_worker(chunk, id_column):
+    return score_chunk(_worker_scorer, chunk, id_column)
+
+
+def shared_forest_file(registry, path=DEFAULT_FOREST_PATH):
+    """Compile the forest to `path` unless it already matches the loaded pickle."""
+    pipeline, _ = registry.get()
+    try:
+        if CompiledForest.load(path, mmap_mode="r").source_sha256 == registry.sha256:
+            return path
+    except (FileNotFoundError, EOFError, KeyError, TypeError):
+        pass
+    CompiledForest.from_pipeline(pipeline, registry.sha256).save(path)
+    return path
+
+
+def _scored_chunks(chunks, scorer, id_column, workers, engine, path):
+    if not workers:
+        for chunk in chunks:
+            yield (len(chunk),) + score_chunk(scorer, chunk, id_column)
+        return
+
+    # spawn: workers start clean and only see the forest through the mapped file
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(workers, mp_context=context, initializer=_init_worker,
+                             initargs=(scorer.plan, scorer.calibration, engine, path)) as pool:
+        pending = collections.deque()
+        for chunk in chunks:
+            pending.append((len(chunk), pool.submit(_score_in_worker, chunk, id_column)))
+            # Bounded number of chunks in flight keeps memory flat
+            if len(pending) >= 2 * workers:
+                n, future = pending.popleft()
+                yield (n,) + future.result()
+        while pending:
+            n, future = pending.popleft()
+            yield (n,) + future.result()
+
+
+def run(input_path, output_path, chunk_size=50_000, id_column=None, scorer=None,
+        workers=0, forest_path=None, engine="forest", model_path=MODEL_PATH, log=print):
+    header = read_header(input_path)
+    missing = missing_answer_columns(header)
+    if missing:
+        raise ValueError(f"Colonnes manquantes dans {input_path}: {', '.join(missing)}")
+    if id_column and id_column not in header:
+        raise ValueError(f"Colonne d'identifiant introuvable: {id_column}")
+    wanted = input_columns() | ({id_column} if id_column else set())
+    columns = [c for c in header if c in wanted]
+
+    if scorer is None or (workers and engine == "forest" and forest_path is None):
+        registry = ModelRegistry(model_path, FEATURES_PATH)
+        scorer = scorer or get_scorer(registry)
+        if workers and engine == "forest":
+            forest_path = shared_forest_file(registry)
+    worker_source = model_path if engine == "sklearn" else forest_path
+
+    rows = invalid = 0
+    writer = None
+    start = time.perf_counter()
+    try:
+        chunks = iter_chunks(input_path, chunk_size, columns)
+        for n, table, n_invalid in _scored_chunks(chunks, scorer, id_column, workers, engine, worker_source):
+            if writer is None:
+                writer = pq.ParquetWriter(output_path, table.schema)
+            writer.write_table(table)
+            rows += n
+            invalid += n_invalid
+            elapsed = time.perf_counter() - start
+            log(f"  {rows:>12,} lignes  {rows / elapsed:>12,.0f} lignes/s")
+    finally:
+        if writer is not None:
+            writer.close()
+
+    elapsed = time.perf_counter() - start
+    return {"rows": rows, "invalid_rows": invalid, "seconds": elapsed,
+            "rows_per_second": rows / elapsed if elapsed else 0.0}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score a table of questionnaires with the saved pipeline.")
+    parser.add_argument("input", help="CSV or Parquet file, one respondent per row")
+    parser.add_argument("output", help="Parquet file to write (probability, score, risk_band)")
+    parser.add_argument("--chunk-size", type=int, default=50_000, help="rows read and scored at a time")
+    parser.add_argument("--id-column", help="input column copied to the output to join results back")
+    parser.add_argument("--model", default=MODEL_PATH, help="trained pipeline pickle")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="score chunks in N processes sharing a memory-mapped forest (0: in-process)")
+    parser.add_argument("--engine", choices=("forest", "sklearn"), default="forest",
+                        help="worker engine: shared memory-mapped forest, or a private sklearn model per worker")
+    parser.add_argument("--forest", default=DEFAULT_FOREST_PATH,
+                        help="compiled forest file mapped by the workers (rebuilt if stale)")
+    args = parser.parse_args(argv)
+
+    registry = ModelRegistry(args.model, FEATURES_PATH)
+    scorer = get_scorer(registry)
+    forest_path = None
+    if args.workers and args.engine == "forest":
+        forest_path = shared_forest_file(registry, args.forest)
+    stats = run(args.input, args.output, args.chunk_size, args.id_column, scorer,
+                args.workers, forest_path, args.engine, args.model)
+    print(f"✅ {stats['rows']:,} lignes scorées en {stats['seconds']:.1f} s "
+          f"({stats['rows_per_second']:,.0f} lignes/s), {stats['invalid_rows']:,} lignes invalides "
+          f"-> {os.path.abspath(args.output)}")
+
+
+if __name__ == "__main__":
+    main()
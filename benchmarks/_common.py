@@ -0,0 +1,98 @@
+# Shared helpers for the benchmark scripts
+
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+RAW_FEATURES = [
+    'SmokeNow', 'GeneralHealth', 'Nervous',
+    'IncomeRanges', 'Education', 'Fruit2', 'Vegetables2', 'CutSkipMeals2',
+    'DiffPayMedBills',
+    'BirthSex',
+    'Birthcountry',
+    'BMI', 'Age', 'SleepWeekdayHr', 'TimesSunburned',
+    'TimesStrengthTraining', 'ChildrenInHH', 'TotalHousehold', 'Drink_nb_PerMonth',
+    'MedConditions_Diabetes', 'MedConditions_HighBP', 'MedConditions_HeartCondition',
+    'MedConditions_LungDisease', 'MedConditions_Depression', 'FamilyEverHadCancer2',
+    'HealthLimits_Pain'
+]
+
+# Birthcountry values sent by the app plus the ones seen in training
+COUNTRIES = ["White", "Black", "AmerInd", "AsInd", "Chinese", "Filipino", "Japanese", "Korean",
+             "Vietnamese", "OthAsian", "OthPacIsl", "Other", "Mexican", "OthHisp", "PuertoRican"]
+
+# Integer code ranges produced by the app's mapping dicts (inclusive)
+CODE_RANGES = {
+    'SmokeNow': (0, 2), 'GeneralHealth': (0, 4), 'Nervous': (0, 3), 'IncomeRanges': (1, 9),
+    'Education': (1, 7), 'Fruit2': (0, 6), 'Vegetables2': (0, 6), 'CutSkipMeals2': (0, 2),
+    'DiffPayMedBills': (0, 2), 'BirthSex': (0, 2), 'TimesStrengthTraining': (0, 7),
+    'SleepWeekdayHr': (3, 12), 'ChildrenInHH': (0, 5), 'TotalHousehold': (1, 8),
+}
+
+
+def random_raw_frame(n, seed=0):
+    """n random answer sets, already mapped to the codes the app feeds the pipeline."""
+    rng = np.random.default_rng(seed)
+    data = {}
+    for col in RAW_FEATURES:
+        if col in CODE_RANGES:
+            lo, hi = CODE_RANGES[col]
+            data[col] = rng.integers(lo, hi + 1, n)
+        elif col.startswith("MedConditions_") or col in ("FamilyEverHadCancer2", "HealthLimits_Pain"):
+            data[col] = rng.integers(0, 2, n)
+    data["Birthcountry"] = rng.choice(COUNTRIES, n)
+    data["Age"] = rng.integers(18, 91, n)
+    data["BMI"] = np.round(rng.normal(27, 5, n).clip(15, 60), 2)
+    data["TimesSunburned"] = rng.poisson(1.0, n)
+    data["Drink_nb_PerMonth"] = rng.poisson(15, n)
+    return pd.DataFrame(data)[RAW_FEATURES]
+
+
+def random_hints_extract(n, seed=0, extra_columns=50, positive_rate=0.15):
+    """Synthetic HINTS-shaped extract (synthetic_hints.py) plus unused survey columns, like the raw extract."""
+    from synthetic_hints import generate_frame
+
+    return generate_frame(n, seed, positive_rate=positive_rate, extra_columns=extra_columns)
+
+
+def percentiles(samples_s):
+    ms = np.asarray(samples_s) * 1000
+    return {"p50": float(np.percentile(ms, 50)), "p90": float(np.percentile(ms, 90)),
+            "p99": float(np.percentile(ms, 99)), "mean": float(ms.mean()), "n": len(ms)}
+
+
+def time_calls(fn, repeat, warmup=3):
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return percentiles(samples)
+
+
+def format_row(label, stats):
+    return (f"{label:<40}{stats['p50']:>10.3f}{stats['p90']:>10.3f}"
+            f"{stats['p99']:>10.3f}{stats['mean']:>10.3f}")
+
+
+HEADER = f"{'':<40}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'mean ms':>10}"
+
+
+# Answers of a complete questionnaire, as the form widgets store them (French labels)
+STEP4_ANSWERS = {
+    "BirthSex": "Femme", "prenom": "Test", "Age": 55, "poids": 80.0, "taille_m": 1.65,
+    "fumeur": "Tous les jours", "alcohol": 20, "soleil": 3, "sommeil_moy": 6, "fruits": "1 à 2 portions",
+    "legumes": "0", "sport": "1", "diabete": "Oui", "cardiaque": "Non", "hypertension": "Oui", "poumon": "Non",
+    "depression": "Non", "nervous": "Faible, quelques fois", "douleur": "Oui", "Sante_general": "Moyen",
+    "FamilyEverHadCancer2": "Oui", "revenu": "1100€ à 1469€ mensuel", "etude": "Lycée / BAC", "enfants": 2,
+    "foyer": 3, "Diff_financiere": "Un peu", "Skip_meal": "Jamais", "ethnie": "Blanc",
+}
@@ -0,0 +1,56 @@
+# Per-rerun image payload, before/after the static asset pipeline
+#
+# Usage: python benchmarks/bench_assets.py
+
+import base64
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+import assets  # noqa: E402
+
+# Images emitted by one rerun of each page type
+PAGES = {
+    "questionnaire (steps 0-3)": ["logo", "footer_logo"],
+    "result (step 4)": ["logo", "sad_emoji", "footer_logo"],
+}
+
+
+def original_data_uri(name):
+    # Previous behaviour: read and base64 the full-size source on every rerun
+    source, _ = assets.ASSETS[name]
+    with open(source, "rb") as f:
+        return f"data:image/png;base64,{base64.b64encode(f.read()).decode()}"
+
+
+def resized_data_uri(name):
+    return f"data:image/png;base64,{assets.encoded_asset(name)}"
+
+
+def static_url(name):
+    return f"{assets.STATIC_URL}/{name}.png"
+
+
+def timed(fn, names, repeat=50):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        total = sum(len(fn(n)) for n in names)
+    return total, (time.perf_counter() - start) / repeat * 1000
+
+
+if __name__ == "__main__":
+    assets.build_assets()
+    print(f"{'page':<28}{'mode':<22}{'bytes/rerun':>14}{'ms/rerun':>10}")
+    for page, names in PAGES.items():
+        for mode, fn in [("before: original b64", original_data_uri),
+                         ("resized b64 (cached)", resized_data_uri),
+                         ("static URL", static_url)]:
+            size, ms = timed(fn, names)
+            print(f"{page:<28}{mode:<22}{size:>14,}{ms:>10.3f}")
+
+    once = sum(os.path.getsize(assets.static_path(n)) for n in assets.ASSETS)
+    print(f"\nStatic files downloaded once and cached by the browser: {once:,} bytes")
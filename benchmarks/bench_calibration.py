@@ -0,0 +1,102 @@
+# Calibration table (calibration.py): parity with the fitted maps and cost per score
+#
+# No calibration ships with the model (the survey is not distributed), so one
+# is fitted here on the forest's probabilities for random answers, with labels
+# drawn from a known overconfident-at-50 % probability. The exported lookup
+# table must reproduce IsotonicRegression.predict plus the prior shift at its
+# breakpoints (in between it interpolates the shifted values) and Platt
+# scaling within 1e-3; the Platt table must keep every score in its risk band,
+# and the calibrated Scorer must return the table applied to the raw forest
+# probability, with the same explanation factors scaled by the table's slope
+# (none on a plateau of the table). Timed: np.interp in the table against the
+# fitted estimators, and the scorer per questionnaire and per batch with and
+# without the table.
+#
+# Usage: python benchmarks/bench_calibration.py [rows]
+
+import sys
+
+import numpy as np
+
+from _common import HEADER, format_row, random_raw_frame, time_calls
+
+from calibration import Calibration, evaluate_calibration, prior_shift
+from model_registry import registry
+from scoring import LOW_RISK_MAX, MODERATE_RISK_MAX, Scorer, risk_band_codes, risk_score
+
+TARGET_RATE = 0.12
+
+if __name__ == "__main__":
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    pipeline, features = registry.get()
+    raw_scorer = Scorer.from_pipeline(pipeline, features)
+    X = raw_scorer.plan.transform(random_raw_frame(rows, seed=3))
+    raw = raw_scorer.predict_encoded(X)
+
+    # Labels of a balanced sample whose true probability is flatter than the forest's
+    rng = np.random.default_rng(0)
+    logit = np.log(np.clip(raw, 1e-3, 1 - 1e-3) / np.clip(1 - raw, 1e-3, 1))
+    y = (rng.random(rows) < 1 / (1 + np.exp(-0.6 * logit))).astype(int)
+    half = rows // 2
+    calibrations = {method: Calibration.fit(raw[:half], y[:half], TARGET_RATE, method) for method in ("isotonic", "platt")}
+
+    # Table == fitted estimator + prior shift
+    from sklearn.isotonic import IsotonicRegression
+    from sklearn.linear_model import LogisticRegression
+
+    sample_rate = calibrations["platt"].sample_rate
+    iso = IsotonicRegression(y_min=0.0, y_max=1.0, out_of_bounds="clip").fit(raw[:half], y[:half])
+    platt = LogisticRegression(penalty=None).fit(raw[:half, None], y[:half])
+    grid = np.random.default_rng(1).random(100_000)
+    exact = {"isotonic": lambda p: prior_shift(iso.predict(p), sample_rate, TARGET_RATE),
+             "platt": lambda p: prior_shift(platt.predict_proba(p[:, None])[:, 1], sample_rate, TARGET_RATE)}
+    np.testing.assert_allclose(calibrations["isotonic"].apply(iso.X_thresholds_), exact["isotonic"](iso.X_thresholds_),
+                               rtol=0, atol=1e-12)
+    assert np.abs(calibrations["platt"].apply(grid) - exact["platt"](grid)).max() < 1e-3
+    for method, calibration in calibrations.items():
+        gap = np.abs(calibration.apply(grid) - exact[method](grid))
+        print(f"{method:<9} {len(calibration.raw):>4} points, écart au modèle ajusté : "
+              f"max {gap.max():.2e}, moyen {gap.mean():.2e}")
+
+    # Platt is strictly increasing: same bands before and after calibration
+    calibration = calibrations["platt"]
+    calibration.risk_limits = calibration.map_limits((LOW_RISK_MAX, MODERATE_RISK_MAX))
+    assert np.array_equal(calibration.risk_bands(calibration.apply(grid)), risk_band_codes(risk_score(grid)))
+    for method, c in calibrations.items():
+        c.risk_limits = c.risk_limits or c.map_limits((LOW_RISK_MAX, MODERATE_RISK_MAX))
+        changed = int((c.risk_bands(c.apply(raw[half:])) != risk_band_codes(risk_score(raw[half:]))).sum())
+        print(f"{method:<9} seuils {c.risk_limits[0]:.1%} / {c.risk_limits[1]:.1%}, "
+              f"{changed} lignes sur {rows - half:,} changent de bande")
+
+    scorer = Scorer(raw_scorer.plan, raw_scorer.forest, raw_scorer.model, calibration)
+    np.testing.assert_array_equal(scorer.predict_encoded(X), calibration.apply(raw))
+    assert scorer.version != raw_scorer.version, "la calibration doit changer la clé du cache"
+    # Explanations in points of the calibrated score: same factors, scaled by the local slope
+    raw_explanation, explanation = raw_scorer.explain_row(X[:1]), scorer.explain_row(X[:1])
+    assert explanation.proba == scorer.predict_encoded(X[:1])[0]
+    np.testing.assert_allclose(explanation.contributions,
+                               raw_explanation.contributions * calibration.slope(raw_explanation.proba))
+    assert [[f for f, _ in side] for side in explanation.top()] == [[f for f, _ in side] for side in raw_explanation.top()]
+    # On a plateau the displayed score does not move: no factor, rather than factors worth 0 points
+    p = raw_explanation.proba
+    plateau = Calibration([0.0, p - 0.1, p - 0.05, p + 0.05, p + 0.1, 1.0], [0.0, 0.1, 0.1, 0.1, 0.1, 0.5],
+                          "isotonic", sample_rate, TARGET_RATE)
+    flat = Scorer(raw_scorer.plan, raw_scorer.forest, raw_scorer.model, plateau).explain_row(X[:1])
+    assert flat.scale == 0 and flat.top() == ([], []), flat.top()
+    print("✅ table = modèles ajustés, mêmes bandes (Platt), scorer calibré = table(forêt)\n")
+
+    report = evaluate_calibration(raw[half:], y[half:], calibrations)
+    for label, metrics in report.items():
+        print(f"  {label:<10} Brier {metrics['brier']:.4f}   probabilité moyenne {metrics['mean_probability']:.2%}")
+
+    one = raw[:1]
+    print("\n" + HEADER)
+    print(format_row("table (np.interp), 1 score", time_calls(lambda: calibration.apply(one), 2000)))
+    print(format_row("LogisticRegression + prior, 1 score", time_calls(lambda: exact["platt"](one), 2000)))
+    print(format_row("IsotonicRegression + prior, 1 score", time_calls(lambda: exact["isotonic"](one), 2000)))
+    print(format_row(f"table (np.interp), {rows:,} scores", time_calls(lambda: calibration.apply(raw), 200)))
+    print(format_row(f"LogisticRegression + prior, {rows:,}", time_calls(lambda: exact["platt"](raw), 200)))
+    print(format_row("scorer brut, 1 questionnaire", time_calls(lambda: raw_scorer.predict_encoded(X[:1]), 2000)))
+    print(format_row("scorer calibré, 1 questionnaire", time_calls(lambda: scorer.predict_encoded(X[:1]), 2000)))
+    print(format_row(f"scorer brut, {rows:,} lignes", time_calls(lambda: raw_scorer.predict_encoded(X), 10)))
+    print(format_row(f"scorer calibré, {rows:,} lignes", time_calls(lambda: scorer.predict_encoded(X), 10)))
@@ -0,0 +1,131 @@
+# Compiled codebook (codebook.py) against per-column dict mapping
+#
+# Random tables of French answers (plus a few unknown labels and empty
+# cells) are encoded by the codebook and by the previous implementation,
+# one Series.map(dict) per answer column. Both must give the same features
+# and the same scores; the encoding is timed on growing tables, then read
+# and encoded from Parquet as batch_score.py does (answers read as
+# categoricals) against plain string columns. Ends with the mismatches
+# between the codebook and the encoders of the shipped model.
+#
+# Usage: python benchmarks/bench_codebook.py [max_rows] [repeat]
+
+import os
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from _common import HEADER, STEP4_ANSWERS, format_row, time_calls
+
+import pyarrow.parquet as pq
+
+from batch_score import input_columns, iter_chunks
+from codebook import CATEGORICAL, answers_frame_to_features, answers_to_features, check_plan
+from label_maps import ANSWER_FIELDS, compute_bmi, raw_features_for_pipeline_input
+from model_registry import registry
+from scoring import Scorer
+
+NUMERIC_ANSWERS = {"Age": (18, 90), "sommeil_moy": (3, 12), "soleil": (0, 10), "sport": (0, 7),
+                   "alcohol": (0, 60), "enfants": (0, 5), "foyer": (1, 8)}
+
+
+def random_answer_frame(n, seed=0, unknown_rate=0.01):
+    """n questionnaires as the form stores them; a share of the labels is unknown or missing."""
+    rng = np.random.default_rng(seed)
+    data = {}
+    for key, labels in CATEGORICAL.values():
+        column = rng.choice(np.array(labels, dtype=object), n)
+        column[rng.random(n) < unknown_rate] = "réponse inconnue"
+        column[rng.random(n) < unknown_rate] = None
+        data[key] = column
+    for key, (low, high) in NUMERIC_ANSWERS.items():
+        data[key] = rng.integers(low, high + 1, n)
+    data["poids"] = np.round(rng.normal(75, 12, n).clip(35, 180), 1)
+    data["taille_m"] = np.round(rng.normal(1.70, 0.09, n).clip(1.2, 2.2), 2)
+    return pd.DataFrame(data)
+
+
+def dict_answers_to_features(data):
+    """answers_to_features before codebook.py: one dict lookup per answer."""
+    features = {"BMI": compute_bmi(data["poids"], data["taille_m"])}
+    for feature, (key, mapping) in ANSWER_FIELDS.items():
+        features[feature] = mapping[data[key]] if mapping is not None else data[key]
+    features["TimesStrengthTraining"] = int(features["TimesStrengthTraining"])
+    return features
+
+
+def dict_map_features(df):
+    """The encoding before codebook.py: one Series.map(dict) per answer column."""
+    out = pd.DataFrame(index=df.index)
+    for feature in raw_features_for_pipeline_input:
+        if feature == "BMI":
+            taille = df["taille_m"].astype(float)
+            out[feature] = (df["poids"].astype(float) / taille ** 2).round(2).where(taille > 0, 0.0)
+            continue
+        key, mapping = ANSWER_FIELDS[feature]
+        column = df[key]
+        if mapping is not None and column.dtype == object:
+            out[feature] = column.map(mapping)
+        else:
+            out[feature] = pd.to_numeric(column, errors="coerce")
+    return out[raw_features_for_pipeline_input]
+
+
+if __name__ == "__main__":
+    max_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    # Same features, same scores
+    frame = random_answer_frame(20_000, seed=1)
+    features, reference = answers_frame_to_features(frame), dict_map_features(frame)
+    pd.testing.assert_frame_equal(features, reference, check_dtype=False)
+    # pandas "string" columns (convert_dtypes(), Parquet written with pandas string metadata)
+    pd.testing.assert_frame_equal(answers_frame_to_features(frame.convert_dtypes()), features, check_dtype=False)
+    assert features["SmokeNow"].isna().any(), "les réponses inconnues doivent donner NaN"
+    for i in range(200):
+        answers = {**STEP4_ANSWERS, **frame.iloc[i].to_dict()}
+        if "réponse inconnue" in answers.values() or None in answers.values():
+            continue
+        answers["sport"] = str(answers["sport"])
+        assert answers_to_features(answers) == dict_answers_to_features(answers)
+    scorer = registry.derived("scorer", Scorer.from_pipeline)
+    complete = frame[~frame.isin(["réponse inconnue"]).any(axis=1)].dropna()
+    np.testing.assert_array_equal(scorer.predict_frame(answers_frame_to_features(complete)),
+                                  scorer.predict_frame(dict_map_features(complete)))
+    print(f"✅ mêmes features et mêmes scores ({len(frame):,} questionnaires, {len(complete):,} complets)\n")
+
+    print(HEADER)
+    rows = 1_000
+    while rows <= max_rows:
+        frame = random_answer_frame(rows, seed=rows)
+        codebook = time_calls(lambda: answers_frame_to_features(frame), repeat, warmup=1)
+        mapped = time_calls(lambda: dict_map_features(frame), repeat, warmup=1)
+        print(format_row(f"{rows:,} lignes, codebook", codebook))
+        print(format_row(f"{rows:,} lignes, Series.map(dict)", mapped))
+        print(f"{'':<40}x{mapped['p50'] / codebook['p50']:.2f}")
+        rows *= 10
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "answers.parquet")
+        random_answer_frame(max_rows, seed=2).to_parquet(path)
+        columns = [c for c in pq.read_schema(path).names if c in input_columns()]
+
+        def plain():
+            for batch in pq.ParquetFile(path).iter_batches(batch_size=50_000, columns=columns):
+                dict_map_features(batch.to_pandas())
+
+        def dictionary():
+            for chunk in iter_chunks(path, 50_000, columns):
+                answers_frame_to_features(chunk)
+
+        print(format_row("Parquet, catégories + codebook", time_calls(dictionary, repeat, warmup=1)))
+        print(format_row("Parquet, chaînes + map(dict)", time_calls(plain, repeat, warmup=1)))
+        chunk = next(iter_chunks(path, 50_000, columns))
+        reference = pq.ParquetFile(path).read_row_group(0, columns=columns).to_pandas().iloc[:len(chunk)]
+        pd.testing.assert_frame_equal(answers_frame_to_features(chunk), dict_map_features(reference), check_dtype=False)
+
+    print("\nCodebook / encodeurs du modèle livré :")
+    for message in check_plan(scorer.plan) or ["✅ aucune différence"]:
+        print(f"   - {message}")
@@ -0,0 +1,69 @@
+# Per-user explanations (explanations.py): correctness and latency
+#
+# Checks that the contributions add up to prediction - base value, that the
+# probability is bit-identical to the forest engine's, that summing onto the
+# 26 raw fields keeps the total, and that the vectorized walk matches a
+# reference Saabas computed tree by tree from sklearn's decision_path.
+# Then times one explanation (the result page) against one prediction.
+#
+# Usage: python benchmarks/bench_explanations.py
+
+import warnings
+
+import numpy as np
+
+from _common import HEADER, STEP4_ANSWERS, format_row, random_raw_frame, time_calls
+
+from codebook import answers_to_features
+from model_registry import registry
+from prediction_cache import PredictionCache, cached_explain_one
+from scoring import Scorer
+
+
+def reference_saabas(model, X):
+    """Tree-by-tree Saabas contributions from sklearn's decision paths."""
+    contributions = np.zeros(X.shape)
+    for estimator in model.estimators_:
+        tree = estimator.tree_
+        counts = tree.value[:, 0, :]
+        value = counts[:, 1] / counts.sum(axis=1)
+        paths = estimator.decision_path(X.astype(np.float32))
+        for i in range(X.shape[0]):
+            nodes = paths.indices[paths.indptr[i]:paths.indptr[i + 1]]
+            np.add.at(contributions[i], tree.feature[nodes[:-1]], np.diff(value[nodes]))
+    return contributions / len(model.estimators_)
+
+
+if __name__ == "__main__":
+    warnings.filterwarnings("ignore", message="Found unknown categories")
+    pipeline, features = registry.get()
+    scorer = Scorer.from_pipeline(pipeline, features)
+    explainer = scorer.explainer
+
+    X = scorer.plan.transform(random_raw_frame(2000, seed=5))
+    proba, contributions = explainer.explain_encoded(X)
+    raw = explainer.to_raw(contributions)
+    assert np.array_equal(proba, scorer.forest.predict_positive(X))
+    assert np.allclose(explainer.base + contributions.sum(axis=1), proba, atol=1e-12)
+    assert np.allclose(raw.sum(axis=1), contributions.sum(axis=1), atol=1e-12)
+    assert raw.shape[1] == 26
+    assert np.allclose(reference_saabas(scorer.model, X[:50]), contributions[:50], atol=1e-12)
+    print(f"base {explainer.base:.4f}; somme des contributions = proba - base sur {len(X):,} lignes ; "
+          f"identique au calcul arbre par arbre (decision_path) sur 50 lignes\n")
+
+    answers = answers_to_features(STEP4_ANSWERS)
+    row = scorer.encode_one(answers)
+    cache = PredictionCache()
+    cached_explain_one(scorer, answers, cache)
+
+    print(HEADER)
+    print(format_row("ForestExplainer(...) (une fois)", time_calls(
+        lambda: type(explainer)(scorer.forest, scorer.plan), 20, 1)))
+    print(format_row("forest.predict_positive, 1 row", time_calls(lambda: scorer.forest.predict_positive(row), 1000)))
+    print(format_row("explain_row, 1 row", time_calls(lambda: explainer.explain_row(row), 1000)))
+    print(format_row("explain_one (answers), 1 row", time_calls(lambda: explainer.explain_one(answers), 1000)))
+    print(format_row("cached_explain_one, hit", time_calls(lambda: cached_explain_one(scorer, answers, cache), 1000)))
+    print(format_row("explain_encoded, 1000 rows", time_calls(lambda: explainer.explain_encoded(X[:1000]), 10, 1)))
+
+    raising, lowering = explainer.explain_one(answers).top()
+    print(f"\nhausse : {raising}\nbaisse : {lowering}")
@@ -0,0 +1,92 @@
+# SMOTE stage: imblearn's SMOTE vs fast_smote.ChunkedSMOTE as the training set grows
+#
+# The input is the preprocessed (39-column) matrix of a synthetic HINTS-shaped
+# extract with ~15 % positives, saved to .npy; each variant runs in a fresh
+# interpreter that loads it and calls fit_resample once. Reported: time,
+# output rows per second, and the extra memory of the stage (VmHWM after the
+# call minus VmRSS before, so the input matrix itself is not counted).
+# The KD-tree variant only runs on the smaller sizes (see fast_smote.py).
+# ChunkedSMOTE's output must be imblearn's, cast to float32.
+#
+# Usage: python benchmarks/bench_fast_smote.py [rows,rows,...]
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+
+from _common import ROOT, random_hints_extract
+
+CHILD = r"""
+import json, sys, time
+sys.path.insert(0, {root!r})
+import numpy as np
+from imblearn.over_sampling import SMOTE
+from fast_smote import ChunkedSMOTE
+
+def status(key):
+    return int(next(line for line in open("/proc/self/status") if line.startswith(key)).split()[1]) / 1024
+
+X, y = np.load({x_path!r}), np.load({y_path!r})
+sampler = SMOTE(random_state=142) if {variant!r} == "imblearn" else ChunkedSMOTE(random_state=142, algorithm={variant!r})
+rss_before = status("VmRSS")
+start = time.perf_counter()
+X_resampled, y_resampled = sampler.fit_resample(X, y)
+seconds = time.perf_counter() - start
+print(json.dumps({{"seconds": seconds, "extra_mb": status("VmHWM") - rss_before,
+                  "rows": len(y_resampled), "output_mb": X_resampled.nbytes / 1e6}}))
+"""
+
+VARIANTS = [("imblearn SMOTE", "imblearn", None), ("ChunkedSMOTE (auto)", "auto", None),
+            ("ChunkedSMOTE (kd_tree)", "kd_tree", 50_000)]
+
+
+def run_child(variant, x_path, y_path):
+    code = CHILD.format(root=ROOT, variant=variant, x_path=x_path, y_path=y_path)
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, cwd=ROOT, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def encoded(n_rows, seed=0):
+    import model_resample as m
+
+    df = random_hints_extract(n_rows, seed, extra_columns=0)
+    X = m.build_preprocessor().fit_transform(df[m.features_raw])
+    return np.ascontiguousarray(X, dtype=np.float64), df[m.target].to_numpy()
+
+
+def check_parity(n_rows=20_000):
+    from imblearn.over_sampling import SMOTE
+    from fast_smote import ChunkedSMOTE
+
+    X, y = encoded(n_rows, seed=1)
+    X_ref, y_ref = SMOTE(random_state=142).fit_resample(X, y)
+    X_new, y_new = ChunkedSMOTE(random_state=142, chunk_size=1_000).fit_resample(X, y)
+    assert X_new.dtype == np.float32 and np.array_equal(X_ref.astype(np.float32), X_new)
+    assert np.array_equal(y_ref, y_new)
+    X_64, _ = ChunkedSMOTE(random_state=142, dtype=None).fit_resample(X, y)
+    assert np.array_equal(X_ref, X_64)
+    print(f"parité: {len(y_new):,} lignes identiques à imblearn (float64, et float32 après conversion)\n")
+
+
+if __name__ == "__main__":
+    sizes = [int(s) for s in sys.argv[1].split(",")] if len(sys.argv) > 1 else [25_000, 50_000, 100_000, 200_000]
+    check_parity()
+
+    print(f"{'lignes':>9}  {'échantillonneur':<24}{'secondes':>10}{'lignes/s':>12}{'+mémoire MB':>13}{'sortie MB':>11}")
+    with tempfile.TemporaryDirectory() as tmp:
+        x_path, y_path = os.path.join(tmp, "X.npy"), os.path.join(tmp, "y.npy")
+        for n_rows in sizes:
+            X, y = encoded(n_rows)
+            np.save(x_path, X)
+            np.save(y_path, y)
+            del X
+            for label, variant, max_rows in VARIANTS:
+                if max_rows is not None and n_rows > max_rows:
+                    continue
+                r = run_child(variant, x_path, y_path)
+                print(f"{n_rows:>9,}  {label:<24}{r['seconds']:>10.2f}{r['rows'] / r['seconds']:>12,.0f}"
+                      f"{r['extra_mb']:>13.0f}{r['output_mb']:>11.0f}")
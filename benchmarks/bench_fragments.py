@@ -0,0 +1,141 @@
+# Script executions and time per navigation between the questionnaire steps
+#
+# AppTest reruns the whole script on every interaction. Here its runner keeps
+# the fragments between runs and, once the page is shown, sends each click as
+# the browser does: a rerun of the fragment holding the clicked widget. Each
+# navigation (submit a step, "⬅ Retour", "Recommencer") is counted in script
+# executions (whole script or fragment only, from the runner's
+# SCRIPT_STARTED events) and timed, against the same clicks as full reruns
+# (the app before st.fragment). Both must end on the same result page.
+#
+# AppTest's public API always reruns the whole script, so the runner is built
+# on Streamlit internals (LocalScriptRunner, MemoryFragmentStorage,
+# RerunData...) that change between releases. They are those of the version
+# pinned in requirements.txt; the bench refuses to run with another one.
+#
+# Usage: python benchmarks/bench_fragments.py [repeat]
+
+import logging
+import sys
+import time
+
+import numpy as np
+
+import _common  # noqa: F401  (repository root on sys.path)
+
+import streamlit
+
+PINNED_STREAMLIT = "1.47.0"  # requirements.txt
+if streamlit.__version__ != PINNED_STREAMLIT:
+    sys.exit(f"❌ bench_fragments.py utilise des API internes de Streamlit {PINNED_STREAMLIT} "
+             f"(installé : {streamlit.__version__}) : pip install streamlit=={PINNED_STREAMLIT}")
+
+import streamlit.testing.v1.app_test as app_test  # noqa: E402
+from streamlit.runtime.fragment import MemoryFragmentStorage  # noqa: E402
+from streamlit.runtime.scriptrunner import ScriptRunnerEvent  # noqa: E402
+from streamlit.runtime.scriptrunner_utils.script_requests import RerunData  # noqa: E402
+from streamlit.testing.v1 import AppTest  # noqa: E402
+from streamlit.testing.v1.element_tree import parse_tree_from_messages  # noqa: E402
+from streamlit.testing.v1.local_script_runner import LocalScriptRunner, require_widgets_deltas  # noqa: E402
+
+APP = "Cancer_app_smote_resample_rf.py"
+
+# (label, button to click); the defaults of the form widgets are submitted
+NAVIGATION = [
+    ("étape 0 -> 1", "Continuer"),
+    ("étape 1 -> 2", "Continuer"),
+    ("étape 2 -> 1 (Retour)", "⬅ Retour"),
+    ("étape 1 -> 2", "Continuer"),
+    ("étape 2 -> 3", "Continuer"),
+    ("étape 3 -> 4 (Calculer)", "Calculer"),
+    ("étape 4 -> 0 (Recommencer)", " Recommencer l'évaluation"),
+]
+
+
+class BrowserLikeRunner(LocalScriptRunner):
+    """LocalScriptRunner keeping the fragments across runs, rerunning one fragment when asked."""
+
+    fragment_storage = MemoryFragmentStorage()
+    fragment_id = None
+    executions = []
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._fragment_storage = self.fragment_storage
+        # One entry per script execution
+        self.runs = []
+        self.on_event.connect(self._record, weak=False)
+
+    def _record(self, sender, event, **kwargs):
+        now = time.perf_counter()
+        if event == ScriptRunnerEvent.SCRIPT_STARTED:
+            self.runs.append({"fragment": bool(kwargs.get("fragment_ids_this_run")), "messages": [],
+                              "start": now, "end": now})
+        elif self.runs and event == ScriptRunnerEvent.ENQUEUE_FORWARD_MSG:
+            self.runs[-1]["messages"].append(kwargs["forward_msg"])
+        elif self.runs and event.name.startswith("SCRIPT_STOPPED"):
+            self.runs[-1]["end"] = now
+
+    def run(self, widget_state=None, query_params=None, timeout=3, page_hash=""):
+        queue = [self.fragment_id] if self.fragment_id else []
+        self.request_rerun(RerunData(widget_states=widget_state, page_script_hash=page_hash, fragment_id_queue=queue))
+        if not self._script_thread:
+            self.start()
+        require_widgets_deltas(self, timeout)
+        BrowserLikeRunner.executions = self.runs
+        # After st.rerun(), only the elements of the last execution are on the page
+        # (the runner's own queue also keeps those of the interrupted one)
+        messages = self.runs[-1]["messages"]
+        BrowserLikeRunner.fragment_ids = {msg.delta.fragment_id for msg in messages
+                                          if msg.HasField("delta") and msg.delta.fragment_id}
+        return parse_tree_from_messages(messages)
+
+
+app_test.LocalScriptRunner = BrowserLikeRunner
+
+
+def navigate(fragments):
+    """Per navigation: fragment and whole-script executions, script ms, bytes sent; and the result bar."""
+    BrowserLikeRunner.fragment_id = None
+    at = AppTest.from_file(APP, default_timeout=60)
+    at.run()
+    (fragment_id,) = BrowserLikeRunner.fragment_ids
+    if fragments:
+        BrowserLikeRunner.fragment_id = fragment_id
+    rows, result = [], None
+    for label, button in NAVIGATION:
+        next(b for b in at.button if b.label == button).click()
+        at.run()
+        assert not at.exception, at.exception
+        runs = BrowserLikeRunner.executions
+        fragment_runs = sum(run["fragment"] for run in runs)
+        rows.append({"fragment": fragment_runs, "script": len(runs) - fragment_runs,
+                     "ms": sum(run["end"] - run["start"] for run in runs) * 1000,
+                     "bytes": sum(msg.ByteSize() for run in runs for msg in run["messages"])})
+        if button == "Calculer":
+            result = [m.value for m in at.markdown if "progress-bar-text" in m.value]
+    return rows, result
+
+
+if __name__ == "__main__":
+    logging.getLogger("streamlit.runtime.scriptrunner_utils.script_run_context").disabled = True
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    navigate(False)  # loads the model and the bundle once
+
+    runs = {mode: [navigate(mode == "fragment") for _ in range(repeat)] for mode in ("rerun complet", "fragment")}
+    assert runs["fragment"][0][1] == runs["rerun complet"][0][1], "page de résultat différente"
+    print(f"{'':<28}{'mode':>16}{'fragment / script':>19}{'ms (p50)':>10}{'octets':>9}")
+    for i, (label, _) in enumerate(NAVIGATION):
+        for mode, results in runs.items():
+            row = results[0][0][i]
+            ms = np.median([rows[i]["ms"] for rows, _ in results])
+            executions = f"{row['fragment']} / {row['script']}"
+            print(f"{label:<28}{mode:>16}{executions:>19}{ms:>10.1f}{row['bytes']:>9,}")
+            if mode == "fragment":
+                # Only the questionnaire reruns: no logo, stylesheet, header, model loading or footer
+                assert row["script"] == 0 and row["fragment"] >= 1, label
+            else:
+                assert row["fragment"] == 0, label
+    totals = {mode: np.median([sum(row["ms"] for row in rows) for rows, _ in results]) for mode, results in runs.items()}
+    print(f"\nparcours complet : {totals['rerun complet']:.0f} ms de script en reruns complets, "
+          f"{totals['fragment']:.0f} ms en fragments")
@@ -0,0 +1,75 @@
+# Training data loading: raw CSV vs typed Parquet (ingest.py)
+#
+# Each variant runs in a fresh interpreter and loads + balances a synthetic
+# HINTS-shaped extract (training columns plus unused survey columns):
+#   - csv (before): full pd.read_csv and per-class DataFrame copies
+#   - csv, usecols: model_resample.load_balanced on the CSV
+#   - parquet: model_resample.load_balanced on the Parquet dataset
+# Peak RSS is the child's VmHWM (ru_maxrss would include the parent's peak
+# inherited through fork). The balanced sample must be the same.
+#
+# Usage: python benchmarks/bench_ingest.py [rows]
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from _common import ROOT, random_hints_extract
+
+CHILD = r"""
+import json, sys, time
+sys.path.insert(0, {root!r})
+import pandas as pd
+import model_resample as m
+start = time.perf_counter()
+if {mode!r} == "before":
+    df = pd.read_csv({path!r})
+    cancer_oui = df[df['EverHadCancer'] == 1]
+    cancer_non = df[df['EverHadCancer'] == 0]
+    balanced_df = pd.concat([cancer_oui.sample(n={n}, random_state=142), cancer_non.sample(n={n}, random_state=142)])
+    balanced_df = balanced_df.sample(frac=1, random_state=142).reset_index(drop=True)
+    out = balanced_df[m.features_raw + [m.target]].dropna()
+else:
+    out = m.load_balanced({path!r}, None, {n})
+seconds = time.perf_counter() - start
+peak_kb = int(next(line for line in open("/proc/self/status") if line.startswith("VmHWM")).split()[1])
+print(json.dumps({{"seconds": seconds, "peak_rss_mb": peak_kb / 1024,
+                  "frame_mb": out.memory_usage(deep=True).sum() / 1e6,
+                  "checksum": float(out["BMI"].astype(float).sum() + out["Age"].astype(float).sum())}}))
+"""
+
+
+def run_child(mode, path, n):
+    out = subprocess.run([sys.executable, "-c", CHILD.format(root=ROOT, mode=mode, path=path, n=n)],
+                         capture_output=True, text=True, cwd=ROOT, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+if __name__ == "__main__":
+    n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 500_000
+    n_per_class = int(n_rows * 0.1)
+
+    from ingest import convert
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, "extract.csv")
+        parquet_path = os.path.join(tmp, "extract.parquet")
+        random_hints_extract(n_rows, 3).to_csv(csv_path, index=False)
+        start = time.perf_counter()
+        convert(csv_path, parquet_path)
+        print(f"{n_rows:,} lignes x {len(open(csv_path).readline().split(','))} colonnes; "
+              f"CSV {os.path.getsize(csv_path) / 1e6:.0f} MB, Parquet {os.path.getsize(parquet_path) / 1e6:.0f} MB "
+              f"(conversion {time.perf_counter() - start:.1f} s)\n")
+
+        print(f"{'chargement + équilibrage':<28}{'secondes':>10}{'pic RSS MB':>12}{'échantillon MB':>16}")
+        checksums = set()
+        for label, mode, path in [("csv (avant)", "before", csv_path), ("csv, usecols", "after", csv_path),
+                                  ("parquet typé", "after", parquet_path)]:
+            r = run_child(mode, path, n_per_class)
+            checksums.add(round(r["checksum"], 0))
+            print(f"{label:<28}{r['seconds']:>10.2f}{r['peak_rss_mb']:>12.0f}{r['frame_mb']:>16.2f}")
+        # float32 storage rounds BMI slightly; the rows drawn are the same
+        assert len(checksums) == 1, checksums
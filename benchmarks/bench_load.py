@@ -0,0 +1,266 @@
+# Load test of the Streamlit app: concurrent questionnaire sessions
+#
+# Starts the app with `streamlit run` (or targets a running one with --url)
+# and drives simulated users over the websocket, as the browser does: each
+# user opens a session, fills the form of steps 0-3 with random answers,
+# submits it as a rerun of the questionnaire fragment, reads the result page
+# (step 4), closes the session and starts a new one. Each step is timed from
+# the request to the end of the last script run it triggers, and checked
+# (expected form or result bar on the page, no exception).
+#
+# Users are added level by level (closed loop, --think seconds between
+# steps). Per level: latency percentiles of each step, throughput, and the
+# server's CPU and RSS, read from /proc (Linux; with --url, pass --pid).
+# Ends with the throughput at which the p99 of a step passes --p99-ms.
+#
+# Usage: python benchmarks/bench_load.py [--levels 1,2,4,8,16,32] [--duration 20] [--think 0] [--p99-ms 1000]
+#        python benchmarks/bench_load.py --url ws://localhost:8501 --pid <server pid>
+
+import argparse
+import asyncio
+import os
+import random
+import subprocess
+import sys
+import time
+
+import numpy as np
+from tornado.httpclient import HTTPClient
+from tornado.websocket import websocket_connect
+
+from _common import ROOT
+from bench_scoring_service import free_port
+
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.NumberInput_pb2 import NumberInput
+from streamlit.proto.WidgetStates_pb2 import WidgetStates
+
+APP = "Cancer_app_smote_resample_rf.py"
+STEPS = ["étape 0 (accueil)", "étape 0 -> 1", "étape 1 -> 2", "étape 2 -> 3", "étape 3 -> 4"]
+# Submit button of the form shown at steps 0-3
+SUBMIT = ["Continuer", "Continuer", "Continuer", "Calculer"]
+RESULT_MARKER = "progress-bar-text"
+
+
+def start_app(port):
+    process = subprocess.Popen(
+        [sys.executable, "-m", "streamlit", "run", APP, "--server.headless", "true",
+         "--server.port", str(port), "--server.fileWatcherType", "none",
+         "--browser.gatherUsageStats", "false"],
+        cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    client = HTTPClient()
+    for _ in range(300):
+        try:
+            client.fetch(f"http://127.0.0.1:{port}/_stcore/health")
+            return process
+        except (ConnectionError, OSError):
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError("L'application n'a pas démarré")
+
+
+def process_usage(pid):
+    """(CPU seconds, RSS in MB, peak RSS in MB) of a process, None where /proc is unavailable."""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        with open(f"/proc/{pid}/status") as f:
+            status = dict(line.split(":", 1) for line in f)
+    except OSError:
+        return None
+    cpu = (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+    return cpu, int(status["VmRSS"].split()[0]) / 1024, int(status["VmHWM"].split()[0]) / 1024
+
+
+class Session:
+    """One browser tab: its websocket and the elements it shows, by delta path."""
+
+    def __init__(self, ws):
+        self.ws = ws
+        self.page = {}
+        self.fragment_id = ""
+
+    @classmethod
+    async def open(cls, url):
+        return cls(await websocket_connect(f"{url}/_stcore/stream"))
+
+    def close(self):
+        self.ws.close()
+
+    async def rerun(self, widget_states=None, fragment_id=""):
+        """Send a rerun request and wait for the page of its last script run."""
+        msg = BackMsg()
+        msg.rerun_script.page_script_hash = ""
+        if widget_states is not None:
+            msg.rerun_script.widget_states.CopyFrom(widget_states)
+        msg.rerun_script.fragment_id = fragment_id
+        await self.ws.write_message(msg.SerializeToString(), binary=True)
+
+        fragments, sent = set(), {}
+        while True:
+            data = await self.ws.read_message()
+            if data is None:
+                raise ConnectionError("websocket fermé par le serveur")
+            fm = ForwardMsg()
+            fm.ParseFromString(data)
+            kind = fm.WhichOneof("type")
+            if kind == "new_session":
+                fragments, sent = set(fm.new_session.fragment_ids_this_run), {}
+            elif kind == "delta":
+                sent[tuple(fm.metadata.delta_path)] = fm
+                self.fragment_id = fm.delta.fragment_id or self.fragment_id
+            elif kind == "script_finished":
+                if fm.script_finished == ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                    continue  # st.rerun(): the next run redraws the page
+                if fm.script_finished == ForwardMsg.FINISHED_WITH_COMPILE_ERROR:
+                    raise RuntimeError("erreur de compilation du script")
+                # A full run replaces the page, a fragment run only its own elements
+                kept = {path: m for path, m in self.page.items() if fragments and m.delta.fragment_id not in fragments}
+                self.page = kept | sent
+                return
+
+    def elements(self):
+        for msg in self.page.values():
+            if msg.delta.WhichOneof("type") == "new_element":
+                yield msg.delta.new_element
+
+    def submit(self, label, rng):
+        """Random answers in the form of the `label` submit button, as the browser sends them."""
+        button = next(e.button for e in self.elements() if e.WhichOneof("type") == "button" and e.button.label == label)
+        states = WidgetStates()
+        for element in self.elements():
+            kind = element.WhichOneof("type")
+            widget = getattr(element, kind)
+            if getattr(widget, "form_id", None) != button.form_id or kind == "button":
+                continue
+            state = states.widgets.add(id=widget.id)
+            if kind == "radio":
+                state.int_value = rng.randrange(len(widget.options))
+            elif kind == "selectbox":
+                state.string_value = rng.choice(widget.options)
+            elif kind == "slider":  # st.select_slider
+                state.double_array_value.data.append(rng.randrange(len(widget.options)))
+            elif kind == "number_input" and widget.data_type == NumberInput.INT:
+                state.int_value = rng.randint(int(widget.min), int(widget.max))
+            elif kind == "number_input":
+                state.double_value = round(rng.uniform(widget.min, widget.max), 2)
+            elif kind == "text_input":
+                state.string_value = "Test"
+        states.widgets.add(id=button.id, trigger_value=True)
+        return states
+
+    def check(self, step):
+        """Error message if the page is not the one expected at `step`."""
+        elements = list(self.elements())
+        if any(e.WhichOneof("type") == "exception" for e in elements):
+            return "exception"
+        if step < len(SUBMIT):
+            found = any(e.WhichOneof("type") == "button" and e.button.label == SUBMIT[step] for e in elements)
+        else:
+            found = any(e.WhichOneof("type") == "markdown" and RESULT_MARKER in e.markdown.body for e in elements)
+        return None if found else f"{STEPS[step]} : page inattendue"
+
+
+async def user(url, deadline, think, seed, latencies, errors):
+    """Walk through the questionnaire again and again, at least once and until the deadline."""
+    rng = random.Random(seed)
+    while True:
+        start = time.perf_counter()
+        session = await Session.open(url)
+        try:
+            await session.rerun()
+            for step in range(len(STEPS)):
+                if step:
+                    await asyncio.sleep(rng.expovariate(1 / think) if think else 0)
+                    start = time.perf_counter()
+                    await session.rerun(session.submit(SUBMIT[step - 1], rng), session.fragment_id)
+                latencies[step].append(time.perf_counter() - start)
+                error = session.check(step)
+                if error:
+                    errors.append(error)
+                    break
+        except (ConnectionError, RuntimeError, StopIteration) as e:
+            errors.append(f"{type(e).__name__}: {e}")
+        finally:
+            session.close()
+        if time.perf_counter() >= deadline:
+            return
+
+
+async def run_level(url, users, duration, think, seed):
+    latencies, errors = [[] for _ in STEPS], []
+    deadline = time.perf_counter() + duration
+    await asyncio.gather(*(user(url, deadline, think, seed + i, latencies, errors) for i in range(users)))
+    return latencies, errors
+
+
+def measure(url, pid, users, duration, think, seed):
+    before, client, start = process_usage(pid), time.process_time(), time.perf_counter()
+    latencies, errors = asyncio.run(run_level(url, users, duration, think, seed))
+    elapsed = time.perf_counter() - start
+    after = process_usage(pid)
+    p99 = [np.percentile(s, 99) * 1000 if s else np.nan for s in latencies]
+    row = {"users": users, "steps_per_s": sum(map(len, latencies)) / elapsed,
+           "walks_per_s": len(latencies[-1]) / elapsed, "p50": [np.percentile(s, 50) * 1000 if s else np.nan
+                                                            for s in latencies],
+           "p99": p99, "worst_p99": max(p99), "errors": errors,
+           "client_cpu": (time.process_time() - client) / elapsed * 100}
+    if before and after:
+        row.update(cpu=(after[0] - before[0]) / elapsed * 100, rss=after[1], peak_rss=after[2])
+    return row
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Montée en charge de l'application Streamlit")
+    parser.add_argument("--levels", default="1,2,4,8,16,32", help="simultaneous sessions, level by level")
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds per level")
+    parser.add_argument("--think", type=float, default=0.0, help="mean pause between two steps (s, exponential)")
+    parser.add_argument("--p99-ms", type=float, default=1000.0, help="latency threshold of the p99 of each step")
+    parser.add_argument("--url", help="running app (ws://host:port); by default one is started on a free port")
+    parser.add_argument("--pid", type=int, help="server process for CPU / RSS when --url is given")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    process = None
+    if args.url:
+        url, pid = args.url.rstrip("/"), args.pid
+    else:
+        port = free_port()
+        process = start_app(port)
+        url, pid = f"ws://127.0.0.1:{port}", process.pid
+    try:
+        # Warm-up (one walk): model loading, compiled forest, explanations
+        measure(url, pid, 1, 0.0, 0.0, args.seed)
+
+        columns = "".join(f"{step.split(' (')[0]:>14}" for step in STEPS)
+        print(f"p50 / p99 ms par étape{'':<14}{columns}")
+        rows = []
+        for users in (int(level) for level in args.levels.split(",")):
+            row = measure(url, pid, users, args.duration, args.think, args.seed + 1000 * users)
+            rows.append(row)
+            cells = "".join(f"{f'{p50:.0f} / {p99:.0f}':>14}" for p50, p99 in zip(row["p50"], row["p99"]))
+            print(f"{users:>4} sessions, {row['steps_per_s']:>6.1f} étapes/s  {cells}")
+            usage = (f"CPU serveur {row['cpu']:.0f} %, RSS {row['rss']:.0f} Mo (pic {row['peak_rss']:.0f} Mo)"
+                     if "cpu" in row else "CPU / RSS du serveur indisponibles (--pid)")
+            print(f"{'':<10}{row['walks_per_s']:.2f} parcours/s, {usage}, CPU client {row['client_cpu']:.0f} %"
+                  + (f", ⚠️ {len(row['errors'])} erreurs ({row['errors'][0]})" if row["errors"] else ""))
+            if row["worst_p99"] > args.p99_ms:
+                break
+
+        print()
+        below = [row for row in rows if row["worst_p99"] <= args.p99_ms]
+        above = [row for row in rows if row["worst_p99"] > args.p99_ms]
+        if below:
+            best = below[-1]
+            print(f"✅ p99 <= {args.p99_ms:.0f} ms jusqu'à {best['users']} sessions simultanées "
+                  f"({best['steps_per_s']:.1f} étapes/s, {best['walks_per_s']:.2f} parcours/s)")
+        if above:
+            print(f"⚠️ p99 > {args.p99_ms:.0f} ms à partir de {above[0]['users']} sessions "
+                  f"({above[0]['steps_per_s']:.1f} étapes/s, p99 {above[0]['worst_p99']:.0f} ms)")
+        else:
+            print(f"seuil de {args.p99_ms:.0f} ms non atteint : augmenter --levels")
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
@@ -0,0 +1,44 @@
+# Cold start and memory: unpickling the pipeline vs opening the model bundle
+#
+# Each variant runs in a fresh interpreter, loads the model and scores one
+# questionnaire. RssAnon is private heap; RssFile is file-backed memory
+# (the mapped .npy arrays), shared by every process that maps the bundle.
+#
+# Usage: python benchmarks/bench_model_bundle.py
+
+import json
+import subprocess
+import sys
+
+from _common import ROOT
+
+CHILD = r"""
+import json, sys, time
+sys.path.insert(0, {root!r})
+start = time.perf_counter()
+if {mode!r} == "pickle":
+    from scoring import Scorer
+    from model_registry import ModelRegistry
+    scorer = ModelRegistry().derived("scorer", Scorer.from_pipeline)
+else:
+    from model_bundle import ModelBundle, BUNDLE_DIR
+    scorer = ModelBundle(BUNDLE_DIR).scorer
+loaded = time.perf_counter()
+from label_maps import raw_features_for_pipeline_input
+answers = dict(zip(raw_features_for_pipeline_input,
+                   [1, 2, 1, 5, 4, 3, 3, 0, 0, 1, "White", 27.5, 55, 7, 1, 2, 0, 2, 10, 0, 1, 0, 0, 0, 1, 0]))
+p = scorer.predict_proba_one(answers)[0][1]
+done = time.perf_counter()
+status = dict(line.split(":", 1) for line in open("/proc/self/status") if line.startswith("Rss"))
+print(json.dumps({{"load_ms": (loaded - start) * 1000, "first_prediction_ms": (done - loaded) * 1000,
+                   "proba": p, **{{k: v.strip() for k, v in status.items()}}}}))
+"""
+
+if __name__ == "__main__":
+    print(f"{'mode':<8}{'load ms':>10}{'1st pred ms':>13}{'RssAnon':>14}{'RssFile':>14}{'P(cancer)':>12}")
+    for mode in ("pickle", "bundle"):
+        out = subprocess.run([sys.executable, "-c", CHILD.format(root=ROOT, mode=mode)],
+                             capture_output=True, text=True, cwd=ROOT, check=True).stdout
+        r = json.loads(out.strip().splitlines()[-1])
+        print(f"{mode:<8}{r['load_ms']:>10.0f}{r['first_prediction_ms']:>13.1f}"
+              f"{r['RssAnon']:>14}{r['RssFile']:>14}{r['proba']:>12.6f}")
@@ -0,0 +1,62 @@
+# Compact forest (forest_engine.CompactForest, model_compaction.py): parity and size
+#
+# The compact forest must return the same leaves and bit-identical
+# probabilities as the compiled forest, including for inputs that sit on a
+# split threshold or on the float32 values just around it (where a
+# round-to-nearest float32 threshold would flip the decision). Then size and
+# latency of both, and of a forest distilled to 50 trees.
+#
+# Usage: python benchmarks/bench_model_compaction.py
+
+import warnings
+
+import numpy as np
+
+from _common import HEADER, format_row, random_raw_frame, time_calls
+
+from forest_engine import CompactForest
+from model_registry import registry
+from scoring import Scorer
+
+
+def threshold_rows(forest, plan, n_rows=2000, seed=0):
+    """Encoded rows where some features are set exactly on, and just around, split thresholds."""
+    rng = np.random.default_rng(seed)
+    X = plan.transform(random_raw_frame(n_rows, seed)).astype(np.float32)
+    internal = np.flatnonzero(np.asarray(forest.left) != np.arange(forest.n_nodes))
+    for row in X:
+        for node in rng.choice(internal, 10):
+            t = np.float32(forest.threshold[node])
+            row[forest.feature[node]] = rng.choice([np.nextafter(t, np.float32(-np.inf)), t,
+                                                    np.nextafter(t, np.float32(np.inf))])
+    return X
+
+
+if __name__ == "__main__":
+    warnings.filterwarnings("ignore", message="Found unknown categories")
+    pipeline, features = registry.get()
+    scorer = Scorer.from_pipeline(pipeline, features)
+    compiled = scorer.forest
+    compact = CompactForest.from_compiled(compiled)
+    unmerged = CompactForest.from_compiled(compiled, merge_leaves=False)
+
+    X = np.vstack([scorer.plan.transform(random_raw_frame(5000, seed=1)).astype(np.float32),
+                   threshold_rows(compiled, scorer.plan)])
+    expected = pipeline.named_steps["model"].predict_proba(X)[:, 1]
+    assert np.array_equal(compiled.predict_positive(X), expected)
+    assert np.array_equal(unmerged.apply(X), compiled.apply(X))
+    assert np.array_equal(compact.predict_positive(X), expected)
+    assert np.array_equal(compact.to_compiled().predict_positive(X), expected)
+    print(f"parité: {len(X):,} lignes (dont 2,000 sur/autour des seuils), probabilités identiques à sklearn")
+    print(f"noeuds {compiled.n_nodes:,} -> {compact.n_nodes:,} ; valeurs distinctes {len(compact.values):,} ; "
+          f"dtypes {compact.feature.dtype}/{compact.threshold.dtype}/{compact.children.dtype}/{compact.value_index.dtype}")
+
+    distilled = compact.select(50)
+    print(f"\n{'':<40}{'KB':>10}")
+    for label, forest in [("CompiledForest", compiled), ("CompactForest", compact), ("CompactForest, 50 arbres", distilled)]:
+        print(f"{label:<40}{forest.nbytes / 1024:>10.0f}")
+
+    print("\n" + HEADER)
+    for label, forest in [("CompiledForest", compiled), ("CompactForest", compact), ("CompactForest, 50 arbres", distilled)]:
+        print(format_row(f"{label}, 1 row", time_calls(lambda: forest.predict_positive(X[:1]), 1000)))
+        print(format_row(f"{label}, 1000 rows", time_calls(lambda: forest.predict_positive(X[:1000]), 20, 1)))
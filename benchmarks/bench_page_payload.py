@@ -0,0 +1,81 @@
+# Websocket payload and time-to-interactive of each step of the app
+#
+# Runs the app with AppTest, as a first visit and as a rerun of the same
+# session (what every widget interaction or button click triggers), and
+# sums the serialized size of the ForwardMsgs the script sends: the bytes
+# that go over the websocket. The time is the script run, from the rerun
+# request until the last element is sent (server side, no browser).
+# Both deliveries of theme.py: "component" (stylesheet once per session)
+# and "inline" (compiled stylesheet on every rerun).
+#
+# Usage: python benchmarks/bench_page_payload.py [repeat]
+
+import logging
+import os
+import sys
+import time
+
+import numpy as np
+
+from _common import STEP4_ANSWERS
+
+from streamlit.testing.v1 import AppTest
+from streamlit.testing.v1.local_script_runner import LocalScriptRunner
+from theme import THEME_DELIVERY_ENV, compiled_theme
+
+APP = "Cancer_app_smote_resample_rf.py"
+STEPS = range(5)
+
+sent = []
+_run = LocalScriptRunner.run
+
+
+def recording_run(self, *args, **kwargs):
+    tree = _run(self, *args, **kwargs)
+    sent.append([msg.SerializeToString() for msg in self.forward_msgs()])
+    return tree
+
+
+LocalScriptRunner.run = recording_run
+
+
+def measure(step, delivery, repeat):
+    """Bytes, message count and run times for a first visit and its reruns at `step`."""
+    os.environ[THEME_DELIVERY_ENV] = delivery
+    at = AppTest.from_file(APP, default_timeout=60)
+    at.session_state.step = step
+    at.session_state.inputs = dict(STEP4_ANSWERS)
+    rows = {}
+    for visit in ("premier affichage", "rerun"):
+        times = []
+        for _ in range(1 if visit == "premier affichage" else repeat):
+            start = time.perf_counter()
+            at.run()
+            times.append((time.perf_counter() - start) * 1000)
+            assert not at.exception, at.exception
+        messages = sent[-1]
+        rows[visit] = {"bytes": sum(map(len, messages)), "messages": len(messages),
+                       "ms": float(np.median(times)), "css": sum(css in m or version in m for m in messages)}
+    return rows
+
+
+if __name__ == "__main__":
+    logging.getLogger("streamlit.runtime.scriptrunner_utils.script_run_context").disabled = True
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    css, version = (value.encode() for value in compiled_theme())
+    measure(0, "component", 1)  # loads the model and the bundle once
+
+    print(f"{'':<12}{'étape':>6}{'visite':>20}{'octets':>10}{'messages':>10}{'ms (p50)':>10}")
+    totals = {}
+    for delivery in ("component", "inline"):
+        for step in STEPS:
+            for visit, row in measure(step, delivery, repeat).items():
+                print(f"{delivery:<12}{step:>6}{visit:>20}{row['bytes']:>10,}{row['messages']:>10}{row['ms']:>10.1f}")
+                totals[delivery, step, visit] = row
+    for step in STEPS:
+        # Component: the stylesheet goes out with the first visit only
+        assert totals["component", step, "premier affichage"]["css"] == 1
+        assert totals["component", step, "rerun"]["css"] == 0
+        assert totals["inline", step, "rerun"]["css"] == 1
+    saved = np.mean([totals["inline", s, "rerun"]["bytes"] - totals["component", s, "rerun"]["bytes"] for s in STEPS])
+    print(f"\nfeuille de style compilée : {len(css):,} octets ; économisés par rerun : {saved:,.0f} octets")
@@ -0,0 +1,54 @@
+# Scaling of batch_score.py over 1..N worker processes
+#
+# Both worker engines are measured: the shared memory-mapped forest and a
+# private sklearn model per worker. Speedups are relative to 1 worker of the
+# same engine; every run must produce exactly the same Parquet output as the
+# in-process run.
+#
+# Usage: python benchmarks/bench_parallel.py [rows] [max_workers]
+
+import os
+import sys
+import tempfile
+
+import pandas as pd
+
+from _common import random_raw_frame
+
+import batch_score
+from model_registry import ModelRegistry
+from scoring import Scorer
+
+if __name__ == "__main__":
+    n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 400_000
+    max_workers = int(sys.argv[2]) if len(sys.argv) > 2 else os.cpu_count()
+
+    registry = ModelRegistry()
+    scorer = registry.derived("scorer", Scorer.from_pipeline)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        forest_path = batch_score.shared_forest_file(registry, os.path.join(tmp, "forest.joblib"))
+        source = os.path.join(tmp, "input.parquet")
+        frame = random_raw_frame(n_rows, 42)
+        frame.insert(0, "id", range(n_rows))
+        frame.to_parquet(source)
+
+        print(f"{n_rows:,} rows, {os.cpu_count()} CPUs\n")
+        print(f"{'mode':<24}{'seconds':>10}{'rows/s':>12}{'speedup':>10}{'identical':>11}")
+        reference = None
+        baseline = None
+        runs = [(0, "forest")] + [(w, engine) for engine in ("forest", "sklearn") for w in range(1, max_workers + 1)]
+        for workers, engine in runs:
+            output = os.path.join(tmp, f"out_{engine}_{workers}.parquet")
+            stats = batch_score.run(source, output, chunk_size=25_000, id_column="id", scorer=scorer,
+                                    workers=workers, forest_path=forest_path, engine=engine,
+                                    log=lambda *_: None)
+            result = pd.read_parquet(output)
+            reference = result if reference is None else reference
+            if workers == 1:
+                baseline = stats["rows_per_second"]
+            label = "in-process" if workers == 0 else f"{workers} x {engine}"
+            speedup = f"{stats['rows_per_second'] / baseline:.2f}x" if workers else "-"
+            print(f"{label:<24}{stats['seconds']:>10.2f}{stats['rows_per_second']:>12,.0f}"
+                  f"{speedup:>10}{str(result.equals(reference)):>11}")
+            assert result.equals(reference), "output depends on the number of workers"
@@ -0,0 +1,63 @@
+# Prediction cache: hit rate, hit vs miss latency and memory footprint
+#
+# Simulates questionnaire submissions where a share of users resubmit
+# answers already seen (back-and-forth with "⬅ Retour", sometimes after
+# correcting their weight), with and without BMI rounding, and checks
+# cached probabilities against direct scoring.
+#
+# Usage: python benchmarks/bench_prediction_cache.py [submissions] [repeat_share]
+
+import sys
+import time
+
+import numpy as np
+
+from _common import HEADER, format_row, percentiles, random_raw_frame
+
+from model_bundle import load_scorer
+from prediction_cache import PredictionCache, cached_predict_proba_one
+
+if __name__ == "__main__":
+    n_submissions = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    repeat_share = float(sys.argv[2]) if len(sys.argv) > 2 else 0.3
+
+    scorer = load_scorer()
+    rng = np.random.default_rng(3)
+    unique = random_raw_frame(n_submissions, 11).to_dict("records")
+    # Each submission is either new or a resubmission of an earlier one;
+    # half of the resubmissions come back with the weight slightly corrected
+    stream, seen = [], []
+    for record in unique:
+        if seen and rng.random() < repeat_share:
+            record = seen[rng.integers(len(seen))]
+            if rng.random() < 0.5:
+                record = dict(record, BMI=round(record["BMI"] + rng.uniform(-0.2, 0.2), 2))
+            stream.append(record)
+        else:
+            stream.append(record)
+            seen.append(record)
+
+    print(f"{n_submissions:,} soumissions, {repeat_share:.0%} de re-soumissions\n")
+    for bmi_decimals in (None, 0):
+        cache = PredictionCache(max_entries=4096, bmi_decimals=bmi_decimals)
+        hit_times, miss_times = [], []
+        for record in stream:
+            hits = cache.hits
+            start = time.perf_counter()
+            p = cached_predict_proba_one(scorer, record, cache)[0][1]
+            elapsed = time.perf_counter() - start
+            (hit_times if cache.hits > hits else miss_times).append(elapsed)
+            if bmi_decimals is None:
+                assert p == scorer.predict_proba_one(record)[0][1]
+
+        stats = cache.stats()
+        print(f"BMI arrondi: {bmi_decimals}  taux de succès {stats['hit_rate']:.1%}  "
+              f"{stats['entries']} entrées  {stats['evictions']} évictions  {stats['memory_kb']:.0f} KB")
+        print(HEADER)
+        print(format_row("  succès (hit)", percentiles(hit_times)))
+        print(format_row("  échec (miss: encodage + 200 arbres)", percentiles(miss_times)))
+        print()
+
+    # A new model version empties the cache
+    cache.get_or_compute(np.zeros(3), "autre-modele", lambda: 0.5)
+    assert cache.stats()["entries"] == 1 and cache.invalidations == 1
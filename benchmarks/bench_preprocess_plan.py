@@ -0,0 +1,53 @@
+# Parity and latency of the preprocessing plan against the fitted ColumnTransformer
+#
+# Usage: python benchmarks/bench_preprocess_plan.py
+
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from _common import HEADER, RAW_FEATURES, format_row, random_raw_frame, time_calls
+from bench_forest_engine import parity_frames
+
+from model_registry import registry
+from scoring import Scorer
+
+if __name__ == "__main__":
+    warnings.filterwarnings("ignore", message="Found unknown categories")
+    pipeline, features = registry.get()
+    preprocess = pipeline.named_steps["preprocess"]
+    scorer = Scorer.from_pipeline(pipeline, features)
+    plan = scorer.plan
+
+    df = parity_frames()
+    expected = preprocess.transform(df)
+    vectorized = plan.transform(df)
+    rows = np.vstack([plan.encode_one(r) for r in df.head(5000).to_dict("records")])
+    print(f"Output columns match {len(features)} saved feature names: {plan.output_names == features}")
+    print(f"transform parity on {len(df):,} rows: {np.array_equal(expected, vectorized)}")
+    print(f"encode_one parity on 5,000 rows: {np.array_equal(expected[:5000], rows)}")
+    assert np.array_equal(expected, vectorized) and np.array_equal(expected[:5000], rows)
+
+    answers = random_raw_frame(1, 3).iloc[0].to_dict()
+    proba = pipeline.predict_proba(pd.DataFrame([answers]).reindex(columns=RAW_FEATURES))
+    assert np.allclose(proba, scorer.predict_proba_one(answers))
+
+    def app_path():
+        # What the step-4 block did before: one-row frame, reindex, full pipeline
+        df_form = pd.DataFrame([answers]).reindex(columns=RAW_FEATURES)
+        return pipeline.predict_proba(df_form)
+
+    def sklearn_preprocess():
+        return preprocess.transform(pd.DataFrame([answers]).reindex(columns=RAW_FEATURES))
+
+    out = np.zeros(plan.n_outputs)
+    print("\n" + HEADER)
+    print(format_row("DataFrame + ColumnTransformer, 1 row", time_calls(sklearn_preprocess, 200)))
+    print(format_row("plan.encode_one, 1 row", time_calls(lambda: plan.encode_one(answers, out), 5000)))
+    print(format_row("app path: DataFrame + pipeline", time_calls(app_path, 100)))
+    print(format_row("app path: scorer.predict_proba_one", time_calls(lambda: scorer.predict_proba_one(answers), 1000)))
+    for n in (1000, 100_000):
+        big = random_raw_frame(n, n)
+        print(format_row(f"ColumnTransformer.transform, {n} rows", time_calls(lambda: preprocess.transform(big), 5, 1)))
+        print(format_row(f"plan.transform, {n} rows", time_calls(lambda: plan.transform(big), 5, 1)))
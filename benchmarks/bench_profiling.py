@@ -0,0 +1,38 @@
+# Cost of the per-phase timers in profiling.py, disabled vs enabled
+#
+# One app rerun makes about a dozen lap() calls; this measures what they
+# add per rerun in both modes.
+#
+# Usage: python benchmarks/bench_profiling.py [reruns]
+
+import logging
+import sys
+import time
+
+from _common import ROOT  # noqa: F401  (puts the repo on sys.path)
+
+from profiling import Profiler, logger
+
+PHASES = ["logo", "css", "header", "model_load", "progress_bar", "mapping",
+          "predict", "result_html", "footer", "admin_panel"]
+
+
+def per_rerun_us(profiler, reruns):
+    start = time.perf_counter()
+    for _ in range(reruns):
+        timer = profiler.rerun(4)
+        for phase in PHASES:
+            timer.lap(phase)
+        timer.finish()
+    return (time.perf_counter() - start) / reruns * 1e6
+
+
+if __name__ == "__main__":
+    reruns = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    logger.addHandler(logging.NullHandler())
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+    print(f"{len(PHASES)} phases par exécution, {reruns:,} exécutions\n")
+    print(f"{'désactivé':<36}{per_rerun_us(Profiler(enabled=False), reruns):>10.2f} µs / exécution")
+    print(f"{'activé (fenêtres + log JSON)':<36}{per_rerun_us(Profiler(enabled=True), reruns):>10.2f} µs / exécution")
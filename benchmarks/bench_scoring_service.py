@@ -0,0 +1,105 @@
+# Load generator for scoring_service.py
+#
+# Starts the service in a subprocess for each batching setting, sends
+# requests from C concurrent clients and reports client-side latency
+# percentiles and throughput, plus the server's batch-size histogram.
+# Responses must match in-process scoring exactly.
+#
+# Usage: python benchmarks/bench_scoring_service.py [requests] [concurrency,...]
+
+import asyncio
+import json
+import socket
+import subprocess
+import sys
+import time
+
+import numpy as np
+from tornado.httpclient import AsyncHTTPClient, HTTPClient
+
+from _common import ROOT, random_raw_frame
+
+from model_bundle import load_scorer
+
+# (label, max_batch, max_wait_ms)
+SETTINGS = [
+    ("sans micro-batching", 1, 0.0),
+    ("lots <= 64, sans attente", 64, 0.0),
+    ("lots <= 64, 2 ms", 64, 2.0),
+    ("lots <= 128, 5 ms", 128, 5.0),
+]
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_service(port, max_batch, max_wait_ms):
+    process = subprocess.Popen(
+        [sys.executable, "scoring_service.py", "--port", str(port),
+         "--max-batch", str(max_batch), "--max-wait-ms", str(max_wait_ms)],
+        cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    client = HTTPClient()
+    for _ in range(300):
+        try:
+            client.fetch(f"http://127.0.0.1:{port}/health")
+            return process
+        except (ConnectionError, OSError):
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError("Le service n'a pas démarré")
+
+
+async def load(url, bodies, concurrency):
+    client = AsyncHTTPClient(max_clients=concurrency)
+    latencies = []
+    responses = [None] * len(bodies)
+    next_index = iter(range(len(bodies)))
+
+    async def user():
+        for i in next_index:
+            start = time.perf_counter()
+            response = await client.fetch(url, method="POST", body=bodies[i])
+            latencies.append(time.perf_counter() - start)
+            responses[i] = json.loads(response.body)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(user() for _ in range(concurrency)))
+    return np.asarray(latencies) * 1000, time.perf_counter() - start, responses
+
+
+if __name__ == "__main__":
+    n_requests = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    levels = [int(c) for c in sys.argv[2].split(",")] if len(sys.argv) > 2 else [1, 16, 64]
+
+    records = random_raw_frame(n_requests, 7).to_dict("records")
+    bodies = [json.dumps(r) for r in records]
+    scorer = load_scorer()
+    expected = [scorer.predict_proba_one(r)[0][1] for r in records]
+
+    print(f"{n_requests:,} requêtes par niveau de concurrence\n")
+    print(f"{'réglage':<26}{'clients':>8}{'p50 ms':>9}{'p99 ms':>9}{'req/s':>9}{'lot moyen':>11}  histogramme des lots")
+    for label, max_batch, max_wait_ms in SETTINGS:
+        port = free_port()
+        process = start_service(port, max_batch, max_wait_ms)
+        try:
+            for concurrency in levels:
+                before = json.loads(HTTPClient().fetch(f"http://127.0.0.1:{port}/metrics").body)
+                latencies, seconds, responses = asyncio.run(
+                    load(f"http://127.0.0.1:{port}/predict", bodies, concurrency))
+                after = json.loads(HTTPClient().fetch(f"http://127.0.0.1:{port}/metrics").body)
+
+                got = [r["probability"] for r in responses]
+                assert got == expected, "Les probabilités du service diffèrent du scoring en mémoire"
+                batches = after["batches"] - before["batches"]
+                histogram = {k: v - before["batch_size_histogram"].get(k, 0)
+                             for k, v in after["batch_size_histogram"].items()}
+                histogram = " ".join(f"{k}:{v}" for k, v in histogram.items() if v)
+                print(f"{label:<26}{concurrency:>8}{np.percentile(latencies, 50):>9.2f}"
+                      f"{np.percentile(latencies, 99):>9.2f}{n_requests / seconds:>9.0f}"
+                      f"{n_requests / batches:>11.1f}  {histogram}")
+        finally:
+            process.terminate()
+            process.wait()
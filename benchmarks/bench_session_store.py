@@ -0,0 +1,83 @@
+# Per-session answers: plain dict of labels vs session_store.CompactAnswers
+#
+# Random complete questionnaires (as the form widgets return them) must read
+# back identically from CompactAnswers and give the same pipeline features.
+# Memory: tracemalloc over 10,000 sessions in each representation, with the
+# label strings shared like the widgets' options are. Then the idle eviction
+# of the session registry on a simulated clock.
+#
+# Usage: python benchmarks/bench_session_store.py [sessions]
+
+import gc
+import sys
+import tracemalloc
+
+import numpy as np
+
+import _common  # noqa: F401  (repository root on sys.path)
+from codebook import answers_to_features
+from session_store import ANSWER_CODES, CompactAnswers, SessionRegistry, deep_sizeof
+
+INTEGER_RANGES = {"Age": (18, 120), "alcohol": (0, 500), "soleil": (0, 300), "sommeil_moy": (0, 24),
+                  "sport": (0, 7), "enfants": (0, 30), "foyer": (0, 30)}
+
+
+def random_answers(rng):
+    answers = {}
+    for key, labels in ANSWER_CODES.items():
+        if labels is not None:
+            answers[key] = labels[rng.integers(len(labels))]
+        else:
+            lo, hi = INTEGER_RANGES[key]
+            answers[key] = int(rng.integers(lo, hi + 1))
+    answers["sport"] = str(answers["sport"])
+    answers["poids"] = round(float(rng.uniform(30, 200)), 1)
+    answers["taille_m"] = round(float(rng.uniform(1.0, 2.4)), 2)
+    answers["prenom"] = "Camille"
+    return answers
+
+
+def traced_bytes(build):
+    gc.collect()
+    tracemalloc.start()
+    objects = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del objects
+    return current
+
+
+if __name__ == "__main__":
+    n_sessions = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    rng = np.random.default_rng(0)
+    questionnaires = [random_answers(rng) for _ in range(n_sessions)]
+
+    for answers in questionnaires[:2000]:
+        compact = CompactAnswers(answers)
+        assert dict(compact) == answers and compact == answers
+        assert answers_to_features(compact) == answers_to_features(answers)
+    print(f"parité: 2,000 questionnaires relus à l'identique, mêmes features pour le pipeline")
+
+    as_dicts = traced_bytes(lambda: [dict(a) for a in questionnaires])
+    as_compact = traced_bytes(lambda: [CompactAnswers(a) for a in questionnaires])
+    print(f"\n{'':<28}{'octets/session':>16}{'deep_sizeof':>14}")
+    print(f"{'dict de libellés':<28}{as_dicts / n_sessions:>16.0f}{deep_sizeof(dict(questionnaires[0])):>14}")
+    print(f"{'CompactAnswers':<28}{as_compact / n_sessions:>16.0f}{deep_sizeof(CompactAnswers(questionnaires[0])):>14}")
+
+    now = [0.0]
+    registry = SessionRegistry(idle_ttl_seconds=1800, clock=lambda: now[0])
+    live = [CompactAnswers(a) for a in questionnaires[:100]]
+    for i, answers in enumerate(live):
+        registry.track(f"session-{i}", answers, 4, deep_sizeof(answers))
+    now[0] = 1000.0
+    for i, answers in enumerate(live[:50]):
+        registry.track(f"session-{i}", answers, 4, deep_sizeof(answers))
+    now[0] = 2500.0
+    registry.sweep()
+    assert registry.evictions == 50 and all(a.evicted and len(a) == 0 for a in live[50:])
+    assert not any(a.evicted for a in live[:50])
+    del live[:10]
+    gc.collect()
+    registry.sweep()
+    print(f"\néviction: {registry.evictions} sessions inactives vidées, {registry.stats()['sessions']} suivies "
+          f"(les sessions disparues sont oubliées)")
@@ -0,0 +1,109 @@
+# Out-of-core training (streaming_training.py) vs the in-memory data stage
+#
+# On a synthetic HINTS-shaped extract written to CSV and Parquet:
+#   - the reservoirs draw each row with the same probability (inclusion
+#     frequencies over repeated draws stay close to n_per_class / rows);
+#   - the StandardScaler fitted chunk by chunk matches a fit on the whole column set;
+#   - peak RSS of the data stage, each variant in a fresh interpreter:
+#     model_resample.load_balanced (whole extract in memory) vs one chunked
+#     pass of StreamStats (reservoirs + partial_fit + categories).
+# The streaming peak must not grow with the extract; the in-memory one does.
+#
+# Usage: python benchmarks/bench_streaming_training.py [rows] [chunk_size]
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import StandardScaler
+
+from _common import ROOT, random_hints_extract
+
+CHILD = r"""
+import json, sys, time
+sys.path.insert(0, {root!r})
+start = time.perf_counter()
+if {mode!r} == "memory":
+    import model_resample as m
+    out = m.load_balanced({path!r}, None, {n})
+else:
+    import streaming_training as s
+    stats = s.StreamStats({n})
+    for chunk in s.iter_chunks({path!r}, {chunk_size}):
+        stats.update(chunk)
+    out = stats.balanced_sample()
+seconds = time.perf_counter() - start
+peak_kb = int(next(line for line in open("/proc/self/status") if line.startswith("VmHWM")).split()[1])
+print(json.dumps({{"seconds": seconds, "peak_rss_mb": peak_kb / 1024, "rows": len(out)}}))
+"""
+
+
+def run_child(mode, path, n, chunk_size):
+    code = CHILD.format(root=ROOT, mode=mode, path=path, n=n, chunk_size=chunk_size)
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, cwd=ROOT, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def check_uniformity(rows=2_000, size=200, chunk_size=137, draws=2_000):
+    """Inclusion frequency of every row over `draws` independent reservoirs."""
+    from streaming_training import Reservoir
+
+    counts = np.zeros(rows)
+    ids = np.arange(rows, dtype=np.float64)
+    for seed in range(draws):
+        reservoir = Reservoir(size, np.random.default_rng(seed))
+        for start in range(0, rows, chunk_size):
+            reservoir.add({"id": ids[start:start + chunk_size]})
+        assert len(np.unique(reservoir.columns["id"])) == size
+        counts[reservoir.columns["id"].astype(int)] += 1
+    freq = counts / draws
+    expected = size / rows
+    # Binomial standard error of one frequency; 5 sigma over 2000 rows
+    tolerance = 5 * np.sqrt(expected * (1 - expected) / draws)
+    print(f"uniformité: fréquence d'inclusion {freq.min():.4f}..{freq.max():.4f} (attendue {expected:.4f})")
+    assert np.abs(freq - expected).max() < tolerance
+    # First and last rows of the stream are not favoured
+    assert abs(freq[:rows // 2].mean() - freq[rows // 2:].mean()) < tolerance / 5
+
+
+def check_scaler(path, chunk_size):
+    from model_resample import continuous_vars
+    from streaming_training import StreamStats, iter_chunks
+
+    stats = StreamStats(100)
+    for chunk in iter_chunks(path, chunk_size):
+        stats.update(chunk)
+    full = StandardScaler().fit(pd.read_csv(path, usecols=continuous_vars)[continuous_vars])
+    assert np.allclose(stats.scaler.mean_, full.mean_) and np.allclose(stats.scaler.scale_, full.scale_)
+    print(f"scaler: partial_fit sur {stats.chunks} blocs = fit complet (écart max moyenne "
+          f"{np.abs(stats.scaler.mean_ - full.mean_).max():.1e})")
+
+
+if __name__ == "__main__":
+    n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    chunk_size = int(sys.argv[2]) if len(sys.argv) > 2 else 100_000
+    n_per_class = 1073
+
+    check_uniformity()
+
+    from ingest import convert
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, "extract.csv")
+        parquet_path = os.path.join(tmp, "extract.parquet")
+        random_hints_extract(n_rows, 5).to_csv(csv_path, index=False)
+        convert(csv_path, parquet_path)
+        check_scaler(csv_path, chunk_size)
+
+        print(f"\n{n_rows:,} lignes, {n_per_class} par classe, blocs de {chunk_size:,}")
+        print(f"{'étape des données':<28}{'secondes':>10}{'pic RSS MB':>12}{'lignes':>8}")
+        for label, mode, path in [("csv, en mémoire", "memory", csv_path), ("csv, par blocs", "streaming", csv_path),
+                                  ("parquet, en mémoire", "memory", parquet_path),
+                                  ("parquet, par blocs", "streaming", parquet_path)]:
+            r = run_child(mode, path, n_per_class, chunk_size)
+            assert r["rows"] == 2 * n_per_class
+            print(f"{label:<28}{r['seconds']:>10.2f}{r['peak_rss_mb']:>12.0f}{r['rows']:>8}")
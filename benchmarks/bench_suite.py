@@ -0,0 +1,218 @@
+# Benchmark suite: model load, preprocessing, inference, step-4 rendering, training
+#
+# Runs offline on the committed model and synthetic data, with fixed seeds:
+#   - load/*: joblib.load of the pickled pipeline
+#   - preprocess/*: fitted ColumnTransformer.transform on 1, 100 and 100k rows
+#   - predict_proba/*: the forest on encoded batches of 1, 100 and 10k rows,
+#     with n_jobs 1, 2 and -1
+#   - render/*: a full step-4 rerun (result page, prediction cache cleared)
+#     through Streamlit's AppTest
+#   - training/*: the stages of model_resample.py (load + balance, preprocess,
+#     SMOTE, forest fit, evaluation) on a synthetic extract with the HINTS schema
+# Every case is stored as p50/p90/p99/mean in ms and the number of samples (n),
+# with the commit, versions and machine, in a JSON file. --compare prints the
+# p50 ratio against an earlier file and exits with 1 above --threshold.
+#
+# Usage: python benchmarks/bench_suite.py [--quick] [--only load,render] [--output out.json]
+#        python benchmarks/bench_suite.py --compare benchmarks/results/<old>.json [--threshold 1.1]
+#        python benchmarks/bench_suite.py --compare old.json new.json
+
+import argparse
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+
+import numpy as np
+
+from _common import HEADER, ROOT, STEP4_ANSWERS, format_row, percentiles, random_hints_extract, random_raw_frame, time_calls
+
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+GROUPS = ("load", "preprocess", "predict_proba", "render", "training")
+MODEL_PATH = "modele_cancer_resample_rf.pkl"
+
+
+# --- Cases ---
+def bench_load(quick):
+    import joblib
+
+    return {"load/joblib_load": time_calls(lambda: joblib.load(MODEL_PATH), repeat=3 if quick else 10, warmup=1)}
+
+
+def bench_preprocess(quick):
+    import joblib
+
+    preprocess = joblib.load(MODEL_PATH).named_steps["preprocess"]
+    results = {}
+    for n_rows, repeat in [(1, 200), (100, 100), (100_000, 5)]:
+        df = random_raw_frame(n_rows, seed=1)
+        results[f"preprocess/transform_{n_rows}"] = time_calls(
+            lambda: preprocess.transform(df), repeat=max(2, repeat // 10) if quick else repeat, warmup=1)
+    return results
+
+
+def bench_predict_proba(quick):
+    import joblib
+
+    pipeline = joblib.load(MODEL_PATH)
+    model = pipeline.named_steps["model"]
+    encoded = pipeline.named_steps["preprocess"].transform(random_raw_frame(10_000, seed=2))
+    results = {}
+    for batch, repeat in [(1, 100), (100, 50), (10_000, 5)]:
+        X = encoded[:batch]
+        for n_jobs in (1, 2, -1):
+            model.n_jobs = n_jobs
+            results[f"predict_proba/batch_{batch}/n_jobs_{n_jobs}"] = time_calls(
+                lambda: model.predict_proba(X), repeat=max(2, repeat // 10) if quick else repeat, warmup=1)
+    model.n_jobs = None
+    return results
+
+
+def bench_render(quick):
+    from streamlit.testing.v1 import AppTest
+
+    from prediction_cache import prediction_cache
+
+    # AppTest runs outside a server: silence the "missing ScriptRunContext" warnings
+    logging.getLogger("streamlit.runtime.scriptrunner_utils.script_run_context").disabled = True
+
+    def rerun():
+        # Every rerun scores the answers instead of reading the process-wide cache
+        prediction_cache.clear()
+        at = AppTest.from_file("Cancer_app_smote_resample_rf.py", default_timeout=60)
+        at.session_state.step = 4
+        at.session_state.inputs = dict(STEP4_ANSWERS)
+        at.run()
+        assert not at.exception, at.exception
+
+    # The first rerun of the process loads the model and the assets
+    return {"render/step4": time_calls(rerun, repeat=3 if quick else 10, warmup=1)}
+
+
+def bench_training(quick):
+    import model_resample as m
+    from sklearn.model_selection import train_test_split
+
+    n_rows = 20_000 if quick else 200_000
+    n_per_class = 1073
+    results = {}
+
+    def stage(name, fn):
+        start = time.perf_counter()
+        out = fn()
+        results[f"training/{name}"] = percentiles([time.perf_counter() - start])
+        return out
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_path = os.path.join(tmp, "extract.csv")
+        random_hints_extract(n_rows, seed=4).to_csv(data_path, index=False)
+        df = stage("load_balanced", lambda: m.load_balanced(data_path, None, n_per_class))
+
+    X_train, X_test, y_train, y_test = train_test_split(
+        df[m.features_raw], df[m.target].astype(int), test_size=0.2, random_state=m.RANDOM_STATE)
+    pipeline = m.build_pipeline().set_params(model__n_jobs=1)
+    preprocess, smote, model = (pipeline.named_steps[s] for s in ("preprocess", "smote", "model"))
+    X_encoded = stage("preprocess_fit_transform", lambda: preprocess.fit_transform(X_train))
+    X_resampled, y_resampled = stage("smote", lambda: smote.fit_resample(X_encoded, y_train))
+    stage("forest_fit", lambda: model.fit(X_resampled, y_resampled))
+    stage("evaluate", lambda: pipeline.predict(X_test))
+    return results
+
+
+CASES = {"load": bench_load, "preprocess": bench_preprocess, "predict_proba": bench_predict_proba,
+         "render": bench_render, "training": bench_training}
+
+
+# --- Metadata and comparison ---
+def git(*args):
+    try:
+        return subprocess.run(["git", *args], capture_output=True, text=True, cwd=ROOT, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def metadata(quick):
+    import imblearn
+    import pandas
+    import sklearn
+    import streamlit
+
+    return {
+        "commit": git("rev-parse", "HEAD"),
+        "dirty": bool(git("status", "--porcelain", "--untracked-files=no")),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "quick": quick,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "versions": {"numpy": np.__version__, "pandas": pandas.__version__, "scikit-learn": sklearn.__version__,
+                     "imbalanced-learn": imblearn.__version__, "streamlit": streamlit.__version__},
+    }
+
+
+def compare(base, new, threshold):
+    """Print the p50 ratio of every case in both runs; return the regressed cases."""
+    print(f"{'':<40}{'avant ms':>10}{'après ms':>10}{'ratio':>8}")
+    regressions = []
+    for name in sorted(set(base["results"]) & set(new["results"])):
+        before, after = base["results"][name]["p50"], new["results"][name]["p50"]
+        ratio = after / before if before else float("inf")
+        flag = ""
+        if ratio > threshold:
+            regressions.append(name)
+            flag = "  ⚠️ régression"
+        print(f"{name:<40}{before:>10.3f}{after:>10.3f}{ratio:>8.2f}{flag}")
+    if base["meta"].get("cpu_count") != new["meta"].get("cpu_count") or base["meta"].get("quick") != new["meta"].get("quick"):
+        print("⚠️ Machines ou modes (--quick) différents : ratios indicatifs")
+    return regressions
+
+
+def run(groups, quick):
+    warnings.filterwarnings("ignore", message="Found unknown categories")
+    results = {}
+    print(HEADER)
+    for group in groups:
+        for name, stats in CASES[group](quick).items():
+            results[name] = stats
+            print(format_row(name, stats))
+    return {"meta": metadata(quick), "results": results}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reproducible offline benchmarks, saved as JSON.")
+    parser.add_argument("--quick", action="store_true", help="fewer repetitions and a smaller training set")
+    parser.add_argument("--only", default=",".join(GROUPS), help=f"comma-separated groups among {', '.join(GROUPS)}")
+    parser.add_argument("--output", help="JSON file (default: benchmarks/results/<commit>.json)")
+    parser.add_argument("--compare", nargs="+", metavar="JSON",
+                        help="earlier result file, and optionally a second one instead of a new run")
+    parser.add_argument("--threshold", type=float, default=1.10, help="p50 ratio reported as a regression")
+    args = parser.parse_args()
+
+    if args.compare and len(args.compare) == 2:
+        with open(args.compare[0]) as f_base, open(args.compare[1]) as f_new:
+            sys.exit(1 if compare(json.load(f_base), json.load(f_new), args.threshold) else 0)
+
+    groups = [g for g in args.only.split(",") if g]
+    unknown = set(groups) - set(GROUPS)
+    if unknown:
+        parser.error(f"groupes inconnus : {', '.join(sorted(unknown))}")
+    report = run(groups, args.quick)
+
+    output = args.output
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        suffix = "-dirty" if report["meta"]["dirty"] else ""
+        output = os.path.join(RESULTS_DIR, f"{(report['meta']['commit'] or 'nogit')[:12]}{suffix}.json")
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\n✅ Résultats enregistrés sous {output}")
+
+    if args.compare:
+        with open(args.compare[0]) as f:
+            print()
+            sys.exit(1 if compare(json.load(f), report, args.threshold) else 0)
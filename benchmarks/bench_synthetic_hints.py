@@ -0,0 +1,52 @@
+# Throughput and properties of the synthetic HINTS generator (synthetic_hints.py)
+#
+# Rows per second of the generation alone and of the CSV / Parquet writers,
+# then checks on 1M rows: the requested share of EverHadCancer is met, the
+# marginals match the tables of the module, and `correlation` drives the
+# dependence between answers (0: independent).
+#
+# Usage: python benchmarks/bench_synthetic_hints.py [rows]
+
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+import _common  # noqa: F401  (repository root on sys.path)
+import synthetic_hints as sh
+
+if __name__ == "__main__":
+    n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 5_000_000
+    sh.generate(1000)  # pilot calibration, cached
+
+    start = time.perf_counter()
+    table = sh.generate(1_000_000, seed=1)
+    print(f"{'génération (1M lignes, en mémoire)':<40}{1_000_000 / (time.perf_counter() - start):>14,.0f} lignes/s")
+    with tempfile.TemporaryDirectory() as tmp:
+        for extension in ("parquet", "csv"):
+            path = os.path.join(tmp, f"extract.{extension}")
+            start = time.perf_counter()
+            sh.write(path, n_rows)
+            seconds = time.perf_counter() - start
+            print(f"{f'écriture {extension} ({n_rows:,} lignes)':<40}{n_rows / seconds:>14,.0f} lignes/s"
+                  f"{os.path.getsize(path) / 1e6:>10.0f} MB")
+
+    df = table.to_pandas()
+    for col, (share, _) in sh.FLAGS.items():
+        assert abs(df[col].mean() - share) < 0.005, col
+    for col, (codes, probs, _) in sh.DISCRETE.items():
+        observed = df[col].value_counts(normalize=True).reindex(codes, fill_value=0).to_numpy()
+        assert np.abs(observed - np.asarray(probs) / sum(probs)).max() < 0.005, col
+    assert df["Age"].between(18, 120).all() and set(df["Birthcountry"].cat.categories) == set(sh.COUNTRIES)
+
+    print(f"\n{'positive_rate':>14}{'observé':>10}   {'correlation':>12}{'corr(revenu, études)':>22}{'corr(âge, cancer)':>19}")
+    for positive_rate, correlation in [(0.05, 0.5), (0.15, 0.0), (0.15, 0.5), (0.15, 1.0), (0.5, 0.5)]:
+        df = sh.generate_frame(1_000_000, seed=2, positive_rate=positive_rate, correlation=correlation)
+        observed = df["EverHadCancer"].mean()
+        ses = df["IncomeRanges"].corr(df["Education"])
+        age = df["Age"].corr(df["EverHadCancer"])
+        print(f"{positive_rate:>14.2f}{observed:>10.4f}   {correlation:>12.1f}{ses:>22.3f}{age:>19.3f}")
+        assert abs(observed - positive_rate) < 0.005
+        assert (abs(ses) < 0.005) if correlation == 0 else ses > 0.1
@@ -0,0 +1,62 @@
+# What-if simulator (what_if.py): parity and latency of the result-page panel
+#
+# Every variant scored by WhatIf must equal the scorer's prediction on the
+# modified answers. Timed: one variant, the full-range sweeps drawn by the
+# panel (171 weights, 101 drink counts), against the naive path of one
+# pipeline.predict_proba call per value.
+#
+# Usage: python benchmarks/bench_what_if.py
+
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from _common import HEADER, RAW_FEATURES, STEP4_ANSWERS, format_row, time_calls
+
+from codebook import answers_to_features
+from label_maps import compute_bmi
+from model_registry import registry
+from scoring import Scorer
+from what_if import WhatIf, changed_features
+
+if __name__ == "__main__":
+    warnings.filterwarnings("ignore", message="Found unknown categories")
+    pipeline, features = registry.get()
+    scorer = Scorer.from_pipeline(pipeline, features)
+    base = answers_to_features(STEP4_ANSWERS)
+    simulator = WhatIf(scorer, scorer.encode_one(base))
+
+    weights = np.arange(30.0, 201.0, 1.0)
+    bmis = [compute_bmi(p, STEP4_ANSWERS["taille_m"]) for p in weights]
+    drinks = np.arange(0, 501, 5)
+    changes = changed_features(base, answers_to_features({**STEP4_ANSWERS, "fumeur": "Jamais", "sport": "3"}))
+    assert changes == {"SmokeNow": 0, "TimesStrengthTraining": 3}
+
+    expected = [scorer.predict_proba_one({**base, **changes, "BMI": bmi})[0, 1] for bmi in bmis]
+    assert np.array_equal(simulator.sweep("BMI", bmis, changes), expected)
+    expected = [scorer.predict_proba_one({**base, **changes, "Drink_nb_PerMonth": d})[0, 1] for d in drinks]
+    assert np.array_equal(simulator.sweep("Drink_nb_PerMonth", drinks, changes), expected)
+    assert simulator.score(changes) == scorer.predict_proba_one({**base, **changes})[0, 1]
+    assert simulator.score({}) == scorer.predict_proba_one(base)[0, 1]
+    print(f"parité: balayages poids ({len(bmis)}) et alcool ({len(drinks)}) identiques au scorer\n")
+
+    def naive_sweep():
+        # One full pipeline call per slider value, as a plain predict_proba panel would do
+        for bmi in bmis:
+            pipeline.predict_proba(pd.DataFrame([{**base, **changes, "BMI": bmi}]).reindex(columns=RAW_FEATURES))
+
+    def panel():
+        # What one rerun of the panel computes: the simulated score and one curve
+        simulator.score(changes)
+        simulator.sweep("BMI", bmis, changes)
+
+    print(HEADER)
+    print(format_row("WhatIf.score, 1 variant", time_calls(lambda: simulator.score(changes), 500)))
+    print(format_row(f"sweep poids ({len(bmis)} valeurs)", time_calls(lambda: simulator.sweep("BMI", bmis, changes), 100)))
+    print(format_row(f"sweep alcool ({len(drinks)} valeurs)",
+                     time_calls(lambda: simulator.sweep("Drink_nb_PerMonth", drinks, changes), 100)))
+    stats = time_calls(panel, 100)
+    print(format_row("panneau (score + courbe)", stats))
+    print(format_row(f"naïf: {len(bmis)} x pipeline.predict_proba", time_calls(naive_sweep, 3, 1)))
+    assert stats["p50"] < 50, "le panneau dépasse 50 ms"
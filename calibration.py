@@ -0,0 +1,220 @@
+# Calibrated probabilities of the Random Forest
+#
+# The forest is trained on a 50/50 sample of the survey (load_balanced in
+# model_resample.py) that SMOTE balances again: its probabilities are vote
+# fractions at a ~50 % prior, neither calibrated nor at the population rate
+# of EverHadCancer. model_resample.py fits a monotone map on held-out rows of
+# the sample (isotonic regression, or Platt scaling), then moves it to the
+# population rate with the prior-shift correction of Saerens et al. (2002):
+# the odds are multiplied by (rate / (1 - rate)) / (sample_rate / (1 - sample_rate)).
+#
+# The result is exported as a lookup table of (raw, calibrated) breakpoints
+# (tens of points, prior shift applied to each, linear in between) in
+# data/calibration_cancer_resample_rf.json, tied to the
+# sha256 of the pickle it was fitted for. Scorer applies it after the forest
+# with np.interp, a binary search in the table: O(log n) per score, no
+# extra model call. The risk band limits of the result page (20 / 38 on the
+# raw score) are mapped through the same table and stored with it, as
+# calibrated probabilities: Scorer.risk_bands() compares the unrounded
+# calibrated probability with them, so a strictly increasing table (Platt)
+# keeps every user in the same band; isotonic plateaus can merge rows that
+# were on both sides of a limit (model_resample.py reports how many).
+#
+# Usage: load_calibration(source_sha256).apply(proba)
+
+import hashlib
+import json
+import os
+
+import numpy as np
+
+CALIBRATION_PATH = "data/calibration_cancer_resample_rf.json"
+METHODS = ("isotonic", "platt")
+# Points of the Platt table (the sigmoid is sampled on a regular grid of raw probabilities)
+PLATT_POINTS = 101
+
+
+def prior_shift(proba, sample_rate, target_rate):
+    """Probabilities estimated at sample_rate, moved to a population where the positive rate is target_rate."""
+    p = np.asarray(proba, dtype=np.float64)
+    positive = p * (target_rate / sample_rate)
+    negative = (1.0 - p) * ((1.0 - target_rate) / (1.0 - sample_rate))
+    return positive / (positive + negative)
+
+
+def population_weights(y, sample_rate, target_rate):
+    """Per-row weights that make a sample at sample_rate count as the population (for the metrics)."""
+    y = np.asarray(y)
+    return np.where(y == 1, target_rate / sample_rate, (1.0 - target_rate) / (1.0 - sample_rate))
+
+
+class Calibration:
+    """Monotone lookup table raw probability -> calibrated probability at the population rate."""
+
+    def __init__(self, raw, calibrated, method, sample_rate, target_rate, risk_limits=None, source_sha256=None):
+        self.raw = np.asarray(raw, dtype=np.float64)
+        self.calibrated = np.asarray(calibrated, dtype=np.float64)
+        self.method = method
+        self.sample_rate = sample_rate
+        self.target_rate = target_rate
+        self.risk_limits = tuple(risk_limits) if risk_limits is not None else None
+        self.source_sha256 = source_sha256
+
+    @classmethod
+    def fit(cls, proba, y, target_rate, method="isotonic"):
+        """Fit on held-out raw probabilities and labels of the balanced sample."""
+        proba = np.asarray(proba, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        if method == "isotonic":
+            from sklearn.isotonic import IsotonicRegression
+
+            iso = IsotonicRegression(y_min=0.0, y_max=1.0, out_of_bounds="clip").fit(proba, y)
+            # Breakpoints of the fitted step function; the ends are extended to 0 and 1
+            raw = np.concatenate([[0.0], iso.X_thresholds_, [1.0]])
+            fitted = np.concatenate([iso.y_thresholds_[:1], iso.y_thresholds_, iso.y_thresholds_[-1:]])
+            raw, index = np.unique(raw, return_index=True)
+            fitted = fitted[index]
+        elif method == "platt":
+            from sklearn.linear_model import LogisticRegression
+
+            platt = LogisticRegression(penalty=None).fit(proba[:, None], y)
+            raw = np.linspace(0.0, 1.0, PLATT_POINTS)
+            fitted = platt.predict_proba(raw[:, None])[:, 1]
+        else:
+            raise ValueError(f"Méthode de calibration inconnue : {method}")
+        sample_rate = float(y.mean())
+        return cls(raw, prior_shift(fitted, sample_rate, target_rate), method, sample_rate, target_rate)
+
+    def apply(self, proba):
+        """Calibrated probabilities, same shape as `proba`."""
+        return np.interp(proba, self.raw, self.calibrated)
+
+    def slope(self, proba):
+        """Local slope of the table (calibrated / raw) at raw probabilities.
+
+        Scales contributions measured in raw probability points (explanations.py)
+        to points of the calibrated probability.
+        """
+        slopes = np.diff(self.calibrated) / np.diff(self.raw)
+        return np.interp(proba, (self.raw[:-1] + self.raw[1:]) / 2, slopes)
+
+    def map_limits(self, limits):
+        """Risk band limits on the raw score (percent) -> limits on the calibrated probability.
+
+        A raw score is rounded to the percent: a limit of 20 keeps the
+        probabilities up to 0.205, whose calibrated image becomes the limit.
+        """
+        return tuple(float(self.apply((limit + 0.5) / 100)) for limit in limits)
+
+    def risk_bands(self, calibrated):
+        """0/1/2 for Faible/Modéré/Fort of calibrated probabilities, -1 where missing."""
+        calibrated = np.asarray(calibrated, dtype=np.float64)
+        low, moderate = self.risk_limits
+        codes = np.select([calibrated <= low, calibrated <= moderate], [0, 1], 2)
+        codes[np.isnan(calibrated)] = -1
+        return codes.astype(np.int8)
+
+    @property
+    def version(self):
+        """Short hash of the table (keys the prediction cache together with the model)."""
+        table = np.concatenate([self.raw, self.calibrated]).tobytes()
+        return hashlib.sha256(table).hexdigest()[:12]
+
+    def to_dict(self):
+        return {
+            "method": self.method,
+            "source_pickle_sha256": self.source_sha256,
+            "sample_rate": self.sample_rate,
+            "target_rate": self.target_rate,
+            "risk_limits": list(self.risk_limits) if self.risk_limits is not None else None,
+            "raw": self.raw.tolist(),
+            "calibrated": self.calibrated.tolist(),
+        }
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(d["raw"], d["calibrated"], d["method"], d["sample_rate"], d["target_rate"],
+                   d.get("risk_limits"), d.get("source_pickle_sha256"))
+
+    def save(self, path=CALIBRATION_PATH):
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=1)
+        os.replace(tmp, path)
+
+
+_mismatches = set()
+
+
+def load_calibration(source_sha256, path=CALIBRATION_PATH):
+    """The calibration fitted for the pickle with this sha256, or None (raw probabilities)."""
+    if source_sha256 is None or not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        calibration = Calibration.from_dict(json.load(f))
+    if calibration.source_sha256 != source_sha256:
+        # Once per table and model (the scorer is rebuilt on reloads)
+        if (path, calibration.source_sha256, source_sha256) not in _mismatches:
+            _mismatches.add((path, calibration.source_sha256, source_sha256))
+            print(f"⚠️ {path} n'a pas été ajustée pour ce modèle, probabilités non calibrées")
+        return None
+    return calibration
+
+
+# --- Evaluation ---
+def reliability_table(proba, y, weights=None, bins=10):
+    """Per bin of predicted probability: mean prediction, observed rate, weight of the bin."""
+    proba = np.asarray(proba, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    weights = np.ones_like(proba) if weights is None else np.asarray(weights, dtype=np.float64)
+    index = np.minimum((proba * bins).astype(int), bins - 1)
+    rows = []
+    for b in range(bins):
+        mask = index == b
+        w = weights[mask].sum()
+        if w == 0:
+            continue
+        rows.append({"bin": [b / bins, (b + 1) / bins], "predicted": float(np.average(proba[mask], weights=weights[mask])),
+                     "observed": float(np.average(y[mask], weights=weights[mask])), "weight": float(w / weights.sum())})
+    return rows
+
+
+def evaluate_calibration(raw, y, calibrations, bins=10):
+    """Brier score, mean probability and reliability of the raw and calibrated probabilities.
+
+    raw and y come from held-out rows of the balanced sample; they are
+    weighted to the population rate of the calibrations.
+    """
+    from sklearn.metrics import brier_score_loss
+
+    first = next(iter(calibrations.values()))
+    weights = population_weights(y, float(np.mean(y)), first.target_rate)
+    report = {}
+    for label, proba in [("brut", raw)] + [(name, c.apply(raw)) for name, c in calibrations.items()]:
+        report[label] = {
+            "brier": float(brier_score_loss(y, proba, sample_weight=weights)),
+            "mean_probability": float(np.average(proba, weights=weights)),
+            "reliability": reliability_table(proba, y, weights, bins),
+        }
+    return report
+
+
+def plot_reliability(report, path, show=False):
+    """Reliability diagram of evaluate_calibration()'s report, saved to `path`."""
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots(figsize=(6, 6))
+    ax.plot([0, 1], [0, 1], linestyle="--", color="gray", label="parfaitement calibré")
+    for label, metrics in report.items():
+        rows = metrics["reliability"]
+        ax.plot([r["predicted"] for r in rows], [r["observed"] for r in rows], marker="o",
+                label=f"{label} (Brier {metrics['brier']:.4f})")
+    ax.set_xlabel("Probabilité prédite")
+    ax.set_ylabel("Taux observé (pondéré au taux de la population)")
+    ax.set_title("Diagramme de fiabilité")
+    ax.legend()
+    fig.tight_layout()
+    fig.savefig(path)
+    if show:
+        plt.show()
+    plt.close(fig)
@@ -0,0 +1,149 @@
+# Compiled codebook of the questionnaire answers
+#
+# label_maps.py keeps the answer labels and their codes as readable dicts.
+# They are compiled here once, at import time, into:
+#   - one pandas CategoricalDtype per categorical answer (labels in dict order),
+#   - one flat float64 lookup table holding the codes of every numeric-coded
+#     answer, each field's slice preceded by a NaN slot for unknown labels,
+#   - an object table of the same layout for Birthcountry (string codes).
+# A table of answers is encoded column by column: pandas turns each answer
+# column into category positions, and one np.take over the table maps all
+# of them to codes. answers_to_features() (the app, one questionnaire) uses
+# the same table through a label -> position dict per field.
+#
+# check_plan() compares the codes the codebook produces with the categories
+# the fitted encoders saw (PreprocessPlan of the pickle or the bundle): a
+# code the OrdinalEncoder never saw is scored as unknown (-1), an unseen
+# one-hot category as all zeros. Mismatches are printed when the scorer is
+# built and after training (model_resample.py).
+#
+# Usage: answers_frame_to_features(df); answers_to_features(st.session_state.inputs)
+
+import numpy as np
+import pandas as pd
+
+from label_maps import ANSWER_FIELDS, compute_bmi, raw_features_for_pipeline_input
+
+# Answers looked up in the codebook: feature -> key in the questionnaire, labels in code-table order
+CATEGORICAL = {feature: (key, list(mapping)) for feature, (key, mapping) in ANSWER_FIELDS.items()
+               if mapping is not None}
+DTYPES = {feature: pd.CategoricalDtype(labels) for feature, (_, labels) in CATEGORICAL.items()}
+# feature -> codes in label order (the values of the label_maps dict)
+CODES = {feature: list(ANSWER_FIELDS[feature][1].values()) for feature in CATEGORICAL}
+STRING_CODED = ("Birthcountry",)
+NUMERIC_CODED = [feature for feature in CATEGORICAL if feature not in STRING_CODED]
+
+
+def _compile(features, dtype):
+    """Flat table [missing, codes of field 0, missing, codes of field 1, ...] and each field's first slot."""
+    table, offsets = [], []
+    for feature in features:
+        offsets.append(len(table))
+        table += [np.nan] + CODES[feature]
+    return np.array(table, dtype=dtype), np.array(offsets, dtype=np.intp)
+
+
+_TABLE, _OFFSETS = _compile(NUMERIC_CODED, np.float64)
+_STRING_TABLE, _STRING_OFFSETS = _compile(STRING_CODED, object)
+_POSITION = {feature: {label: i for i, label in enumerate(labels)} for feature, (_, labels) in CATEGORICAL.items()}
+
+
+def label_positions(feature, values):
+    """Position of each label in the codebook of `feature` (-1 for unknown or missing labels)."""
+    return pd.Categorical(values, dtype=DTYPES[feature]).codes
+
+
+def answers_to_features(data):
+    """Questionnaire answers (st.session_state.inputs) -> input dict for the pipeline."""
+    positions = np.array([_POSITION[feature].get(data[CATEGORICAL[feature][0]], -1) for feature in NUMERIC_CODED])
+    if (positions < 0).any():
+        unknown = [CATEGORICAL[f][0] for f, p in zip(NUMERIC_CODED, positions) if p < 0]
+        raise KeyError(f"Réponses inconnues du codebook : {unknown}")
+    codes = dict(zip(NUMERIC_CODED, _TABLE[_OFFSETS + 1 + positions].astype(np.int64).tolist()))
+
+    features = {"BMI": compute_bmi(data["poids"], data["taille_m"])}
+    for feature, (key, mapping) in ANSWER_FIELDS.items():
+        if feature in codes:
+            features[feature] = codes[feature]
+        else:
+            features[feature] = data[key] if mapping is None else mapping[data[key]]
+    # select_slider returns the number of training days as a string
+    features["TimesStrengthTraining"] = int(features["TimesStrengthTraining"])
+    return features
+
+
+def answers_frame_to_features(df):
+    """Vectorized answers_to_features for a table with one questionnaire per row.
+
+    Columns already given as raw pipeline features (e.g. a pre-coded 'BMI' or
+    'SmokeNow') are used as is; the others are mapped from the French answer
+    columns. Unknown labels become NaN.
+    """
+    out, looked_up, frames = {}, {}, []
+    for feature in raw_features_for_pipeline_input:
+        if feature == "BMI":
+            if "BMI" in df.columns:
+                out[feature] = df["BMI"]
+            else:
+                taille = df["taille_m"].astype(float)
+                out[feature] = (df["poids"].astype(float) / taille ** 2).round(2).where(taille > 0, 0.0)
+            continue
+
+        key, mapping = ANSWER_FIELDS[feature]
+        if feature in df.columns and feature != key:
+            # Already coded under the pipeline's own column name
+            out[feature] = df[feature]
+            continue
+        column = df[key]
+        if mapping is not None and (pd.api.types.is_string_dtype(column.dtype) or isinstance(column.dtype, pd.CategoricalDtype)):
+            looked_up[feature] = label_positions(feature, column)
+        else:
+            out[feature] = pd.to_numeric(column, errors="coerce")
+
+    # All label columns -> codes in one gather per table, one row of codes per feature
+    for features, table, offsets in ((NUMERIC_CODED, _TABLE, _OFFSETS), (STRING_CODED, _STRING_TABLE, _STRING_OFFSETS)):
+        index = [i for i, feature in enumerate(features) if feature in looked_up]
+        if index:
+            positions = np.vstack([looked_up[features[i]] for i in index])
+            codes = table[offsets[index, None] + 1 + positions]
+            # The transpose is a view: the frame holds the codes as a single block
+            frames.append(pd.DataFrame(codes.T, index=df.index, columns=[features[i] for i in index], copy=False))
+    return pd.concat([pd.DataFrame(out, index=df.index), *frames], axis=1)[raw_features_for_pipeline_input]
+
+
+def check_plan(plan):
+    """Differences between the codebook and the categories of the fitted encoders, as messages."""
+    fitted = [(col, cats, "encodés comme inconnus (-1)") for col, _, _, cats, _ in plan.ordinal]
+    fitted += [(col, cats, "encodés comme des zéros") for col, _, cats, _ in plan.onehot]
+    messages = []
+    for col, cats, effect in fitted:
+        if col not in CODES:
+            continue
+        seen = set(cats.tolist())
+        produced = set(CODES[col])
+        unseen = sorted(produced - seen, key=str)
+        unused = sorted(seen - produced, key=str)
+        if unseen:
+            messages.append(f"{col} : {_format(unseen)} produits par le questionnaire mais absents de "
+                            f"l'entraînement, {effect}")
+        if unused:
+            messages.append(f"{col} : {_format(unused)} vus à l'entraînement mais jamais produits par le questionnaire")
+    return messages
+
+
+_reported = set()
+
+
+def report_plan_mismatches(plan):
+    """Print check_plan() once per process (the scorer is rebuilt on model reloads)."""
+    messages = tuple(check_plan(plan))
+    if messages and messages not in _reported:
+        _reported.add(messages)
+        print("⚠️ Le codebook (label_maps.py) ne correspond pas aux encodeurs du modèle :")
+        for message in messages:
+            print(f"   - {message}")
+    return list(messages)
+
+
+def _format(values):
+    return ", ".join(str(int(v)) if isinstance(v, float) and v.is_integer() else str(v) for v in values)
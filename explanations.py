@@ -0,0 +1,152 @@
+# Per-user explanations of the risk score
+#
+# Saabas path attribution on the compiled forest (forest_engine.py): along the
+# path of a row in a tree, every split moves the node value (probability of
+# the positive class) from the parent to the child, and that change is
+# credited to the split feature. Averaged over the trees, the contributions
+# add up exactly to prediction - base value, where the base value is the mean
+# root value (the training prior seen by the forest).
+#
+# The path structures are precomputed once per model, as flat node arrays next
+# to the forest ones: value change from the parent and parent split feature
+# of every node. An explanation is then the same level-by-level walk as the
+# prediction (all trees at once) plus one bincount, about a millisecond for
+# one row (benchmarks/bench_explanations.py). The 39 encoded outputs are
+# summed back onto the 26 raw questionnaire fields (the one-hot columns of
+# BirthSex and Birthcountry each form one field).
+#
+# With a calibration table (calibration.py), Scorer.explain_row() multiplies
+# the contributions by the table's local slope at the user's raw probability,
+# so the points shown are points of the calibrated score displayed next to them.
+# On a plateau of the table (isotonic regression) the slope is 0: no answer
+# moves the displayed score there, and top() lists no factor.
+#
+# TreeSHAP is not used: its path-dependent variant needs the training cover
+# of every node, which the compiled forest and the bundle do not store, and a
+# recursion per tree that does not vectorize across trees.
+#
+# Usage: scorer.explainer.explain_one(answers).top()
+
+import numpy as np
+
+# Below this calibration slope the score is flat at the user's probability
+FLAT_SCALE = 1e-6
+
+
+class Explanation:
+    """Contributions of the raw fields to one prediction (probability units).
+
+    scale: factor already applied to the contributions (the calibration's
+    local slope, see Explanation.calibrated); min_abs of top() is on the raw
+    contributions, so the same factors are listed, unless the slope is flat.
+    """
+
+    def __init__(self, base, proba, features, contributions, scale=1.0):
+        self.base = float(base)
+        self.proba = float(proba)
+        self.features = list(features)
+        self.contributions = np.asarray(contributions, dtype=np.float64)
+        self.scale = float(scale)
+
+    def calibrated(self, calibration):
+        """The same explanation in points of the calibrated probability (linear at this user's score)."""
+        slope = float(calibration.slope(self.proba))
+        return Explanation(calibration.apply(self.base), calibration.apply(self.proba), self.features,
+                           self.contributions * slope, self.scale * slope)
+
+    def top(self, n=3, min_abs=0.005):
+        """(raising, lowering): up to n (feature, contribution) pairs each, largest first."""
+        if self.scale < FLAT_SCALE:
+            return [], []
+        order = np.argsort(-np.abs(self.contributions), kind="stable")
+        raising, lowering = [], []
+        for i in order:
+            c = self.contributions[i]
+            if abs(c) / self.scale < min_abs:
+                break
+            side = raising if c > 0 else lowering
+            if len(side) < n:
+                side.append((self.features[i], float(c)))
+        return raising, lowering
+
+    def to_dict(self):
+        return {"base": self.base, "proba": self.proba, "scale": self.scale,
+                "contributions": dict(zip(self.features, self.contributions.tolist()))}
+
+
+class ForestExplainer:
+    """Saabas contributions for a CompiledForest and its PreprocessPlan.
+
+    delta: value of each node minus the value of its parent (0 at the roots).
+    split_feature: feature of the parent split that leads to each node.
+    raw_index: raw field of each encoded output column, and the matching
+        0/1 aggregation matrix (n_encoded, n_raw).
+    """
+
+    def __init__(self, forest, plan):
+        self.forest = forest
+        self.plan = plan
+
+        n_nodes = forest.n_nodes
+        ids = np.arange(n_nodes, dtype=np.int32)
+        left, right = np.asarray(forest.left), np.asarray(forest.right)
+        internal = left != ids
+        parent = np.full(n_nodes, -1, dtype=np.int32)
+        parent[left[internal]] = ids[internal]
+        parent[right[internal]] = ids[internal]
+        has_parent = parent >= 0
+
+        value = np.asarray(forest.value)
+        self.delta = np.where(has_parent, value - value[parent], 0.0)
+        self.split_feature = np.where(has_parent, np.asarray(forest.feature)[parent], 0).astype(np.intp)
+        self.base = float(np.take(value, forest.roots).mean())
+
+        sources = plan.output_sources()
+        self.raw_features = list(plan.input_features)
+        self.raw_index = np.array([self.raw_features.index(s) for s in sources], dtype=np.intp)
+        self.aggregate = np.zeros((len(sources), len(self.raw_features)))
+        self.aggregate[np.arange(len(sources)), self.raw_index] = 1.0
+
+    @classmethod
+    def from_scorer(cls, scorer):
+        forest = scorer.forest
+        # A CompactForest (model_compaction.py) is expanded: the walk below needs global node indices
+        if hasattr(forest, "to_compiled"):
+            forest = forest.to_compiled()
+        return cls(forest, scorer.plan)
+
+    def explain_encoded(self, X):
+        """Probabilities (n_rows,) and contributions (n_rows, n_encoded) of encoded rows."""
+        forest = self.forest
+        X = forest._as_matrix(X)
+        n_rows, n_features = X.shape
+        flat = X.ravel()
+        row_offset = (np.arange(n_rows, dtype=np.intp) * n_features)[:, None]
+        nodes = np.repeat(forest.roots[None, :], n_rows, axis=0)
+        targets, weights = [], []
+        for _ in range(forest.max_depth):
+            values = np.take(flat, row_offset + np.take(forest.feature, nodes))
+            go_right = values > np.take(forest.threshold, nodes)
+            moved = np.take(forest.children, 2 * nodes + go_right)
+            # Rows parked on a leaf point to themselves: no split, no contribution
+            step = moved != nodes
+            targets.append((row_offset + np.take(self.split_feature, moved))[step])
+            weights.append(np.take(self.delta, moved)[step])
+            nodes = moved
+        contributions = np.bincount(np.concatenate(targets), weights=np.concatenate(weights),
+                                    minlength=n_rows * n_features).reshape(n_rows, n_features)
+        contributions /= forest.n_trees
+        # Same summation as CompiledForest.predict_positive: the probability is bit-identical
+        proba = np.cumsum(np.take(forest.value, nodes), axis=1)[:, -1] / forest.n_trees
+        return proba, contributions
+
+    def to_raw(self, contributions):
+        """Sum encoded contributions (n_rows, n_encoded) onto the raw fields (n_rows, n_raw)."""
+        return np.atleast_2d(contributions) @ self.aggregate
+
+    def explain_row(self, row):
+        proba, contributions = self.explain_encoded(row)
+        return Explanation(self.base, proba[0], self.raw_features, self.to_raw(contributions)[0])
+
+    def explain_one(self, answers):
+        return self.explain_row(self.plan.encode_one(answers))
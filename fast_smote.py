@@ -0,0 +1,91 @@
+# SMOTE oversampling stage for large training sets
+#
+# Drop-in replacement for imblearn's SMOTE in the training Pipeline
+# (same 'smote' slot, same fit_resample / sampling_strategy API):
+#   - neighbours are only queried for the rows actually drawn as SMOTE seeds,
+#     with a configurable index (algorithm: 'auto', 'kd_tree', 'ball_tree',
+#     'brute') and parallel queries (n_jobs);
+#   - synthetic rows are generated in chunks of chunk_size, straight into a
+#     preallocated output: no full-size temporaries and no final np.vstack copy;
+#   - the output is float32 by default, the dtype the Random Forest converts
+#     its input to (it then fits on it without another copy; the forest is the
+#     same as with the float64 output).
+# The random draws are imblearn's (seed rows, neighbour ranks and steps, per
+# class), so the synthetic rows are the same as SMOTE's as long as neighbours
+# at equal distance (frequent with one-hot and ordinal features) come in the
+# same order, which is the case with the brute-force search.
+#
+# Index choice: on the 39 encoded features the KD-tree and the ball tree are
+# 10 to 17 times slower than the brute-force search (too many dimensions for
+# the tree pruning, benchmarks/bench_fast_smote.py), so 'auto' lets
+# scikit-learn pick, i.e. brute force here (chunked, bounded memory); the trees
+# pay off on low-dimensional inputs.
+#
+# Usage: Pipeline([..., ('smote', ChunkedSMOTE(random_state=142, n_jobs=-1)), ('model', ...)])
+#        python model_resample.py --smote chunked
+
+import numpy as np
+from scipy import sparse
+from sklearn.neighbors import NearestNeighbors
+from sklearn.utils import check_random_state
+
+from imblearn.over_sampling.base import BaseOverSampler
+
+
+class ChunkedSMOTE(BaseOverSampler):
+    """SMOTE with seed-only neighbour queries and chunked generation of the synthetic rows."""
+
+    def __init__(self, *, sampling_strategy="auto", random_state=None, k_neighbors=5, algorithm="auto",
+                 leaf_size=40, n_jobs=None, chunk_size=65_536, dtype=np.float32):
+        super().__init__(sampling_strategy=sampling_strategy)
+        self.random_state = random_state
+        self.k_neighbors = k_neighbors
+        self.algorithm = algorithm
+        self.leaf_size = leaf_size
+        self.n_jobs = n_jobs
+        self.chunk_size = chunk_size
+        self.dtype = dtype
+
+    def _draw(self, n_class, n_samples):
+        """Seed rows, neighbour ranks and steps, drawn as imblearn's SMOTE draws them."""
+        random_state = check_random_state(self.random_state)
+        samples_indices = random_state.randint(low=0, high=n_class * self.k_neighbors, size=n_samples)
+        steps = random_state.uniform(size=n_samples)[:, np.newaxis]
+        return np.floor_divide(samples_indices, self.k_neighbors), np.mod(samples_indices, self.k_neighbors), steps
+
+    def _neighbours(self, X_class, rows):
+        """k nearest neighbours (without the row itself) of each distinct seed row."""
+        seeds = np.unique(rows)
+        nn = NearestNeighbors(n_neighbors=self.k_neighbors + 1, algorithm=self.algorithm,
+                              leaf_size=self.leaf_size, n_jobs=self.n_jobs).fit(X_class)
+        nns = nn.kneighbors(X_class[seeds], return_distance=False)[:, 1:]
+        return seeds, nns
+
+    def _fit_resample(self, X, y):
+        if sparse.issparse(X):
+            raise TypeError("ChunkedSMOTE attend une matrice dense (sortie du ColumnTransformer)")
+        dtype = X.dtype if self.dtype is None else np.dtype(self.dtype)
+        n_new = sum(self.sampling_strategy_.values())
+        X_resampled = np.empty((X.shape[0] + n_new, X.shape[1]), dtype=dtype)
+        y_resampled = np.empty(X.shape[0] + n_new, dtype=y.dtype)
+        X_resampled[:X.shape[0]] = X
+        y_resampled[:X.shape[0]] = y
+
+        start = X.shape[0]
+        for class_sample, n_samples in self.sampling_strategy_.items():
+            if n_samples == 0:
+                continue
+            X_class = X[y == class_sample]
+            rows, cols, steps = self._draw(X_class.shape[0], n_samples)
+            seeds, nns = self._neighbours(X_class, rows)
+            neighbours = nns[np.searchsorted(seeds, rows), cols]
+
+            # Same arithmetic as imblearn (in the input dtype), one chunk at a time
+            for i in range(0, n_samples, self.chunk_size):
+                chunk = slice(i, min(i + self.chunk_size, n_samples))
+                seed_rows = X_class[rows[chunk]]
+                X_resampled[start + chunk.start:start + chunk.stop] = (
+                    seed_rows + steps[chunk] * (X_class[neighbours[chunk]] - seed_rows))
+            y_resampled[start:start + n_samples] = class_sample
+            start += n_samples
+        return X_resampled, y_resampled
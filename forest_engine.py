@@ -0,0 +1,346 @@
+# Flat NumPy inference engine for the trained RandomForest
+#
+# The 200 sklearn trees are concatenated into contiguous node arrays and all
+# trees are walked together, one depth level per NumPy step, for every row at
+# once. This removes the per-tree Python dispatch of RandomForestClassifier,
+# which dominates the latency of single-row scoring. For batches of more than
+# a few hundred rows sklearn's compiled tree loop is faster again, see
+# benchmarks/bench_forest_engine.py.
+#
+# The arrays can be saved to one uncompressed file and reopened with
+# mmap_mode="r", so that several worker processes share the same pages
+# instead of each holding a private copy of the forest.
+#
+# CompactForest holds the same trees in narrow dtypes (built offline by
+# model_compaction.py): float32 thresholds rounded so that every decision is
+# unchanged, uint8/uint16 feature and child indices local to each tree, and
+# node values as uint16 indices into a table of the distinct values.
+#
+# Usage: python forest_engine.py [model.pkl] [out.forest.joblib]
+
+import sys
+
+import joblib
+import numpy as np
+
+ARRAY_NAMES = ("feature", "threshold", "children", "value", "roots")
+COMPACT_ARRAY_NAMES = ("feature", "threshold", "children", "value_index", "values", "roots")
+DEFAULT_FOREST_PATH = "modele_cancer_resample_rf.forest.joblib"
+
+
+class CompiledForest:
+    """All trees of a fitted binary RandomForestClassifier as flat node arrays.
+
+    feature, threshold: split of each node.
+    children: left and right child of node i at 2*i and 2*i + 1, as global
+        node indices, so that one gather picks the branch. Leaves point to
+        themselves on both sides, so a row that reaches a leaf early simply
+        stays there.
+    value: probability of the positive class at each node (internal nodes
+        included, the explanation engine needs them).
+    roots: index of the root node of each tree.
+    """
+
+    format = "compiled"
+    array_names = ARRAY_NAMES
+
+    def __init__(self, feature, threshold, children, value, roots, max_depth, n_features, source_sha256=None):
+        self.feature = feature
+        self.threshold = threshold
+        self.children = children
+        self.value = value
+        self.roots = roots
+        self.max_depth = int(max_depth)
+        self.n_features = int(n_features)
+        # Hash of the pickle the forest was compiled from, to detect stale files
+        self.source_sha256 = source_sha256
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    @property
+    def n_nodes(self):
+        return len(self.feature)
+
+    @property
+    def left(self):
+        return self.children[0::2]
+
+    @property
+    def right(self):
+        return self.children[1::2]
+
+    @property
+    def nbytes(self):
+        return sum(getattr(self, name).nbytes for name in self.array_names)
+
+    @classmethod
+    def from_sklearn(cls, model):
+        if len(model.classes_) != 2:
+            raise ValueError("Only binary classifiers are supported")
+
+        features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+        offset = 0
+        max_depth = 0
+        for estimator in model.estimators_:
+            tree = estimator.tree_
+            n = tree.node_count
+            ids = np.arange(n)
+            is_leaf = tree.children_left == -1
+
+            counts = tree.value[:, 0, :]
+            proba = counts[:, 1] / counts.sum(axis=1)
+
+            features.append(np.where(is_leaf, 0, tree.feature))
+            thresholds.append(np.where(is_leaf, np.inf, tree.threshold))
+            lefts.append(np.where(is_leaf, ids, tree.children_left) + offset)
+            rights.append(np.where(is_leaf, ids, tree.children_right) + offset)
+            values.append(proba)
+            roots.append(offset)
+
+            offset += n
+            max_depth = max(max_depth, tree.max_depth)
+
+        children = np.empty(2 * offset, dtype=np.int32)
+        children[0::2] = np.concatenate(lefts)
+        children[1::2] = np.concatenate(rights)
+        return cls(
+            feature=np.concatenate(features).astype(np.int32),
+            threshold=np.concatenate(thresholds).astype(np.float64),
+            children=children,
+            value=np.concatenate(values).astype(np.float64),
+            roots=np.asarray(roots, dtype=np.int32),
+            max_depth=max_depth,
+            n_features=model.n_features_in_,
+        )
+
+    @classmethod
+    def from_pipeline(cls, pipeline, source_sha256=None):
+        forest = cls.from_sklearn(pipeline.named_steps["model"])
+        forest.source_sha256 = source_sha256
+        return forest
+
+    def _as_matrix(self, X):
+        # sklearn trees compare float32 inputs against float64 thresholds;
+        # casting the same way keeps the decisions bit-identical.
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X[None, :]
+        if X.shape[1] != self.n_features:
+            raise ValueError(f"Expected {self.n_features} features, got {X.shape[1]}")
+        return X
+
+    def apply(self, X, chunk_size=512):
+        """Leaf index reached in every tree, shape (n_rows, n_trees)."""
+        X = self._as_matrix(X)
+        n_rows = X.shape[0]
+        out = np.empty((n_rows, self.n_trees), dtype=np.int32)
+        children = self.children
+        for start in range(0, n_rows, chunk_size):
+            block = X[start:start + chunk_size]
+            flat = block.ravel()
+            row_offset = (np.arange(block.shape[0], dtype=np.intp) * self.n_features)[:, None]
+            nodes = np.repeat(self.roots[None, :], block.shape[0], axis=0)
+            # np.take is noticeably faster than fancy indexing for these 1-D gathers
+            for _ in range(self.max_depth):
+                values = np.take(flat, row_offset + np.take(self.feature, nodes))
+                go_right = values > np.take(self.threshold, nodes)
+                nodes = np.take(children, 2 * nodes + go_right)
+            out[start:start + block.shape[0]] = nodes
+        return out
+
+    def predict_positive(self, X):
+        """Probability of the positive class, shape (n_rows,)."""
+        leaf_values = np.take(self.value, self.apply(X))
+        # Sequential sum in tree order, then divide, exactly like
+        # RandomForestClassifier.predict_proba: results are bit-identical, so a
+        # score never lands on the other side of a rounding boundary
+        return np.cumsum(leaf_values, axis=1)[:, -1] / self.n_trees
+
+    def predict_proba(self, X):
+        p = self.predict_positive(X)
+        return np.column_stack([1.0 - p, p])
+
+    def save(self, path):
+        """Write all arrays to one uncompressed file (memory-mappable)."""
+        joblib.dump({
+            "max_depth": self.max_depth,
+            "n_features": self.n_features,
+            "source_sha256": self.source_sha256,
+            **{name: np.ascontiguousarray(getattr(self, name)) for name in self.array_names},
+        }, path)
+
+    @classmethod
+    def load(cls, path, mmap_mode=None):
+        """Reopen a saved forest; mmap_mode="r" shares the pages between processes."""
+        data = joblib.load(path, mmap_mode=mmap_mode)
+        return cls(**data)
+
+
+def _uint_dtype(max_value):
+    """Narrowest unsigned integer dtype holding max_value."""
+    for dtype in (np.uint8, np.uint16, np.uint32):
+        if max_value <= np.iinfo(dtype).max:
+            return dtype
+    return np.uint64
+
+
+def _float32_below(threshold):
+    """Largest float32 <= each float64 threshold.
+
+    Inputs are float32, so `x > t` and `x > _float32_below(t)` agree for every
+    input: rounding to nearest could move a threshold onto a training value.
+    """
+    t32 = threshold.astype(np.float32)
+    above = t32.astype(np.float64) > threshold
+    t32[above] = np.nextafter(t32[above], np.float32(-np.inf))
+    return t32
+
+
+class CompactForest:
+    """The trees of a CompiledForest in narrow dtypes, for a smaller artifact and footprint.
+
+    feature: split feature, uint8 (uint16 above 255 features).
+    threshold: float32, rounded down (decisions identical on float32 inputs).
+    children: left and right child at 2*i and 2*i + 1 as indices local to the
+        tree (uint16 up to 65535 nodes per tree); leaves point to themselves.
+    value_index, values: node value (positive-class probability) of node i
+        is values[value_index[i]]; nodes with the same class distribution
+        share one entry.
+    roots: global index of the root node of each tree (also the offset of
+        its local indices).
+    """
+
+    format = "compact"
+    array_names = COMPACT_ARRAY_NAMES
+
+    def __init__(self, feature, threshold, children, value_index, values, roots, max_depth, n_features,
+                 source_sha256=None):
+        self.feature = feature
+        self.threshold = threshold
+        self.children = children
+        self.value_index = value_index
+        self.values = values
+        self.roots = roots
+        self.max_depth = int(max_depth)
+        self.n_features = int(n_features)
+        self.source_sha256 = source_sha256
+
+    n_trees = CompiledForest.n_trees
+    n_nodes = CompiledForest.n_nodes
+    nbytes = CompiledForest.nbytes
+    _as_matrix = CompiledForest._as_matrix
+    predict_proba = CompiledForest.predict_proba
+    save = CompiledForest.save
+    load = CompiledForest.load
+
+    @classmethod
+    def from_compiled(cls, forest, merge_leaves=True):
+        """Narrow copy of a CompiledForest; merge_leaves turns a split whose two
+        children are leaves with the same class distribution into one leaf
+        (repeatedly, bottom-up), which leaves every prediction unchanged."""
+        n = forest.n_nodes
+        ids = np.arange(n)
+        left, right = np.asarray(forest.left), np.asarray(forest.right)
+        value = np.array(forest.value, dtype=np.float64)
+        leaf = left == ids
+        if merge_leaves:
+            # sklearn numbers children after their parent: one reverse pass is bottom-up
+            for node in np.flatnonzero(~leaf)[::-1]:
+                l, r = left[node], right[node]
+                if leaf[l] and leaf[r] and value[l] == value[r]:
+                    leaf[node] = True
+                    value[node] = value[l]
+
+        # Nodes still reachable from a root, renumbered in the same order
+        keep = np.zeros(n, dtype=bool)
+        keep[forest.roots] = True
+        for node in np.flatnonzero(~leaf):
+            if keep[node]:
+                keep[left[node]] = keep[right[node]] = True
+        new_id = np.cumsum(keep) - 1
+        roots = new_id[forest.roots]
+        tree_of_node = np.searchsorted(np.asarray(forest.roots), ids, side="right") - 1
+        base = roots[tree_of_node]
+
+        kept = np.flatnonzero(keep)
+        own = new_id[kept] - base[kept]
+        local_left = np.where(leaf[kept], own, new_id[left[kept]] - base[kept])
+        local_right = np.where(leaf[kept], own, new_id[right[kept]] - base[kept])
+        children = np.empty(2 * len(kept), dtype=_uint_dtype(max(local_left.max(), local_right.max())))
+        children[0::2] = local_left
+        children[1::2] = local_right
+
+        values, value_index = np.unique(value[kept], return_inverse=True)
+        feature = np.where(leaf[kept], 0, np.asarray(forest.feature)[kept])
+        threshold = np.where(leaf[kept], np.inf, np.asarray(forest.threshold)[kept])
+        return cls(
+            feature=feature.astype(_uint_dtype(max(forest.n_features - 1, 0))),
+            threshold=_float32_below(threshold),
+            children=children,
+            value_index=value_index.astype(_uint_dtype(len(values) - 1)),
+            values=values,
+            roots=roots.astype(np.int32),
+            max_depth=forest.max_depth,
+            n_features=forest.n_features,
+            source_sha256=forest.source_sha256,
+        )
+
+    def select(self, n_trees):
+        """The first n_trees trees (local indices need no rewriting)."""
+        end = self.roots[n_trees] if n_trees < self.n_trees else self.n_nodes
+        return type(self)(self.feature[:end], self.threshold[:end], self.children[:2 * end],
+                          self.value_index[:end], self.values, self.roots[:n_trees],
+                          self.max_depth, self.n_features, self.source_sha256)
+
+    def to_compiled(self):
+        """Equivalent CompiledForest (int32/float64 arrays), e.g. for the explanation engine."""
+        base = np.repeat(self.roots, np.diff(np.append(self.roots, self.n_nodes)))
+        return CompiledForest(
+            feature=self.feature.astype(np.int32),
+            threshold=self.threshold.astype(np.float64),
+            children=(self.children + np.repeat(base, 2)).astype(np.int32),
+            value=np.take(self.values, self.value_index),
+            roots=np.asarray(self.roots, dtype=np.int32),
+            max_depth=self.max_depth,
+            n_features=self.n_features,
+            source_sha256=self.source_sha256,
+        )
+
+    def apply(self, X, chunk_size=512):
+        """Global index of the leaf reached in every tree, shape (n_rows, n_trees)."""
+        X = self._as_matrix(X)
+        n_rows = X.shape[0]
+        out = np.empty((n_rows, self.n_trees), dtype=np.int32)
+        roots = np.asarray(self.roots, dtype=np.intp)[None, :]
+        for start in range(0, n_rows, chunk_size):
+            block = X[start:start + chunk_size]
+            flat = block.ravel()
+            row_offset = (np.arange(block.shape[0], dtype=np.intp) * self.n_features)[:, None]
+            nodes = np.repeat(roots, block.shape[0], axis=0)
+            for _ in range(self.max_depth):
+                values = np.take(flat, row_offset + np.take(self.feature, nodes))
+                go_right = values > np.take(self.threshold, nodes)
+                nodes = np.take(self.children, 2 * nodes + go_right) + roots
+            out[start:start + block.shape[0]] = nodes
+        return out
+
+    def leaf_values(self, X):
+        """Value of the leaf reached in every tree, shape (n_rows, n_trees)."""
+        return np.take(self.values, np.take(self.value_index, self.apply(X)))
+
+    def predict_positive(self, X):
+        # Same summation as CompiledForest.predict_positive (bit-identical results)
+        return np.cumsum(self.leaf_values(X), axis=1)[:, -1] / self.n_trees
+
+
+if __name__ == "__main__":
+    from model_registry import file_sha256
+
+    model_path = sys.argv[1] if len(sys.argv) > 1 else "modele_cancer_resample_rf.pkl"
+    out_path = sys.argv[2] if len(sys.argv) > 2 else DEFAULT_FOREST_PATH
+    forest = CompiledForest.from_pipeline(joblib.load(model_path), file_sha256(model_path))
+    forest.save(out_path)
+    print(f"✅ {forest.n_trees} arbres, {forest.n_nodes} noeuds, profondeur max {forest.max_depth} "
+          f"-> {out_path} ({forest.nbytes / 1024:.0f} KB)")
@@ -0,0 +1,80 @@
+# One-off conversion of the HINTS extract (CSV) to a typed Parquet dataset
+#
+# pd.read_csv infers float64/object for every column. The Parquet file stores
+# the columns used for training with a compact, explicit schema:
+#   - ordinal answers and Birthcountry: categorical (dictionary-encoded)
+#   - BirthSex, MedConditions_* and the other yes/no flags, EverHadCancer: Int8
+#     (nullable int8: missing answers stay missing until the training dropna)
+#   - continuous variables: float32
+# Other columns of the extract are kept as read. Training then loads only
+# the columns it needs (pd.read_parquet(columns=...)).
+# Parquet only restores dictionary (categorical) types for string columns:
+# the numeric ordinal columns come back as plain numbers and read_training()
+# re-applies the schema after loading.
+#
+# Usage: python ingest.py [data/df2.csv] [data/df2.parquet]
+
+import sys
+import time
+
+import pandas as pd
+
+from model_resample import (
+    DATA_PATH, binary_vars, birthsex_var, continuous_vars, ordinal_categorical_vars,
+    string_categorical_vars, target,
+)
+
+PARQUET_PATH = "data/df2.parquet"
+
+INT8_COLUMNS = birthsex_var + binary_vars + [target]
+FLOAT32_COLUMNS = continuous_vars
+CATEGORICAL_COLUMNS = ordinal_categorical_vars + string_categorical_vars
+
+
+def read_csv_dtypes():
+    """dtypes applied while parsing, before the categories are known."""
+    dtypes = {c: "Int8" for c in INT8_COLUMNS}
+    dtypes.update({c: "float32" for c in FLOAT32_COLUMNS})
+    dtypes.update({c: "float64" for c in ordinal_categorical_vars})
+    dtypes.update({c: "string" for c in string_categorical_vars})
+    return dtypes
+
+
+def apply_schema(df):
+    """Cast the training columns of a raw extract to the compact schema, in place."""
+    for column, dtype in read_csv_dtypes().items():
+        if column in df.columns and column not in CATEGORICAL_COLUMNS:
+            df[column] = df[column].astype(dtype)
+    for column in CATEGORICAL_COLUMNS:
+        if column in df.columns and not isinstance(df[column].dtype, pd.CategoricalDtype):
+            values = df[column]
+            if column in string_categorical_vars:
+                values = values.astype(object).where(values.notna(), None)
+            # Sorted categories: the same order the OrdinalEncoder/OneHotEncoder would infer
+            categories = sorted(values.dropna().unique().tolist())
+            df[column] = pd.Categorical(values, categories=categories)
+    return df
+
+
+def read_training(parquet_path, columns):
+    """Load `columns` of a dataset written by convert(), with the compact dtypes."""
+    return apply_schema(pd.read_parquet(parquet_path, columns=columns))
+
+
+def convert(csv_path=DATA_PATH, parquet_path=PARQUET_PATH):
+    header = pd.read_csv(csv_path, nrows=0).columns
+    dtypes = {c: d for c, d in read_csv_dtypes().items() if c in header}
+    df = pd.read_csv(csv_path, dtype=dtypes)
+    apply_schema(df)
+    df.to_parquet(parquet_path, index=False)
+    return df
+
+
+if __name__ == "__main__":
+    csv_path = sys.argv[1] if len(sys.argv) > 1 else DATA_PATH
+    parquet_path = sys.argv[2] if len(sys.argv) > 2 else PARQUET_PATH
+    start = time.perf_counter()
+    df = convert(csv_path, parquet_path)
+    memory_mb = df.memory_usage(deep=True).sum() / 1e6
+    print(f"✅ {len(df):,} lignes converties en {time.perf_counter() - start:.1f} s -> {parquet_path} "
+          f"({memory_mb:.1f} MB en mémoire)")
@@ -0,0 +1,196 @@
+# French questionnaire labels -> codes expected by the trained pipeline
+#
+# The dicts below are the single source of the labels and their codes: the
+# ordinal category lists are taken from them and codebook.py compiles them
+# into the lookup tables used by the app and by batch scoring.
+
+raw_features_for_pipeline_input = [
+    'SmokeNow', 'GeneralHealth', 'Nervous',
+    'IncomeRanges', 'Education', 'Fruit2', 'Vegetables2', 'CutSkipMeals2',
+    'DiffPayMedBills',
+    'BirthSex',
+    'Birthcountry',
+    'BMI', 'Age', 'SleepWeekdayHr', 'TimesSunburned',
+    'TimesStrengthTraining', 'ChildrenInHH', 'TotalHousehold', 'Drink_nb_PerMonth',
+    'MedConditions_Diabetes', 'MedConditions_HighBP', 'MedConditions_HeartCondition',
+    'MedConditions_LungDisease', 'MedConditions_Depression', 'FamilyEverHadCancer2',
+    'HealthLimits_Pain'
+]
+
+BirthSex_map = {"Ne souhaite pas répondre": 0, "Femme": 1, "Homme": 2}
+fumeur_num = {"Jamais": 0, "Quelques fois": 1, "Tous les jours": 2}
+stress_map = {"Très faible, je suis relax": 0, "Faible, quelques fois": 1, "Modéré, sous pression la moitié du temps": 2, "Élevé, stressé(e) tous les jours": 3}
+revenu_map = {
+    " 0 à 730€ mensuel": 1, "730€ à 1099€ mensuel": 2, "1100€ à 1469€ mensuel": 3,
+    "1470€ à 2569€ mensuel": 4, "2570€ à 3669€ mensuel": 5, "3670 à 5499€ mensuel": 6,
+    "5500€ à 7339€ mensuel": 7, "7340€ à 14669€ mensuel": 8, "14670€ mensuel et plus": 9
+}
+etude_map = {
+    "Primaire": 1, "Collège / brevet": 2, "Lycée / BAC": 3, "Universitaire : BTS / DUT / filière technique": 4,
+    "Universitaire : Licence / Maîtrise / DEUG": 5, "Universitaire : Master / DEA / DESS": 6,
+    "Doctorat ou plus": 7
+}
+bool_map = {"Oui": 1, "Non": 0}
+sante_general_map = {"Faible": 0, "Moyen": 1, "Bon": 2, "Très bon : On va danser ce soir ?": 3, "Excellent : Je pète la forme !": 4}
+fruits_map = {"0": 0, "1/2 portion ou moins": 1, "1/2 à 1 portion": 2, "1 à 2 portions": 3,
+              "2 à 3 portions": 4, "3 à 4 portions": 5, "plus de 4": 6}
+legumes_map = fruits_map
+diff_map = {"Jamais": 0, "Un peu": 1, "Souvent": 2}
+ethnie_map = { # change english to french
+    "Blanc": "White", "Noir Africain ou Noir Americain": "Black", "Indien Américain, Américain du nord": "AmerInd",
+    "Indien d'Asie": "AsInd", "Chinois": "Chinese", "Philippin": "Filipino", "Japonais": "Japanese",
+    "Coréen": "Korean", "Vietnamien": "Vietnamese", "Autre Asiatique": "OthAsian",
+    "Autre île du Pacifique": "OthPacIsl", "Autre origine": "Other"
+}
+
+# Answer lists of the ordinal questions, in code order
+smoke_categories = list(fumeur_num)
+sante_categories = list(sante_general_map)
+nervous_categories = list(stress_map)
+revenu_categories = list(revenu_map)
+etude_categories = list(etude_map)
+fruit_veg_categories = list(fruits_map)
+diff_med_categories = list(diff_map)
+cut_skip_categories = list(diff_map)
+
+ordinal_categories = [
+    smoke_categories,
+    sante_categories,
+    nervous_categories,
+    revenu_categories,
+    etude_categories,
+    fruit_veg_categories, # Fruit2
+    fruit_veg_categories, # Vegetables2
+    cut_skip_categories,
+    diff_med_categories
+]
+
+# Bounds of the numeric questions (same as the app's number inputs; BMI from 30-200 kg and 1.0-2.4 m)
+NUMERIC_RANGES = {
+    "BMI": (5.0, 200.0),
+    "Age": (18, 120),
+    "SleepWeekdayHr": (0, 24),
+    "TimesSunburned": (0, 300),
+    "TimesStrengthTraining": (0, 7),
+    "ChildrenInHH": (0, 30),
+    "TotalHousehold": (0, 30),
+    "Drink_nb_PerMonth": (0, 500),
+}
+
+# raw pipeline feature -> (key in st.session_state.inputs, mapping dict or None when numeric)
+# BMI is not in this table: it is computed from "poids" and "taille_m".
+ANSWER_FIELDS = {
+    "Age": ("Age", None),
+    "SmokeNow": ("fumeur", fumeur_num),
+    "BirthSex": ("BirthSex", BirthSex_map),
+    "SleepWeekdayHr": ("sommeil_moy", None),
+    "Nervous": ("nervous", stress_map),
+    "IncomeRanges": ("revenu", revenu_map),
+    "Education": ("etude", etude_map),
+    "MedConditions_Diabetes": ("diabete", bool_map),
+    "MedConditions_HighBP": ("hypertension", bool_map),
+    "MedConditions_HeartCondition": ("cardiaque", bool_map),
+    "MedConditions_LungDisease": ("poumon", bool_map),
+    "MedConditions_Depression": ("depression", bool_map),
+    "HealthLimits_Pain": ("douleur", bool_map),
+    "Fruit2": ("fruits", fruits_map),
+    "Vegetables2": ("legumes", legumes_map),
+    "TimesStrengthTraining": ("sport", None),
+    "Drink_nb_PerMonth": ("alcohol", None),
+    "ChildrenInHH": ("enfants", None),
+    "TotalHousehold": ("foyer", None),
+    "TimesSunburned": ("soleil", None),
+    "GeneralHealth": ("Sante_general", sante_general_map),
+    "Birthcountry": ("ethnie", ethnie_map),
+    "CutSkipMeals2": ("Skip_meal", diff_map),
+    "DiffPayMedBills": ("Diff_financiere", diff_map),
+    "FamilyEverHadCancer2": ("FamilyEverHadCancer2", bool_map),
+}
+
+
+# raw pipeline feature -> how the result page names it in the explanation of the score
+FEATURE_LABELS = {
+    "SmokeNow": "votre consommation de tabac",
+    "GeneralHealth": "votre état de santé général",
+    "Nervous": "votre niveau de stress",
+    "IncomeRanges": "vos revenus",
+    "Education": "votre niveau d'études",
+    "Fruit2": "votre consommation de fruits",
+    "Vegetables2": "votre consommation de légumes",
+    "CutSkipMeals2": "les repas sautés faute de moyens",
+    "DiffPayMedBills": "les difficultés à payer les frais médicaux",
+    "BirthSex": "votre sexe",
+    "Birthcountry": "votre origine",
+    "BMI": "votre IMC",
+    "Age": "votre âge",
+    "SleepWeekdayHr": "votre sommeil",
+    "TimesSunburned": "vos coups de soleil",
+    "TimesStrengthTraining": "votre activité physique",
+    "ChildrenInHH": "le nombre d'enfants du foyer",
+    "TotalHousehold": "la taille du foyer",
+    "Drink_nb_PerMonth": "votre consommation d'alcool",
+    "MedConditions_Diabetes": "le diabète",
+    "MedConditions_HighBP": "l'hypertension",
+    "MedConditions_HeartCondition": "une maladie cardiaque",
+    "MedConditions_LungDisease": "une maladie pulmonaire",
+    "MedConditions_Depression": "la dépression",
+    "FamilyEverHadCancer2": "vos antécédents familiaux de cancer",
+    "HealthLimits_Pain": "les douleurs qui vous limitent",
+}
+
+
+def compute_bmi(poids, taille_m):
+    return round(poids / (taille_m ** 2), 2) if taille_m > 0 else 0.0
+
+
+def missing_answer_columns(columns):
+    """Answer columns needed by codebook.answers_frame_to_features that a table lacks."""
+    columns = set(columns)
+    missing = []
+    for feature in raw_features_for_pipeline_input:
+        if feature in columns:
+            continue
+        if feature == "BMI":
+            missing += [c for c in ("poids", "taille_m") if c not in columns]
+        elif ANSWER_FIELDS[feature][0] not in columns:
+            missing.append(ANSWER_FIELDS[feature][0])
+    return missing
+
+
+def validate_raw_features(record, birthcountry_codes=()):
+    """Check one record keyed by raw pipeline features; returns (features, errors).
+
+    Categorical fields take either the app's French label or the code the
+    pipeline was trained on; numeric fields must lie within NUMERIC_RANGES.
+    birthcountry_codes adds the country codes known to the fitted encoder.
+    errors maps each invalid field to a message; features is None if any.
+    """
+    features, errors = {}, {}
+    for feature in raw_features_for_pipeline_input:
+        if feature not in record or record[feature] is None:
+            errors[feature] = "champ manquant"
+            continue
+        value = record[feature]
+
+        if feature in NUMERIC_RANGES:
+            low, high = NUMERIC_RANGES[feature]
+            if isinstance(value, bool) or not isinstance(value, (int, float)) or value != value:
+                errors[feature] = "nombre attendu"
+            elif not low <= value <= high:
+                errors[feature] = f"hors de l'intervalle [{low}, {high}]"
+            else:
+                features[feature] = value
+            continue
+
+        mapping = ANSWER_FIELDS[feature][1]
+        if feature == "Birthcountry":
+            codes = set(mapping.values()) | set(birthcountry_codes)
+        else:
+            codes = set(mapping.values())
+        if isinstance(value, str) and value in mapping:
+            features[feature] = mapping[value]
+        elif value in codes and not isinstance(value, bool):
+            features[feature] = value
+        else:
+            errors[feature] = f"valeur inconnue: {value!r}"
+    return (None if errors else features), errors
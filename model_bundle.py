@@ -0,0 +1,255 @@
+# Versioned model bundle: JSON manifest + raw .npy tree arrays
+#
+# modele_cancer_resample_rf.pkl can only be inspected by unpickling it, and
+# every process that loads it gets a private copy. The bundle stores the same
+# model as plain data:
+#
+#   modele_cancer_resample_rf.bundle/
+#       manifest.json   feature lists, category tables, scaler parameters,
+#                       risk thresholds, library versions, hashes
+#       forest/*.npy    node arrays of the compiled forest
+#
+# The manifest is read at open time; the .npy files are only opened, with
+# mmap_mode="r", the first time the forest is used. Several processes that
+# score with the same bundle share its pages through the OS page cache.
+#
+# Usage: python model_bundle.py [model.pkl] [out_dir]
+
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+from calibration import CALIBRATION_PATH, load_calibration
+from forest_engine import CompactForest, CompiledForest
+from model_registry import FEATURES_PATH, MODEL_PATH, file_sha256, file_signature
+from preprocess_plan import PreprocessPlan
+from scoring import LOW_RISK_MAX, MODERATE_RISK_MAX, RISK_BANDS, Scorer, get_scorer
+
+BUNDLE_FORMAT = "fightcancer-model-bundle"
+BUNDLE_VERSION = 1
+BUNDLE_DIR = "modele_cancer_resample_rf.bundle"
+MANIFEST = "manifest.json"
+
+
+def _array_sha256(array):
+    return hashlib.sha256(np.ascontiguousarray(array).tobytes()).hexdigest()
+
+
+def export_bundle(pipeline, out_dir=BUNDLE_DIR, features=None, source_sha256=None, data_path=None,
+                  forest=None, extra=None):
+    """Write the manifest and the forest arrays of a fitted pipeline to out_dir.
+
+    forest: the forest to store instead of the pipeline's own (e.g. a
+    CompactForest from model_compaction.py); extra: additional manifest entries.
+    """
+    import sklearn
+
+    plan = PreprocessPlan.from_pipeline(pipeline, features)
+    if forest is None:
+        forest = CompiledForest.from_pipeline(pipeline, source_sha256)
+    model = pipeline.named_steps["model"]
+
+    os.makedirs(os.path.join(out_dir, "forest"), exist_ok=True)
+    arrays = {}
+    for name in forest.array_names:
+        array = np.ascontiguousarray(getattr(forest, name))
+        filename = f"forest/{name}.npy"
+        np.save(os.path.join(out_dir, filename), array)
+        arrays[name] = {"file": filename, "dtype": array.dtype.str, "shape": list(array.shape),
+                        "sha256": _array_sha256(array)}
+
+    manifest = {
+        "format": BUNDLE_FORMAT,
+        "version": BUNDLE_VERSION,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "source_pickle_sha256": source_sha256,
+        "data_sha256": file_sha256(data_path) if data_path and os.path.exists(data_path) else None,
+        "versions": {"sklearn": sklearn.__version__, "numpy": np.__version__},
+        "features": {"raw": plan.input_features, "encoded": plan.output_names},
+        "preprocess": plan.to_dict(),
+        "model": {
+            "type": type(model).__name__,
+            "classes": [float(c) for c in model.classes_],
+            "params": {k: v for k, v in model.get_params().items()
+                       if isinstance(v, (int, float, str, bool, type(None)))},
+            "n_trees": forest.n_trees,
+            "n_nodes": forest.n_nodes,
+            "max_depth": forest.max_depth,
+            "n_features": forest.n_features,
+            "forest_format": forest.format,
+        },
+        "thresholds": {"low_risk_max": LOW_RISK_MAX, "moderate_risk_max": MODERATE_RISK_MAX,
+                       "bands": list(RISK_BANDS)},
+        "arrays": arrays,
+        **(extra or {}),
+    }
+    # Manifest last: a bundle without manifest is ignored by the loader
+    tmp = os.path.join(out_dir, MANIFEST + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, os.path.join(out_dir, MANIFEST))
+    return manifest
+
+
+# (bundle path, source sha256) whose calibration was ignored, warned about once
+_ignored_calibrations = set()
+
+
+class ModelBundle:
+    """An opened bundle; the forest and the plan are built on first access."""
+
+    def __init__(self, path, mmap_mode="r", calibration_path=CALIBRATION_PATH):
+        self.path = path
+        self.mmap_mode = mmap_mode
+        self.calibration_path = calibration_path
+        with open(os.path.join(path, MANIFEST), encoding="utf-8") as f:
+            self.manifest = json.load(f)
+        if self.manifest.get("format") != BUNDLE_FORMAT:
+            raise ValueError(f"{path} is not a model bundle")
+        if self.manifest.get("version") != BUNDLE_VERSION:
+            raise ValueError(f"Unsupported bundle version {self.manifest.get('version')} in {path}")
+        self._lock = threading.Lock()
+        self._forest = None
+        self._plan = None
+        self._scorer = None
+
+    @property
+    def source_sha256(self):
+        return self.manifest.get("source_pickle_sha256")
+
+    @property
+    def forest(self):
+        with self._lock:
+            if self._forest is None:
+                meta = self.manifest["model"]
+                arrays = {}
+                for name, info in self.manifest["arrays"].items():
+                    array = np.load(os.path.join(self.path, info["file"]), mmap_mode=self.mmap_mode)
+                    if array.dtype.str != info["dtype"] or list(array.shape) != info["shape"]:
+                        raise ValueError(f"Corrupted bundle array: {info['file']}")
+                    arrays[name] = array
+                forest_class = CompactForest if meta.get("forest_format") == CompactForest.format else CompiledForest
+                self._forest = forest_class(max_depth=meta["max_depth"], n_features=meta["n_features"],
+                                              source_sha256=self.source_sha256, **arrays)
+            return self._forest
+
+    @property
+    def plan(self):
+        with self._lock:
+            if self._plan is None:
+                self._plan = PreprocessPlan.from_dict(self.manifest["preprocess"])
+            return self._plan
+
+    @property
+    def calibration(self):
+        """Calibration table of the source pickle, None when the forest kept fewer trees."""
+        calibration = load_calibration(self.source_sha256, self.calibration_path)
+        trees = self.manifest.get("compaction", {}).get("trees")
+        if calibration is not None and trees and trees["after"] != trees["before"]:
+            # Fitted on the raw scores of the full forest: a distilled forest scores differently.
+            # Said once per bundle (the scorer is rebuilt on reloads)
+            if (self.path, self.source_sha256) not in _ignored_calibrations:
+                _ignored_calibrations.add((self.path, self.source_sha256))
+                print(f"⚠️ {self.path} keeps {trees['after']} of {trees['before']} trees, "
+                      "calibration of the full forest ignored")
+            return None
+        return calibration
+
+    @property
+    def scorer(self):
+        if self._scorer is None:
+            self._scorer = Scorer(self.plan, self.forest, model=None, calibration=self.calibration)
+        return self._scorer
+
+    def verify(self):
+        """Check every array against the hash recorded in the manifest."""
+        for name, info in self.manifest["arrays"].items():
+            if _array_sha256(getattr(self.forest, name)) != info["sha256"]:
+                raise ValueError(f"Checksum mismatch for {info['file']}")
+        return True
+
+
+class BundleLoader:
+    """Process-wide access to the bundle, reopened when manifest.json or the calibration table changes.
+
+    A bundle built from another pickle than the one next to it is considered
+    stale and ignored, so retraining without re-exporting falls back to the
+    pickle instead of serving an old model.
+    """
+
+    def __init__(self, path=BUNDLE_DIR, model_path=MODEL_PATH, calibration_path=CALIBRATION_PATH):
+        self.path = path
+        self.model_path = model_path
+        self.calibration_path = calibration_path
+        self._lock = threading.Lock()
+        self._signature = None
+        self._bundle = None
+        self._pickle_hash = (None, None)
+        self.open_time = 0.0
+
+    def _pickle_sha256(self):
+        # Rehash the pickle only when its stat signature changes
+        try:
+            st = os.stat(self.model_path)
+        except FileNotFoundError:
+            return None
+        signature = (st.st_mtime_ns, st.st_size)
+        if self._pickle_hash[0] != signature:
+            self._pickle_hash = (signature, file_sha256(self.model_path))
+        return self._pickle_hash[1]
+
+    def get(self):
+        """The current bundle, or None when there is no usable bundle."""
+        try:
+            st = os.stat(os.path.join(self.path, MANIFEST))
+        except FileNotFoundError:
+            return None
+        pickle_sha = self._pickle_sha256()
+        # The scorer reads the calibration table when built: a new table reopens the bundle
+        signature = (st.st_mtime_ns, st.st_size, pickle_sha, file_signature(self.calibration_path))
+        if signature == self._signature:
+            return self._bundle
+
+        with self._lock:
+            if signature != self._signature:
+                start = time.perf_counter()
+                bundle = ModelBundle(self.path, calibration_path=self.calibration_path)
+                if pickle_sha is not None and bundle.source_sha256 != pickle_sha:
+                    print(f"⚠️ {self.path} was not built from {self.model_path}, ignored")
+                    bundle = None
+                self.open_time = time.perf_counter() - start
+                self._bundle = bundle
+                self._signature = signature
+        return self._bundle
+
+
+bundle_loader = BundleLoader()
+
+
+def load_scorer():
+    """Scorer from the bundle when available, otherwise derived from the pickle."""
+    try:
+        bundle = bundle_loader.get()
+    except (OSError, ValueError, KeyError) as e:
+        print(f"⚠️ Model bundle unusable, falling back to the pickle: {e}")
+        bundle = None
+    if bundle is not None:
+        return bundle.scorer
+    return get_scorer()
+
+
+if __name__ == "__main__":
+    import joblib
+
+    model_path = sys.argv[1] if len(sys.argv) > 1 else MODEL_PATH
+    out_dir = sys.argv[2] if len(sys.argv) > 2 else BUNDLE_DIR
+    with open(FEATURES_PATH) as f:
+        features = [line.strip() for line in f if line.strip()]
+    manifest = export_bundle(joblib.load(model_path), out_dir, features, file_sha256(model_path))
+    size = sum(os.path.getsize(os.path.join(out_dir, a["file"])) for a in manifest["arrays"].values())
+    print(f"✅ Bundle écrit dans {out_dir} ({manifest['model']['n_trees']} arbres, {size / 1024:.0f} KB)")
@@ -0,0 +1,218 @@
+# Offline compaction of the trained Random Forest
+#
+# Rewrites the forest of modele_cancer_resample_rf.pkl as a CompactForest
+# (forest_engine.py): float32 thresholds, uint8 feature and uint16 child
+# indices, node values shared between nodes with the same class distribution,
+# and sibling leaves with the same distribution merged into their parent.
+# None of this changes a prediction. With --distill-tolerance, only the
+# first k trees are kept (the trees are bootstrap replicas, any k of them form
+# a smaller forest of the same model). k is the smallest number that, on one
+# half of the held-out split of model_resample.py, stays within the tolerance
+# of the full forest's accuracy, moves the probability by at most
+# --max-proba-drift on average and the risk band of at most --max-band-changes
+# of the rows: the app shows scores and bands, not a 0.5 decision. The drift
+# report uses the other half.
+#
+# The result is written as a model bundle (model_bundle.py) that the app can
+# serve in place of modele_cancer_resample_rf.bundle, and the report (sizes,
+# load time, latency, accuracy and probability drift on the held-out split)
+# in data/compaction_report_cancer_resample_rf.json.
+#
+# Usage: python model_compaction.py [--data data/df2.csv] [--distill-tolerance 0.01]
+#                                   [--out modele_cancer_resample_rf.compact.bundle]
+
+import argparse
+import json
+import os
+import time
+import warnings
+
+import joblib
+import numpy as np
+
+from forest_engine import CompactForest, CompiledForest
+from model_bundle import BUNDLE_DIR, ModelBundle, export_bundle
+from model_registry import FEATURES_PATH, MODEL_PATH, file_sha256
+from scoring import risk_band_codes, risk_score
+
+COMPACT_BUNDLE_DIR = "modele_cancer_resample_rf.compact.bundle"
+REPORT_PATH = "data/compaction_report_cancer_resample_rf.json"
+
+
+def distill(forest, X, y, tolerance, max_proba_drift, max_band_changes):
+    """Smallest number of leading trees that stays close to the full forest on (X, y).
+
+    Close: accuracy within `tolerance`, mean absolute probability change at
+    most `max_proba_drift`, share of rows changing risk band at most
+    `max_band_changes`. Returns the number of trees and, for every number of
+    trees, the accuracy, mean probability change and band change rate.
+    """
+    n_trees = np.arange(1, forest.n_trees + 1)
+    # Probability of the first k trees, summed in the order predict_positive uses
+    proba = np.cumsum(forest.leaf_values(X), axis=1) / n_trees
+    # predict_proba's argmax sends a tie to class 0
+    accuracy = ((proba > 0.5) == (np.asarray(y) == 1)[:, None]).mean(axis=0)
+    proba_drift = np.abs(proba - proba[:, -1:]).mean(axis=0)
+    bands = risk_band_codes(risk_score(proba))
+    band_changes = (bands != bands[:, -1:]).mean(axis=0)
+    kept = (accuracy >= accuracy[-1] - tolerance) & (proba_drift <= max_proba_drift) & (band_changes <= max_band_changes)
+    # The full forest always qualifies
+    return int(n_trees[kept][0]), {"accuracy": accuracy, "mean_abs_proba_diff": proba_drift,
+                                   "band_change_rate": band_changes}
+
+
+def drift(proba_before, proba_after, y):
+    """Accuracy and probability changes between two forests on the held-out split."""
+    y = np.asarray(y) == 1
+    diff = np.abs(proba_after - proba_before)
+    return {
+        "rows": len(y),
+        "accuracy_before": float(((proba_before > 0.5) == y).mean()),
+        "accuracy_after": float(((proba_after > 0.5) == y).mean()),
+        "max_abs_proba_diff": float(diff.max()),
+        "mean_abs_proba_diff": float(diff.mean()),
+        # Rows whose result page changes: displayed percentage, risk band
+        "score_changed": int((risk_score(proba_before) != risk_score(proba_after)).sum()),
+        "band_changed": int((risk_band_codes(risk_score(proba_before)) != risk_band_codes(risk_score(proba_after))).sum()),
+    }
+
+
+def best_ms(fn, repeat):
+    """Fastest of `repeat` calls, in ms."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def dir_size(path):
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+
+
+def held_out(data_path, n_per_class):
+    """Held-out split of model_resample.py cut in two halves, to select k and to report the drift.
+
+    (X_select, y_select, X_report, y_report), or None when the extract is missing.
+    """
+    import model_resample as m
+    from sklearn.model_selection import train_test_split
+
+    if not os.path.exists(data_path):
+        return None
+    _, X_test, _, y_test = m.split_train_test(m.load_balanced(data_path, None, n_per_class))
+    X_select, X_report, y_select, y_report = train_test_split(X_test, y_test, test_size=0.5, stratify=y_test,
+                                                              random_state=m.RANDOM_STATE)
+    return X_select, y_select, X_report, y_report
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Compact the trained forest into a smaller model bundle.")
+    parser.add_argument("--model", default=MODEL_PATH, help="trained pipeline (pickle)")
+    parser.add_argument("--data", default="data/df2.csv",
+                        help="training extract, for the held-out split of model_resample.py")
+    parser.add_argument("--n-per-class", type=int, default=1073, help="as in model_resample.py")
+    parser.add_argument("--no-merge", action="store_true", help="keep sibling leaves with the same distribution")
+    parser.add_argument("--distill-tolerance", type=float, default=None,
+                        help="keep the fewest leading trees losing at most this much held-out accuracy")
+    parser.add_argument("--max-proba-drift", type=float, default=0.01,
+                        help="with --distill-tolerance: mean absolute probability change allowed")
+    parser.add_argument("--max-band-changes", type=float, default=0.01,
+                        help="with --distill-tolerance: share of rows allowed to change risk band")
+    parser.add_argument("--out", default=COMPACT_BUNDLE_DIR,
+                        help=f"output bundle ({BUNDLE_DIR} to serve it from the app)")
+    parser.add_argument("--report", default=REPORT_PATH, help="JSON report")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    start = time.perf_counter()
+    pipeline = joblib.load(args.model)
+    pickle_load_ms = (time.perf_counter() - start) * 1000
+    with open(FEATURES_PATH) as f:
+        features = [line.strip() for line in f if line.strip()]
+    source_sha256 = file_sha256(args.model)
+    compiled = CompiledForest.from_pipeline(pipeline, source_sha256)
+    compact = CompactForest.from_compiled(compiled, merge_leaves=not args.no_merge)
+
+    split = held_out(args.data, args.n_per_class)
+    if split is None:
+        from model_resample import features_raw
+        from synthetic_hints import generate_frame
+
+        print(f"⚠️ '{args.data}' introuvable : pas de distillation ni de dérive, latences mesurées sur des lignes synthétiques")
+        # Synthetic birth countries the encoder has not seen encode as all zeros
+        warnings.filterwarnings("ignore", message="Found unknown categories")
+        X = pipeline.named_steps["preprocess"].transform(generate_frame(1000, seed=0)[features_raw])
+    else:
+        X_select, y_select, X_report, y_report = split
+        preprocess = pipeline.named_steps["preprocess"]
+        X = preprocess.transform(X_report)
+
+    report = {
+        "model": args.model,
+        "source_sha256": source_sha256,
+        "data": args.data if split is not None else None,
+        "merge_leaves": not args.no_merge,
+        "distill_tolerance": args.distill_tolerance,
+        "max_proba_drift": args.max_proba_drift,
+        "max_band_changes": args.max_band_changes,
+        "trees": {"before": compiled.n_trees, "after": compact.n_trees},
+    }
+    if args.distill_tolerance is not None and split is not None:
+        # k is chosen on the other half of the held-out split than the drift report
+        n_trees, by_n_trees = distill(compact, preprocess.transform(X_select), y_select, args.distill_tolerance,
+                                      args.max_proba_drift, args.max_band_changes)
+        compact = compact.select(n_trees)
+        report["trees"]["after"] = n_trees
+        report["selection_rows"] = len(y_select)
+        report["by_n_trees"] = {name: [round(float(v), 4) for v in values] for name, values in by_n_trees.items()}
+    report["nodes"] = {"before": compiled.n_nodes, "after": compact.n_nodes}
+
+    export_bundle(pipeline, args.out, features, source_sha256, data_path=args.data, forest=compact,
+                  extra={"compaction": {k: report[k] for k in ("merge_leaves", "distill_tolerance", "max_proba_drift",
+                                                     "max_band_changes", "trees", "nodes")}})
+
+    def open_and_score(path):
+        # What a new worker does: read the manifest, map the arrays, score one row
+        ModelBundle(path).scorer.predict_encoded(X[:1])
+
+    report["size_bytes"] = {"pickle": os.path.getsize(args.model), "compiled_arrays": compiled.nbytes,
+                            "compact_arrays": compact.nbytes, "compact_bundle": dir_size(args.out)}
+    report["load_ms"] = {"pickle": round(pickle_load_ms, 1), "compact_bundle": round(best_ms(lambda: open_and_score(args.out), 3), 1)}
+    if os.path.exists(os.path.join(BUNDLE_DIR, "manifest.json")):
+        report["size_bytes"]["bundle"] = dir_size(BUNDLE_DIR)
+        report["load_ms"]["bundle"] = round(best_ms(lambda: open_and_score(BUNDLE_DIR), 3), 1)
+
+    model = pipeline.named_steps["model"]
+    report["latency_ms"] = {
+        "sklearn_1_row": round(best_ms(lambda: model.predict_proba(X[:1]), 20), 3),
+        "compiled_1_row": round(best_ms(lambda: compiled.predict_positive(X[:1]), 200), 3),
+        "compact_1_row": round(best_ms(lambda: compact.predict_positive(X[:1]), 200), 3),
+        f"compiled_{len(X)}_rows": round(best_ms(lambda: compiled.predict_positive(X), 5), 3),
+        f"compact_{len(X)}_rows": round(best_ms(lambda: compact.predict_positive(X), 5), 3),
+    }
+    if split is not None:
+        report["held_out"] = drift(model.predict_proba(X)[:, 1], compact.predict_positive(X), y_report)
+
+    print(f"Arbres : {report['trees']['before']} -> {report['trees']['after']}, "
+          f"noeuds : {report['nodes']['before']:,} -> {report['nodes']['after']:,}")
+    for name, size in report["size_bytes"].items():
+        print(f"  taille {name:<18}{size / 1024:>10.0f} KB")
+    for name, ms in {**report["load_ms"], **report["latency_ms"]}.items():
+        print(f"  {name:<25}{ms:>10.3f} ms")
+    if split is not None:
+        d = report["held_out"]
+        print(f"Test ({d['rows']} lignes) : accuracy {d['accuracy_before']:.4f} -> {d['accuracy_after']:.4f}, "
+              f"|Δproba| max {d['max_abs_proba_diff']:.4f}, scores affichés modifiés : {d['score_changed']}, "
+              f"classes de risque modifiées : {d['band_changed']}")
+    with open(args.report, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"✅ Bundle compact écrit dans {args.out}, rapport sous {args.report}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
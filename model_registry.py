@@ -0,0 +1,154 @@
+# Process-wide model registry for the Streamlit cancer risk application
+#
+# Streamlit re-executes the whole app script on every interaction, but imported
+# modules stay in sys.modules. Keeping the registry here means the pipeline is
+# unpickled once per process and shared by every session.
+
+import hashlib
+import os
+import threading
+import time
+
+import joblib
+
+from calibration import CALIBRATION_PATH
+
+MODEL_PATH = "modele_cancer_resample_rf.pkl"
+FEATURES_PATH = "data/features_cancer_resample_rf.txt"
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def file_signature(path):
+    """(mtime, size) of a file, None when it does not exist."""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+class ModelRegistry:
+    """Loads the trained pipeline once and reloads it only when the pickle changes.
+
+    The pickle's (mtime, size) is checked on every access; the sha256 is only
+    recomputed when that stat signature moves, so a `touch` without new content
+    does not trigger an unpickle. The features file and the calibration table
+    are part of the signature: when one of them changes, the derived artifacts
+    (the scorer) are rebuilt without reloading the pipeline.
+    """
+
+    def __init__(self, model_path=MODEL_PATH, features_path=FEATURES_PATH, calibration_path=CALIBRATION_PATH):
+        self.model_path = model_path
+        self.features_path = features_path
+        self.calibration_path = calibration_path
+        self._lock = threading.RLock()
+        self._pipeline = None
+        self._features = None
+        self._stat = None
+        self._derived = {}
+        self.sha256 = None
+        # Counters exposed to operators
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+        self.load_time = 0.0
+        self.loaded_at = None
+
+    def _stat_signature(self):
+        st_model = os.stat(self.model_path)
+        return (st_model.st_mtime_ns, st_model.st_size, file_signature(self.features_path),
+                file_signature(self.calibration_path))
+
+    def _read_features(self):
+        try:
+            with open(self.features_path, "r") as f:
+                return [line.strip() for line in f.readlines() if line.strip()]
+        except FileNotFoundError:
+            return None
+
+    def _load(self, signature, digest):
+        start = time.perf_counter()
+        pipeline = joblib.load(self.model_path)
+        features = self._read_features()
+        self.load_time = time.perf_counter() - start
+
+        if self._pipeline is not None:
+            self.reloads += 1
+        self._pipeline = pipeline
+        self._features = features
+        self._stat = signature
+        self._derived = {}
+        self.sha256 = digest
+        self.loaded_at = time.time()
+        print(f"✅ Pipeline loaded successfully ({self.load_time * 1000:.0f} ms, sha256 {digest[:12]})")
+
+    def get(self):
+        """Return (pipeline, features), loading or reloading the pickle if needed."""
+        signature = self._stat_signature()
+        if self._pipeline is not None and signature == self._stat:
+            self.hits += 1
+            return self._pipeline, self._features
+
+        with self._lock:
+            # Another session may have reloaded while we waited for the lock
+            if self._pipeline is not None and signature == self._stat:
+                self.hits += 1
+                return self._pipeline, self._features
+
+            digest = file_sha256(self.model_path)
+            if self._pipeline is not None and digest == self.sha256:
+                # Same content (e.g. file touched or re-copied): keep the loaded pipeline
+                if signature[2] != self._stat[2]:
+                    # Only the features file moved: re-read it, artifacts built from it are stale
+                    features = self._read_features()
+                    if features != self._features:
+                        self._features = features
+                        self._derived = {}
+                if signature[3] != self._stat[3]:
+                    # New or rewritten calibration table (calibration.py): the scorer reads it when built
+                    self._derived = {}
+                self._stat = signature
+                self.hits += 1
+                return self._pipeline, self._features
+
+            self.misses += 1
+            self._load(signature, digest)
+            return self._pipeline, self._features
+
+    @property
+    def version(self):
+        """Short content hash of the loaded pickle, None before the first load."""
+        return self.sha256[:12] if self.sha256 else None
+
+    def derived(self, name, factory):
+        """Return an artifact computed from the current pipeline, cached until reload."""
+        # Reloads happen under the same (reentrant) lock: the artifact is built
+        # from, and cached for, the pipeline that is current while it is held
+        with self._lock:
+            pipeline, features = self.get()
+            if name not in self._derived:
+                self._derived[name] = factory(pipeline, features)
+            return self._derived[name]
+
+    def stats(self):
+        return {
+            "model_path": self.model_path,
+            "version": self.version,
+            "loaded": self._pipeline is not None,
+            "load_time_ms": round(self.load_time * 1000, 2),
+            "loaded_at": self.loaded_at,
+            "hits": self.hits,
+            "misses": self.misses,
+            "reloads": self.reloads,
+        }
+
+
+# Shared instance used by the app (one per Python process)
+registry = ModelRegistry()
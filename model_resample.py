@@ -1,8 +1,36 @@
 # Random Forest training script for the Streamlit cancer risk detection application
+#
+# Stages: load + balance the data, cross-validated hyperparameter search,
+# final fit, evaluation, calibration, export (pickle, feature names,
+# importances, bundle, calibration table).
+# Each stage's wall-clock time is printed and saved with the search results
+# in data/training_report_cancer_resample_rf.json.
+#
+# Preprocessing and SMOTE are cached on disk with a joblib Memory (--cache-dir):
+# the pipeline memoizes the fitted ColumnTransformer and the SMOTE output,
+# keyed by a hash of the data they are fitted on. During the search every
+# candidate reuses the preprocessed + resampled folds instead of redoing them,
+# and a rerun on the same data skips CSV parsing and balancing as well.
+#
+# Calibration (--calibration platt|isotonic|none, see calibration.py): the
+# held-out split is cut in two, the map is fitted on one half and corrected
+# to the population rate of EverHadCancer (the share in the whole extract,
+# not in the balanced sample), the other half reports Brier scores and the
+# reliability diagram (data/reliability_cancer_resample_rf.png). Platt is the
+# default: with a few hundred rows isotonic regression overfits, and its
+# plateaus can move rows across the risk band limits.
+#
+# Usage: python model_resample.py [--data data/df2.csv|data/df2.parquet] [--no-search] [--n-jobs -1]
+#        python model_resample.py --streaming --data big_extract.parquet  (out-of-core, see streaming_training.py)
+
+import argparse
+import contextlib
+import json
+import time
 
 import pandas as pd
 from sklearn.ensemble import RandomForestClassifier
-from sklearn.model_selection import train_test_split
+from sklearn.model_selection import GridSearchCV, StratifiedKFold, train_test_split
 from sklearn.preprocessing import OrdinalEncoder, StandardScaler, OneHotEncoder
 from sklearn.compose import ColumnTransformer
 
@@ -14,200 +42,428 @@ import matplotlib.pyplot as plt
 # SMOTE importation for resampling
 from imblearn.over_sampling import SMOTE # to do: pip install imbalanced-learn!!
 from imblearn.pipeline import Pipeline
-# data
-try:
-    df = pd.read_csv('data/df2.csv')
-except FileNotFoundError:
-    print("Erreur: Le fichier 'df2.csv' n'a pas été trouvé. Veuillez vous assurer qu'il est dans le même répertoire.")
-    exit()
 
-cancer_oui= df[df['EverHadCancer'] == 1]  # people who had cancer
-cancer_non = df[df['EverHadCancer'] == 0]
+from fast_smote import ChunkedSMOTE
 
-# manual resampling to balance classes , 1073 = df[df['EverHadCancer'] == 1
-resample_cancer_oui = cancer_oui.sample(n=1073, random_state=142)
-resample_cancer_non = cancer_non.sample(n=1073, random_state=142)
+from calibration import CALIBRATION_PATH, Calibration, evaluate_calibration, plot_reliability
+from codebook import report_plan_mismatches
+from model_registry import file_sha256
+from preprocess_plan import PreprocessPlan
+from scoring import LOW_RISK_MAX, MODERATE_RISK_MAX, risk_band_codes, risk_score
 
-# Combine the two subsamples
-balanced_df = pd.concat([resample_cancer_oui, resample_cancer_non])
-
-
-# Shuffle lines to avoid order
-balanced_df = balanced_df.sample(frac=1, random_state=142).reset_index(drop=True)
-print(balanced_df['EverHadCancer'].value_counts())
+DATA_PATH = 'data/df2.csv'
+CACHE_DIR = '.cache/training'
+REPORT_PATH = 'data/training_report_cancer_resample_rf.json'
+RELIABILITY_PLOT_PATH = 'data/reliability_cancer_resample_rf.png'
+RANDOM_STATE = 142
 
 # Variables (defined in logical order for the preprocessor)
 binary_vars = [
     'MedConditions_Diabetes', 'MedConditions_HighBP', 'MedConditions_HeartCondition',
-    'MedConditions_LungDisease', 'MedConditions_Depression','FamilyEverHadCancer2', 
-    'HealthLimits_Pain' 
+    'MedConditions_LungDisease', 'MedConditions_Depression','FamilyEverHadCancer2',
+    'HealthLimits_Pain'
 ]
-ordinal_categorical_vars = [ 
+ordinal_categorical_vars = [
     'SmokeNow','GeneralHealth', 'Nervous',
     'IncomeRanges', 'Education', 'Fruit2', 'Vegetables2', 'CutSkipMeals2',
-    'DiffPayMedBills'   
+    'DiffPayMedBills'
 ]
 birthsex_var = ['BirthSex']  # categorial encoded [0,1,2] for ordinal_ohe (int64)
 
 string_categorical_vars = ['Birthcountry']  # string
 
-continuous_vars = ['BMI', 'Age', 
+continuous_vars = ['BMI', 'Age',
                    'SleepWeekdayHr', 'TimesSunburned', 'TimesStrengthTraining',
                    'ChildrenInHH', 'TotalHousehold', 'Drink_nb_PerMonth'
                    ]
 
 target = 'EverHadCancer'
 
-
 features_raw = ordinal_categorical_vars + birthsex_var + string_categorical_vars + continuous_vars + binary_vars
 
-df_clean = balanced_df[features_raw + [target]].dropna()
-
-
-X = df_clean[features_raw]
-y = df_clean[target]
-
-
-# Mapping ordinal cat var (same as Streamlit app)
-smoke_categories = ["Jamais", "Quelques fois", "Tous les jours"]
-sante_categories = ["Faible", "Moyen", "Bon", "Très bon : On va danser ce soir ?", "Excellent : Je pète la forme !"]
-nervous_categories = ["Très faible, je suis relax", "Faible, quelques fois", "Modéré, sous pression la moitié du temps", "Élevé, stressé(e) tous les jours"]
-revenu_categories = [" 0 à 730€ mensuel", "730€ à 1099€ mensuel", "1100€ à 1469€ mensuel", "1470€ à 2569€ mensuel", "2570€ à 3669€ mensuel", "3670 à 5499€ mensuel", "5500€ à 7339€ mensuel", "7340€ à 14669€ mensuel", "14670€ mensuel et plus"]
-etude_categories = ["Primaire", "Collège / brevet", "Lycée / BAC", "Universitaire : BTS / DUT / filière technique", "Universitaire : Licence / Maîtrise / DEUG", "Universitaire : Master / DEA / DESS", "Doctorat ou plus"]
-fruit_veg_categories = ["0", "1/2 portion ou moins", "1/2 à 1 portion", "1 à 2 portions", "2 à 3 portions", "3 à 4 portions", "plus de 4"]
-diff_med_categories = ["Jamais", "Un peu", "Souvent"]
-cut_skip_categories = ["Jamais", "Un peu", "Souvent"]
-
-# Mapping
-ordinal_categories = [
-    smoke_categories,
-    sante_categories,
-    nervous_categories,
-    revenu_categories,
-    etude_categories,
-    fruit_veg_categories, # Fruit2
-    fruit_veg_categories, # Vegetables2
-    cut_skip_categories,
-    diff_med_categories
-]
-
-# Preprocessor with ColumnTransformer
-# The order of transformations here defines the output order of features in the pipeline
-# and therefore the order expected by the final model
-
-
-transformers = [
-    ('ord', OrdinalEncoder(handle_unknown='use_encoded_value', unknown_value=-1), ordinal_categorical_vars),
-    ('ohe_birthsex', OneHotEncoder(categories=[[0, 1, 2]], sparse_output=False, handle_unknown='ignore'), birthsex_var),
-    ('ohe', OneHotEncoder(drop='first', sparse_output=False, handle_unknown='ignore'), string_categorical_vars),
-    ('scale', StandardScaler(), continuous_vars)
-]
-
-preprocessor = ColumnTransformer(
-    transformers=transformers,
-    remainder='passthrough'  # binary variables pass without transformation
-)
-
-
-
-# Create the complete pipeline, including SMOTE
-# SMOTE is applied AFTER the preprocessor but BEFORE the classifier
-
-pipeline = Pipeline([
-    ('preprocess', preprocessor),
-    ('smote', SMOTE(random_state=142)), # SMOTE
-    ('model', RandomForestClassifier(
-        n_estimators=200,
-        max_depth=20,
-        min_samples_leaf=2,
-        min_samples_split=5,
-        random_state=142))
-])
-
-# Split et train
-# The entire pipeline, including preprocessing and SMOTE, will be applied to X_train
-
-X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=142)
-pipeline.fit(X_train, y_train)
-
-# model evaluation
-y_pred = pipeline.predict(X_test)
-print("Accuracy:", accuracy_score(y_test, y_pred))
-print("\nClassification Report:\n", classification_report(y_test, y_pred))
-
-
-# Feature names extraction
-# This is important for the Streamlit app to know which features are used in the model
-# Note: The order of features in the final matrix must match the order expected by the model
-
-# 1. Features ordinales
-ord_features = ordinal_categorical_vars
-
-# 2. Features OneHotEncoded
-ohe_transformer = pipeline.named_steps['preprocess'].named_transformers_['ohe']
-# get_feature_names_out donne les noms corrects comme 'Birthcountry_Mexican'
-ohe_features = list(ohe_transformer.get_feature_names_out(string_categorical_vars))
-
-# 3. Features OneHotEncoded pour BirthSex
-ohe_birthsex = pipeline.named_steps['preprocess'].named_transformers_['ohe_birthsex']
-ohe_birthsex_features = list(ohe_birthsex.get_feature_names_out(birthsex_var))
-
-# 4. Features continues
-cont_features = continuous_vars
-
-# 5. Binary Features (passed directly, 'remainder' of the ColumnTransformer)
-bin_features = binary_vars
-
-# # The order of the features in the final matrix (this order must be respected by the application)
-final_feature_names_for_model_input = (
-    ord_features +
-    ohe_birthsex_features+
-    ohe_features +
-    cont_features +
-    bin_features
-)
-
-# Features importance
-try:
-    
-    # Retrieve the classifier after SMOTE and preprocessing
-    model_trained = pipeline.named_steps['model']
-    # RandomForestClassifier, il aura feature_importances_
-    if hasattr(model_trained, 'feature_importances_'):
-        importances = model_trained.feature_importances_
-        importance_df = pd.DataFrame({
-            'Variable': final_feature_names_for_model_input,
-            'Importance': importances
-        }).sort_values(by='Importance', ascending=False)
-        
-        # Visualization Top 20
-        top_20 = importance_df.head(20)
-        plt.figure(figsize=(12, 10))
-        plt.barh(top_20['Variable'][::-1], top_20['Importance'][::-1], color='teal')
-        plt.xlabel("Importance")
-        plt.title(f"Top 20 Variables (Random Forest - {target})")
-        plt.grid(axis='x', linestyle='--', alpha=0.6)
-        plt.tight_layout()
-        plt.show()
+# Hyperparameters of the model shipped with the app (README), used with --no-search
+DEFAULT_PARAMS = {
+    'model__n_estimators': 200,
+    'model__max_depth': 20,
+    'model__min_samples_leaf': 2,
+    'model__min_samples_split': 5,
+}
+
+# Search space; it contains DEFAULT_PARAMS
+PARAM_GRID = {
+    'model__n_estimators': [200, 400],
+    'model__max_depth': [10, 20, None],
+    'model__min_samples_leaf': [1, 2, 4],
+    'model__min_samples_split': [2, 5],
+    'model__max_features': ['sqrt', 0.5],
+}
+
+
+# --- Stage timing ---
+class StageTimer:
+    def __init__(self):
+        self.seconds = {}
+
+    @contextlib.contextmanager
+    def __call__(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.seconds[name] = time.perf_counter() - start
+            print(f"⏱️  {name}: {self.seconds[name]:.2f} s")
+
+
+# --- Data ---
+def read_training_columns(data_path):
+    """Only the columns used for training, from the CSV or the typed Parquet dataset (see ingest.py)."""
+    columns = features_raw + [target]
+    if data_path.endswith(".parquet"):
+        from ingest import read_training
+        return read_training(data_path, columns)
+    return pd.read_csv(data_path, usecols=columns)
+
+
+def load_balanced(data_path, data_sha256, n_per_class=1073, random_state=RANDOM_STATE):
+    """Read the survey extract and draw n_per_class rows of each class.
+
+    data_sha256 is only there to key the disk cache on the file content.
+    The draws are made on the row labels and the rows are copied once at the
+    end; the sample is the same as with the per-class DataFrame copies.
+    """
+    df = read_training_columns(data_path)
+
+    cancer_oui = df.index[df['EverHadCancer'] == 1].to_series()  # people who had cancer
+    cancer_non = df.index[df['EverHadCancer'] == 0].to_series()
+
+    # manual resampling to balance classes , 1073 = df[df['EverHadCancer'] == 1
+    resample_cancer_oui = cancer_oui.sample(n=n_per_class, random_state=random_state)
+    resample_cancer_non = cancer_non.sample(n=n_per_class, random_state=random_state)
+
+    # Combine the two subsamples and shuffle lines to avoid order
+    balanced_index = pd.concat([resample_cancer_oui, resample_cancer_non])
+    balanced_index = balanced_index.sample(frac=1, random_state=random_state)
+    return df.loc[balanced_index.to_numpy(), features_raw + [target]].reset_index(drop=True).dropna()
+
+
+def population_rate(data_path, data_sha256):
+    """Share of EverHadCancer in the whole extract (the rate calibrated probabilities are moved to)."""
+    if data_path.endswith(".parquet"):
+        from ingest import read_training
+        labels = read_training(data_path, [target])[target]
     else:
+        labels = pd.read_csv(data_path, usecols=[target])[target]
+    return float(labels.dropna().astype(int).mean())
+
+
+def split_train_test(df_clean):
+    """X_train, X_test, y_train, y_test: the held-out split the model is evaluated on."""
+    return train_test_split(df_clean[features_raw], df_clean[target].astype(int), test_size=0.2,
+                            random_state=RANDOM_STATE)
+
+
+# --- Pipeline ---
+def build_preprocessor():
+    # Preprocessor with ColumnTransformer
+    # The order of transformations here defines the output order of features in the pipeline
+    # and therefore the order expected by the final model
+    transformers = [
+        ('ord', OrdinalEncoder(handle_unknown='use_encoded_value', unknown_value=-1), ordinal_categorical_vars),
+        ('ohe_birthsex', OneHotEncoder(categories=[[0, 1, 2]], sparse_output=False, handle_unknown='ignore'), birthsex_var),
+        ('ohe', OneHotEncoder(drop='first', sparse_output=False, handle_unknown='ignore'), string_categorical_vars),
+        ('scale', StandardScaler(), continuous_vars)
+    ]
+    return ColumnTransformer(
+        transformers=transformers,
+        remainder='passthrough'  # binary variables pass without transformation
+    )
+
+
+def build_sampler(kind='imblearn', random_state=RANDOM_STATE):
+    # 'chunked': same draws, bounded memory for large training sets (see fast_smote.py)
+    if kind == 'chunked':
+        return ChunkedSMOTE(random_state=random_state)
+    return SMOTE(random_state=random_state)
+
+
+def build_pipeline(memory=None, random_state=RANDOM_STATE, smote='imblearn'):
+    # Create the complete pipeline, including SMOTE
+    # SMOTE is applied AFTER the preprocessor but BEFORE the classifier
+    pipeline = Pipeline([
+        ('preprocess', build_preprocessor()),
+        ('smote', build_sampler(smote, random_state)), # SMOTE
+        ('model', RandomForestClassifier(random_state=random_state))
+    ], memory=memory)
+    return pipeline.set_params(**DEFAULT_PARAMS)
+
+
+def n_jobs_params(pipeline, n_jobs):
+    """model__n_jobs, plus smote__n_jobs when the sampler has it (ChunkedSMOTE)."""
+    params = {'model__n_jobs': n_jobs}
+    if 'n_jobs' in pipeline.named_steps['smote'].get_params():
+        params['smote__n_jobs'] = n_jobs
+    return params
+
+
+def search_hyperparameters(pipeline, X_train, y_train, n_jobs=-1, cv=5, scoring='f1'):
+    """Grid search with SMOTE refitted inside each fold; returns (best_params, cv_results)."""
+    search = GridSearchCV(
+        pipeline, PARAM_GRID,
+        scoring={'accuracy': 'accuracy', 'recall': 'recall', 'f1': 'f1', 'roc_auc': 'roc_auc'},
+        refit=False,  # the final model is fitted once, on all cores, below
+        cv=StratifiedKFold(n_splits=cv, shuffle=True, random_state=RANDOM_STATE),
+        n_jobs=n_jobs,
+    )
+    search.fit(X_train, y_train)
+    results = pd.DataFrame(search.cv_results_)
+    best = results.loc[results[f'rank_test_{scoring}'].idxmin()]
+    return best['params'], results
+
+
+def final_feature_names(pipeline):
+    # Feature names extraction
+    # This is important for the Streamlit app to know which features are used in the model
+    # Note: The order of features in the final matrix must match the order expected by the model
+
+    # 1. Features ordinales
+    ord_features = ordinal_categorical_vars
+
+    # 2. Features OneHotEncoded
+    ohe_transformer = pipeline.named_steps['preprocess'].named_transformers_['ohe']
+    # get_feature_names_out donne les noms corrects comme 'Birthcountry_Mexican'
+    ohe_features = list(ohe_transformer.get_feature_names_out(string_categorical_vars))
+
+    # 3. Features OneHotEncoded pour BirthSex
+    ohe_birthsex = pipeline.named_steps['preprocess'].named_transformers_['ohe_birthsex']
+    ohe_birthsex_features = list(ohe_birthsex.get_feature_names_out(birthsex_var))
+
+    # 4. Features continues
+    cont_features = continuous_vars
+
+    # 5. Binary Features (passed directly, 'remainder' of the ColumnTransformer)
+    bin_features = binary_vars
+
+    # # The order of the features in the final matrix (this order must be respected by the application)
+    return (
+        ord_features +
+        ohe_birthsex_features+
+        ohe_features +
+        cont_features +
+        bin_features
+    )
+
+
+def feature_importances(pipeline, feature_names, plot=True):
+    # Features importance
+    try:
+        # Retrieve the classifier after SMOTE and preprocessing
+        model_trained = pipeline.named_steps['model']
+        # RandomForestClassifier, il aura feature_importances_
+        if hasattr(model_trained, 'feature_importances_'):
+            importances = model_trained.feature_importances_
+            importance_df = pd.DataFrame({
+                'Variable': feature_names,
+                'Importance': importances
+            }).sort_values(by='Importance', ascending=False)
+
+            if plot:
+                # Visualization Top 20
+                top_20 = importance_df.head(20)
+                plt.figure(figsize=(12, 10))
+                plt.barh(top_20['Variable'][::-1], top_20['Importance'][::-1], color='teal')
+                plt.xlabel("Importance")
+                plt.title(f"Top 20 Variables (Random Forest - {target})")
+                plt.grid(axis='x', linestyle='--', alpha=0.6)
+                plt.tight_layout()
+                plt.show()
+            return importance_df
         print("Le modèle final n'a pas d'attribut 'feature_importances_'. Impossible d'afficher les importances.")
 
-except Exception as e:
-    print(f"Erreur lors du calcul/affichage des importances des features: {e}")
-
-
-# Save the train pipeline (including preprocessing and SMOTE)
-joblib.dump(pipeline, "modele_cancer_resample_rf.pkl")
-print("Pipeline entraîné (avec SMOTE) sauvegardé sous 'modele_cancer_resample_rf.pkl'")
-
-# Save features importance (optional)
-if 'importance_df' in locals():
-    importance_df.to_csv("data/importances_cancer_resample_rf.csv", index=False)
-    print("Importances des features sauvegardées sous 'data/importances_cancer_resample_rf.csv'")
-
-# Save final features name (important for streamlit app)
-with open("data/features_cancer_resample_rf.txt", "w") as f:
-    for feature in final_feature_names_for_model_input:
-        f.write(feature + "\n")
-print("Noms des features finales (encodées) sauvegardés sous 'data/features_cancer_resample_rf.txt'")
-
+    except Exception as e:
+        print(f"Erreur lors du calcul/affichage des importances des features: {e}")
+    return None
+
+
+def evaluate(pipeline, X_test, y_test):
+    # model evaluation
+    y_pred = pipeline.predict(X_test)
+    accuracy = accuracy_score(y_test, y_pred)
+    print("Accuracy:", accuracy)
+    print("\nClassification Report:\n", classification_report(y_test, y_pred))
+    return accuracy
+
+
+def calibrate(pipeline, X_test, y_test, target_rate, method='platt', plot=True):
+    """Calibration fitted on half of the held-out rows, with its report on the other half."""
+    X_cal, X_eval, y_cal, y_eval = train_test_split(X_test, y_test, test_size=0.5, stratify=y_test,
+                                                    random_state=RANDOM_STATE)
+    raw_cal = pipeline.predict_proba(X_cal)[:, 1]
+    # Both methods are reported, `method` is the one exported
+    calibrations = {name: Calibration.fit(raw_cal, y_cal, target_rate, name) for name in ('isotonic', 'platt')}
+    calibration = calibrations[method]
+    calibration.risk_limits = calibration.map_limits((LOW_RISK_MAX, MODERATE_RISK_MAX))
+
+    raw_eval = pipeline.predict_proba(X_eval)[:, 1]
+    report = evaluate_calibration(raw_eval, y_eval, calibrations)
+    print(f"Taux de la population : {target_rate:.2%} (échantillon : {calibration.sample_rate:.2%}), "
+          f"{len(y_cal)} lignes d'ajustement, {len(y_eval)} d'évaluation")
+    for label, metrics in report.items():
+        print(f"  {label:<10} Brier {metrics['brier']:.4f}   probabilité moyenne {metrics['mean_probability']:.2%}")
+    # Same limits mapped through the table: only isotonic plateaus across a limit can change a band
+    bands_before = risk_band_codes(risk_score(raw_eval))
+    bands_after = calibration.risk_bands(calibration.apply(raw_eval))
+    changed = int((bands_before != bands_after).sum())
+    print(f"Seuils de risque {LOW_RISK_MAX}/{MODERATE_RISK_MAX} -> {calibration.risk_limits[0]:.1%}/"
+          f"{calibration.risk_limits[1]:.1%} en probabilité calibrée ({changed} lignes changent de bande)")
+
+    plot_reliability(report, RELIABILITY_PLOT_PATH, show=plot)
+    print(f"Diagramme de fiabilité sauvegardé sous '{RELIABILITY_PLOT_PATH}'")
+    summary = {"method": method, "target_rate": target_rate, "sample_rate": calibration.sample_rate,
+               "risk_limits": list(calibration.risk_limits), "band_changed": changed,
+               "table_points": len(calibration.raw), **report}
+    return calibration, summary
+
+
+def save_artifacts(pipeline, feature_names, importance_df, data_path, calibration=None):
+    # Save the train pipeline (including preprocessing and SMOTE). It is moved in place
+    # last: a running app that sees the new pickle already finds its calibration and bundle
+    joblib.dump(pipeline, "modele_cancer_resample_rf.pkl.tmp")
+    source_sha256 = file_sha256("modele_cancer_resample_rf.pkl.tmp")
+
+    # Calibration table, tied to the new pickle (ignored by the app for any other pickle)
+    if calibration is not None:
+        calibration.source_sha256 = source_sha256
+        calibration.save(CALIBRATION_PATH)
+        print(f"Table de calibration ({len(calibration.raw)} points) sauvegardée sous '{CALIBRATION_PATH}'")
+
+    # Save features importance (optional)
+    if importance_df is not None:
+        importance_df.to_csv("data/importances_cancer_resample_rf.csv", index=False)
+        print("Importances des features sauvegardées sous 'data/importances_cancer_resample_rf.csv'")
+
+    # Save final features name (important for streamlit app)
+    with open("data/features_cancer_resample_rf.txt", "w") as f:
+        for feature in feature_names:
+            f.write(feature + "\n")
+    print("Noms des features finales (encodées) sauvegardés sous 'data/features_cancer_resample_rf.txt'")
+
+    # Save the model bundle (JSON manifest + memory-mappable .npy arrays) loaded by the app
+    from model_bundle import BUNDLE_DIR, export_bundle
+    export_bundle(pipeline, BUNDLE_DIR, feature_names, source_sha256=source_sha256, data_path=data_path)
+    print(f"Bundle du modèle (manifest + tableaux .npy) sauvegardé sous '{BUNDLE_DIR}'")
+
+    os.replace("modele_cancer_resample_rf.pkl.tmp", "modele_cancer_resample_rf.pkl")
+    print("Pipeline entraîné (avec SMOTE) sauvegardé sous 'modele_cancer_resample_rf.pkl'")
+
+
+def save_report(report, cv_results=None, scoring='f1'):
+    if cv_results is not None:
+        # Ten best candidates of the search
+        columns = ['params'] + [f'mean_test_{m}' for m in ('accuracy', 'recall', 'f1', 'roc_auc')] + ['mean_fit_time']
+        report["cv_results"] = cv_results.sort_values(f'rank_test_{scoring}')[columns].head(10).to_dict('records')
+    with open(REPORT_PATH, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2, default=str)
+    print(f"Rapport d'entraînement (temps par étape, recherche) sauvegardé sous '{REPORT_PATH}'")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Train the cancer risk pipeline (preprocessing + SMOTE + Random Forest).")
+    parser.add_argument("--data", default=DATA_PATH,
+                        help="HINTS extract with the raw features and EverHadCancer (CSV, or Parquet from ingest.py)")
+    parser.add_argument("--n-per-class", type=int, default=1073, help="rows drawn from each class before training")
+    parser.add_argument("--no-search", action="store_true", help="skip the search and train with the app's hyperparameters")
+    parser.add_argument("--scoring", default="f1", choices=("accuracy", "recall", "f1", "roc_auc"),
+                        help="cross-validated metric used to pick the hyperparameters")
+    parser.add_argument("--cv", type=int, default=5, help="number of cross-validation folds")
+    parser.add_argument("--n-jobs", type=int, default=-1, help="processes for the search and the final fit (-1: all cores)")
+    parser.add_argument("--cache-dir", default=CACHE_DIR, help="joblib cache of the data, preprocessing and SMOTE stages")
+    parser.add_argument("--no-cache", action="store_true", help="disable the disk cache")
+    parser.add_argument("--no-plot", action="store_true", help="do not display the feature importance chart")
+    parser.add_argument("--calibration", default="platt", choices=("isotonic", "platt", "none"),
+                        help="calibration exported with the model (fitted on half of the held-out split)")
+    parser.add_argument("--smote", default="imblearn", choices=("imblearn", "chunked"),
+                        help="oversampling stage: imblearn's SMOTE or fast_smote.ChunkedSMOTE (large training sets)")
+    parser.add_argument("--streaming", action="store_true",
+                        help="out-of-core mode: one chunked pass over the data, see streaming_training.py")
+    parser.add_argument("--chunk-size", type=int, default=100_000, help="rows read at a time in --streaming mode")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.streaming:
+        from streaming_training import train_streaming
+        return train_streaming(args)
+
+    memory = joblib.Memory(None if args.no_cache else args.cache_dir, verbose=0)
+    timer = StageTimer()
+
+    # data
+    with timer("chargement des données"):
+        try:
+            data_sha256 = file_sha256(args.data)
+        except FileNotFoundError:
+            print(f"Erreur: Le fichier '{args.data}' n'a pas été trouvé. Veuillez vous assurer qu'il est dans le même répertoire.")
+            return 1
+        df_clean = memory.cache(load_balanced)(args.data, data_sha256, args.n_per_class)
+        target_rate = memory.cache(population_rate)(args.data, data_sha256)
+    print(df_clean['EverHadCancer'].value_counts())
+
+    # Split et train
+    # The entire pipeline, including preprocessing and SMOTE, will be applied to X_train
+    X_train, X_test, y_train, y_test = split_train_test(df_clean)
+    pipeline = build_pipeline(memory, smote=args.smote)
+
+    cv_results = None
+    if args.no_search:
+        best_params = dict(DEFAULT_PARAMS)
+    else:
+        with timer("recherche d'hyperparamètres"):
+            # One process per candidate x fold; each forest stays single-threaded
+            best_params, cv_results = search_hyperparameters(
+                pipeline.set_params(**n_jobs_params(pipeline, 1)), X_train, y_train, args.n_jobs, args.cv, args.scoring)
+        print(f"Meilleurs hyperparamètres ({args.scoring}): {best_params}")
+
+    with timer("entraînement final"):
+        pipeline.set_params(**best_params, **n_jobs_params(pipeline, args.n_jobs))
+        pipeline.fit(X_train, y_train)
+        # Saved without the training-only settings: the app predicts one row at a time
+        pipeline.set_params(**n_jobs_params(pipeline, None))
+        pipeline.memory = None
+    # Codes of the app's answers that the fitted encoders never saw (see codebook.py)
+    report_plan_mismatches(PreprocessPlan.from_pipeline(pipeline))
+
+    with timer("évaluation"):
+        accuracy = evaluate(pipeline, X_test, y_test)
+
+    calibration, calibration_report = None, None
+    if args.calibration != "none":
+        with timer("calibration"):
+            calibration, calibration_report = calibrate(pipeline, X_test, y_test, target_rate, args.calibration,
+                                                        plot=not args.no_plot)
+
+    final_feature_names_for_model_input = final_feature_names(pipeline)
+    importance_df = feature_importances(pipeline, final_feature_names_for_model_input, plot=not args.no_plot)
+
+    with timer("export"):
+        save_artifacts(pipeline, final_feature_names_for_model_input, importance_df, args.data, calibration)
+
+    report = {
+        "data": args.data,
+        "data_sha256": data_sha256,
+        "rows": len(df_clean),
+        "n_jobs": args.n_jobs,
+        "smote": args.smote,
+        "cache_dir": None if args.no_cache else args.cache_dir,
+        "best_params": best_params,
+        "scoring": args.scoring,
+        "test_accuracy": accuracy,
+        "calibration": calibration_report,
+        "stage_seconds": {name: round(seconds, 3) for name, seconds in timer.seconds.items()},
+    }
+    save_report(report, cv_results, args.scoring)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,167 @@
+# Process-wide prediction cache shared by every Streamlit session
+#
+# Answers are discrete except BMI, and users often go back with "⬅ Retour" and
+# resubmit the same questionnaire. Predictions are memoized on a hash of the
+# encoded feature row (so answers that encode identically, e.g. two countries
+# unknown to the encoder, share an entry). Bounded in entries (LRU) and in
+# age (TTL); cleared as soon as a different model is served. The per-user
+# explanation of the result page (explanations.py) is stored next to the
+# probability, under the same row hash in its own key namespace.
+#
+# Settings (environment): FIGHTCANCER_CACHE_SIZE (entries, 0 disables),
+# FIGHTCANCER_CACHE_TTL (seconds), FIGHTCANCER_CACHE_BMI_DECIMALS (round BMI
+# before encoding to raise the hit rate; unset keeps the exact value).
+
+import collections
+import hashlib
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+DEFAULT_MAX_ENTRIES = 4096
+DEFAULT_TTL_SECONDS = 3600
+
+
+class PredictionCache:
+    """LRU + TTL mapping from an encoded row to its probability (or explanation)."""
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, ttl_seconds=DEFAULT_TTL_SECONDS,
+                 bmi_decimals=None, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.bmi_decimals = bmi_decimals
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._entries = collections.OrderedDict()  # key -> (probability, expires_at)
+        self.model_version = None
+        # Counters exposed to operators
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0
+
+    def canonical(self, features):
+        """Copy of the raw feature dict with BMI rounded if configured."""
+        if self.bmi_decimals is None:
+            return features
+        features = dict(features)
+        features["BMI"] = round(features["BMI"], self.bmi_decimals)
+        return features
+
+    @staticmethod
+    def key(row, kind=b""):
+        return hashlib.blake2b(np.ascontiguousarray(row, dtype=np.float64).tobytes(), digest_size=16,
+                               person=kind).digest()
+
+    def _check_version(self, model_version):
+        if model_version != self.model_version:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self.model_version = model_version
+
+    def get_or_compute(self, row, model_version, compute, kind=b""):
+        """Cached value of `kind` for `row`, calling compute() on a miss."""
+        if not self.enabled:
+            return compute()
+        key = self.key(row, kind)
+        now = self.clock()
+        with self._lock:
+            self._check_version(model_version)
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[1] > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[0]
+                del self._entries[key]
+                self.expirations += 1
+            self.misses += 1
+
+        # Computed outside the lock: other sessions keep reading meanwhile
+        value = compute()
+        with self._lock:
+            if model_version == self.model_version:
+                self._entries[key] = (value, now + self.ttl_seconds)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def memory_bytes(self):
+        """Approximate footprint: the dict plus its keys, tuples and values."""
+        with self._lock:
+            return sys.getsizeof(self._entries) + sum(
+                sys.getsizeof(key) + sys.getsizeof(entry) + _value_size(entry[0]) + sys.getsizeof(entry[1])
+                for key, entry in self._entries.items())
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "bmi_decimals": self.bmi_decimals,
+            "model_version": self.model_version[:12] if isinstance(self.model_version, str) else self.model_version,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+            "memory_kb": round(self.memory_bytes() / 1024, 1),
+        }
+
+
+def _value_size(value):
+    if isinstance(value, float):
+        return sys.getsizeof(value)
+    # Explanation: object, feature list (shared with the explainer) and contributions
+    return sys.getsizeof(value) + sys.getsizeof(value.__dict__) + value.contributions.nbytes
+
+
+def _env_int(name, default):
+    value = os.environ.get(name)
+    return default if value in (None, "") else int(value)
+
+
+# Shared instance used by the app (one per Python process)
+prediction_cache = PredictionCache(
+    max_entries=_env_int("FIGHTCANCER_CACHE_SIZE", DEFAULT_MAX_ENTRIES),
+    ttl_seconds=_env_int("FIGHTCANCER_CACHE_TTL", DEFAULT_TTL_SECONDS),
+    bmi_decimals=_env_int("FIGHTCANCER_CACHE_BMI_DECIMALS", None),
+)
+
+
+def encoded_row(scorer, features, cache=prediction_cache):
+    """Encoded row the cache is keyed on (BMI rounded if configured)."""
+    return scorer.encode_one(cache.canonical(features))
+
+
+def cached_predict_proba_one(scorer, features, cache=prediction_cache, row=None):
+    """Scorer.predict_proba_one through the cache: [[p0, p1]]. `row`: encoded_row() if already computed."""
+    if row is None:
+        row = encoded_row(scorer, features, cache)
+    p = cache.get_or_compute(row, scorer.version, lambda: float(scorer.predict_encoded(row)[0]))
+    return np.array([[1.0 - p, p]])
+
+
+def cached_explain_one(scorer, features, cache=prediction_cache, row=None):
+    """Per-user explanation (explanations.Explanation) through the cache, next to the probability."""
+    if row is None:
+        row = encoded_row(scorer, features, cache)
+    return cache.get_or_compute(row, scorer.version, lambda: scorer.explain_row(row), kind=b"explain")
@@ -0,0 +1,237 @@
+# Precomputed preprocessing plan for online scoring
+#
+# The fitted ColumnTransformer ('preprocess' step of the pipeline) is exported
+# once into plain lookup tables: ordinal category -> code, one-hot value ->
+# output column, and the StandardScaler mean/scale. Encoding an answer dict
+# then writes directly into a NumPy row, without building pandas frames.
+# The output column order is the one in data/features_cancer_resample_rf.txt.
+
+import warnings
+
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import OneHotEncoder, OrdinalEncoder, StandardScaler
+
+
+class PreprocessPlan:
+    """Lookup-table version of the fitted ColumnTransformer.
+
+    ordinal: [(column, out_index, {category: code}, categories, unknown_value)]
+    onehot: [(column, {category: out_index}, categories, out_indices)]
+        out_indices holds the output column of each category, -1 when the
+        category is dropped (drop='first'); unknown values encode as all zeros.
+    scaled_columns / scaled_out / mean / scale: StandardScaler parameters
+    passthrough_columns / passthrough_out: remainder columns copied as is
+    """
+
+    def __init__(self, input_features, output_names, ordinal, onehot,
+                 scaled_columns, scaled_out, mean, scale,
+                 passthrough_columns, passthrough_out):
+        self.input_features = list(input_features)
+        self.output_names = list(output_names)
+        self.ordinal = ordinal
+        self.onehot = onehot
+        self.scaled_columns = list(scaled_columns)
+        self.scaled_out = np.asarray(scaled_out, dtype=np.intp)
+        self.mean = np.asarray(mean, dtype=np.float64)
+        self.scale = np.asarray(scale, dtype=np.float64)
+        self.passthrough_columns = list(passthrough_columns)
+        self.passthrough_out = np.asarray(passthrough_out, dtype=np.intp)
+
+    @property
+    def n_outputs(self):
+        return len(self.output_names)
+
+    def output_sources(self):
+        """Raw input column of every output column (one-hot outputs share their column)."""
+        sources = [None] * self.n_outputs
+        for col, idx, _, _, _ in self.ordinal:
+            sources[idx] = col
+        for col, _, _, out_indices in self.onehot:
+            for idx in out_indices[out_indices >= 0]:
+                sources[idx] = col
+        for col, idx in zip(self.scaled_columns + self.passthrough_columns,
+                            np.concatenate([self.scaled_out, self.passthrough_out])):
+            sources[idx] = col
+        return sources
+
+    @classmethod
+    def from_column_transformer(cls, ct):
+        input_features = list(ct.feature_names_in_)
+        ordinal, onehot = [], []
+        scaled_columns, scaled_out, mean, scale = [], [], [], []
+        passthrough_columns, passthrough_out = [], []
+        output_names = [None] * sum(s.stop - s.start for s in ct.output_indices_.values())
+
+        with warnings.catch_warnings():
+            # sklearn 1.6 warns that remainder columns will become names instead of indices;
+            # both forms are handled below
+            warnings.simplefilter("ignore", FutureWarning)
+            fitted = [(name, transformer, list(columns)) for name, transformer, columns in ct.transformers_]
+
+        for name, transformer, columns in fitted:
+            out = ct.output_indices_[name]
+            if transformer == "drop" or out.start == out.stop:
+                continue
+            if columns and isinstance(columns[0], (int, np.integer)):
+                columns = [input_features[i] for i in columns]
+
+            if name == "remainder" and transformer != "drop":
+                # 'passthrough' remainder (a FunctionTransformer once fitted)
+                passthrough_columns += columns
+                passthrough_out += list(range(out.start, out.stop))
+                names = columns
+            elif isinstance(transformer, OrdinalEncoder):
+                unknown = (transformer.unknown_value
+                           if transformer.handle_unknown == "use_encoded_value" else np.nan)
+                for i, (col, cats) in enumerate(zip(columns, transformer.categories_)):
+                    table = {cat: code for code, cat in enumerate(cats.tolist())}
+                    ordinal.append((col, out.start + i, table, cats, unknown))
+                names = columns
+            elif isinstance(transformer, OneHotEncoder):
+                position = out.start
+                drop_idx = transformer.drop_idx_
+                for i, (col, cats) in enumerate(zip(columns, transformer.categories_)):
+                    dropped = None if drop_idx is None or drop_idx[i] is None else int(drop_idx[i])
+                    out_indices = np.full(len(cats), -1, dtype=np.intp)
+                    for code in range(len(cats)):
+                        if code != dropped:
+                            out_indices[code] = position
+                            position += 1
+                    table = {cat: int(idx) for cat, idx in zip(cats.tolist(), out_indices) if idx >= 0}
+                    onehot.append((col, table, cats, out_indices))
+                names = list(transformer.get_feature_names_out(columns))
+            elif isinstance(transformer, StandardScaler):
+                n = len(columns)
+                scaled_columns += columns
+                scaled_out += list(range(out.start, out.stop))
+                mean += list(transformer.mean_ if transformer.with_mean else np.zeros(n))
+                scale += list(transformer.scale_ if transformer.with_std else np.ones(n))
+                names = columns
+            else:
+                raise TypeError(f"Unsupported transformer in plan export: {name} ({type(transformer).__name__})")
+
+            output_names[out] = names
+
+        return cls(input_features, output_names, ordinal, onehot,
+                   scaled_columns, scaled_out, mean, scale,
+                   passthrough_columns, passthrough_out)
+
+    @classmethod
+    def from_pipeline(cls, pipeline, features=None):
+        plan = cls.from_column_transformer(pipeline.named_steps["preprocess"])
+        if features and list(features) != plan.output_names:
+            raise ValueError("The preprocessing output order does not match the saved feature list")
+        return plan
+
+    def to_dict(self):
+        """JSON-serializable description (used by the model bundle manifest)."""
+        return {
+            "input_features": self.input_features,
+            "output_names": self.output_names,
+            "ordinal": [
+                {"column": col, "output_index": int(idx), "categories": cats.tolist(),
+                 "unknown_value": None if _is_missing(unknown) else unknown}
+                for col, idx, _, cats, unknown in self.ordinal
+            ],
+            "onehot": [
+                {"column": col, "categories": cats.tolist(), "output_indices": out_indices.tolist()}
+                for col, _, cats, out_indices in self.onehot
+            ],
+            "scaler": {
+                "columns": self.scaled_columns,
+                "output_indices": self.scaled_out.tolist(),
+                "mean": self.mean.tolist(),
+                "scale": self.scale.tolist(),
+            },
+            "passthrough": {
+                "columns": self.passthrough_columns,
+                "output_indices": self.passthrough_out.tolist(),
+            },
+        }
+
+    @classmethod
+    def from_dict(cls, d):
+        ordinal = []
+        for entry in d["ordinal"]:
+            cats = np.asarray(entry["categories"], dtype=_categories_dtype(entry["categories"]))
+            table = {cat: code for code, cat in enumerate(cats.tolist())}
+            unknown = np.nan if entry["unknown_value"] is None else entry["unknown_value"]
+            ordinal.append((entry["column"], entry["output_index"], table, cats, unknown))
+        onehot = []
+        for entry in d["onehot"]:
+            cats = np.asarray(entry["categories"], dtype=_categories_dtype(entry["categories"]))
+            out_indices = np.asarray(entry["output_indices"], dtype=np.intp)
+            table = {cat: int(idx) for cat, idx in zip(cats.tolist(), out_indices) if idx >= 0}
+            onehot.append((entry["column"], table, cats, out_indices))
+        return cls(d["input_features"], d["output_names"], ordinal, onehot,
+                   d["scaler"]["columns"], d["scaler"]["output_indices"],
+                   d["scaler"]["mean"], d["scaler"]["scale"],
+                   d["passthrough"]["columns"], d["passthrough"]["output_indices"])
+
+    def encode_one(self, answers, out=None):
+        """Encode one answer dict (raw feature -> value) into a float64 row."""
+        row = np.zeros(self.n_outputs) if out is None else out
+        if out is not None:
+            row.fill(0.0)
+
+        for col, idx, table, _, unknown in self.ordinal:
+            value = answers[col]
+            row[idx] = np.nan if _is_missing(value) else table.get(value, unknown)
+        for col, table, _, _ in self.onehot:
+            idx = table.get(answers[col])
+            if idx is not None:
+                row[idx] = 1.0
+        for col, idx, mean, scale in zip(self.scaled_columns, self.scaled_out, self.mean, self.scale):
+            row[idx] = (answers[col] - mean) / scale
+        for col, idx in zip(self.passthrough_columns, self.passthrough_out):
+            row[idx] = answers[col]
+        return row
+
+    def encode_column(self, column, values):
+        """Output index and encoded values of one ordinal, scaled or passthrough column."""
+        values = np.asarray(values)
+        for col, idx, table, _, unknown in self.ordinal:
+            if col == column:
+                return idx, np.array([np.nan if _is_missing(v) else table.get(v, unknown) for v in values.tolist()],
+                                     dtype=np.float64)
+        if column in self.scaled_columns:
+            i = self.scaled_columns.index(column)
+            return self.scaled_out[i], (values.astype(np.float64) - self.mean[i]) / self.scale[i]
+        if column in self.passthrough_columns:
+            return self.passthrough_out[self.passthrough_columns.index(column)], values.astype(np.float64)
+        raise ValueError(f"{column} is not encoded into a single output column")
+
+    def transform(self, df):
+        """Vectorized equivalent of ColumnTransformer.transform for a DataFrame."""
+        n = len(df)
+        X = np.zeros((n, self.n_outputs))
+
+        for col, idx, _, cats, unknown in self.ordinal:
+            values = df[col]
+            codes = pd.Categorical(values, categories=cats).codes.astype(np.float64)
+            codes[codes < 0] = unknown
+            codes[values.isna().to_numpy()] = np.nan
+            X[:, idx] = codes
+        rows = np.arange(n)
+        for col, _, cats, out_indices in self.onehot:
+            codes = pd.Categorical(df[col], categories=cats).codes
+            known = codes >= 0
+            target = out_indices[codes[known]]
+            keep = target >= 0
+            X[rows[known][keep], target[keep]] = 1.0
+        if self.scaled_columns:
+            values = df[self.scaled_columns].to_numpy(dtype=np.float64)
+            X[:, self.scaled_out] = (values - self.mean) / self.scale
+        if self.passthrough_columns:
+            X[:, self.passthrough_out] = df[self.passthrough_columns].to_numpy(dtype=np.float64)
+        return X
+
+
+def _categories_dtype(values):
+    # Same dtypes as the fitted encoders: float64 for numeric codes, object for labels
+    return object if any(isinstance(v, str) for v in values) else np.float64
+
+
+def _is_missing(value):
+    return value is None or (isinstance(value, float) and value != value)
@@ -0,0 +1,120 @@
+# Per-phase timing of app reruns
+#
+# The app calls timer.lap("<phase>") after each phase of the script (logo,
+# CSS, model load, form, mapping, prediction, result HTML, ...); each lap
+# records the time since the previous one. At the end of the rerun the
+# phases go to a structured JSON log line and to process-wide rolling
+# windows, read by the operator panel.
+#
+# Enabled with FIGHTCANCER_PROFILE=1 (log file: FIGHTCANCER_PROFILE_LOG,
+# stderr otherwise). When disabled, the app gets a shared no-op timer and
+# each lap is an empty method call.
+#
+# Reruns interrupted by st.rerun() never reach finish() and are not recorded.
+# Reruns of the questionnaire fragment alone (form submits, "⬅ Retour", the
+# what-if widgets) are recorded too, with the phases of the fragment only.
+
+import collections
+import json
+import logging
+import os
+import threading
+import time
+
+import numpy as np
+
+PROFILE_ENV = "FIGHTCANCER_PROFILE"
+PROFILE_LOG_ENV = "FIGHTCANCER_PROFILE_LOG"
+WINDOW = 500
+
+logger = logging.getLogger("fightcancer.timings")
+
+
+class RerunTimer:
+    def __init__(self, profiler, step):
+        self.profiler = profiler
+        self.step = step
+        self.phases = {}
+        self.started = self._last = time.perf_counter()
+
+    def lap(self, phase):
+        now = time.perf_counter()
+        # A phase reached twice in one rerun (e.g. in a loop) accumulates
+        self.phases[phase] = self.phases.get(phase, 0.0) + (now - self._last)
+        self._last = now
+
+    def finish(self):
+        self.profiler.record(self.step, self.phases, time.perf_counter() - self.started)
+
+
+class NullTimer:
+    """Stand-in when profiling is off."""
+
+    def lap(self, phase):
+        pass
+
+    def finish(self):
+        pass
+
+
+NULL_TIMER = NullTimer()
+
+
+class Profiler:
+    """Rolling per-(step, phase) durations shared by every session."""
+
+    def __init__(self, enabled=False, window=WINDOW):
+        self.enabled = enabled
+        self.window = window
+        self._lock = threading.Lock()
+        self._samples = collections.defaultdict(lambda: collections.deque(maxlen=self.window))
+        self.reruns = 0
+
+    def rerun(self, step):
+        return RerunTimer(self, step) if self.enabled else NULL_TIMER
+
+    def record(self, step, phases, total):
+        with self._lock:
+            self.reruns += 1
+            for phase, seconds in phases.items():
+                self._samples[(step, phase)].append(seconds)
+            self._samples[(step, "total")].append(total)
+        logger.info(json.dumps({
+            "ts": round(time.time(), 3),
+            "step": step,
+            "total_ms": round(total * 1000, 3),
+            "phases_ms": {phase: round(seconds * 1000, 3) for phase, seconds in phases.items()},
+        }))
+
+    def percentiles(self):
+        """[{step, phase, n, p50_ms, p90_ms, p99_ms}] in recording order."""
+        with self._lock:
+            items = [(key, np.asarray(samples)) for key, samples in self._samples.items()]
+        rows = []
+        for (step, phase), samples in sorted(items, key=lambda item: item[0][0]):
+            p50, p90, p99 = np.percentile(samples, [50, 90, 99]) * 1000
+            rows.append({"step": step, "phase": phase, "n": len(samples),
+                         "p50_ms": round(p50, 3), "p90_ms": round(p90, 3), "p99_ms": round(p99, 3)})
+        return rows
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+            self.reruns = 0
+
+
+def _configure_logger():
+    if logger.handlers:
+        return
+    path = os.environ.get(PROFILE_LOG_ENV)
+    handler = logging.FileHandler(path) if path else logging.StreamHandler()
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+
+# Shared instance used by the app (one per Python process)
+profiler = Profiler(enabled=os.environ.get(PROFILE_ENV) == "1")
+if profiler.enabled:
+    _configure_logger()
@@ -0,0 +1,116 @@
+# Online scoring: preprocessing plan + compiled forest (+ calibration table)
+#
+# All are derived once from the pipeline held by the model registry and are
+# rebuilt automatically when the pickle changes. When training exported a
+# calibration for this pickle (calibration.py), probabilities and risk band
+# limits are the calibrated ones.
+
+import numpy as np
+
+from calibration import CALIBRATION_PATH, load_calibration
+from codebook import report_plan_mismatches
+from explanations import ForestExplainer
+from forest_engine import CompiledForest
+from model_registry import registry
+from preprocess_plan import PreprocessPlan
+
+# Above this many rows sklearn's own tree loop beats the NumPy engine
+# (see benchmarks/bench_forest_engine.py)
+FAST_PATH_MAX_ROWS = 256
+
+# Result page thresholds on the rounded percentage: <= 20 low, <= 38 moderate, above high
+LOW_RISK_MAX = 20
+MODERATE_RISK_MAX = 38
+RISK_BANDS = ("Faible", "Modéré", "Fort")
+
+
+def risk_score(proba):
+    """Percentage shown on the result page (0-100, rounded)."""
+    return np.round(np.asarray(proba) * 100, 0)
+
+
+def risk_band_codes(scores):
+    """0/1/2 for Faible/Modéré/Fort, -1 where the score is missing."""
+    scores = np.asarray(scores, dtype=np.float64)
+    codes = np.select([scores <= LOW_RISK_MAX, scores <= MODERATE_RISK_MAX], [0, 1], 2)
+    codes[np.isnan(scores)] = -1
+    return codes.astype(np.int8)
+
+
+class Scorer:
+    def __init__(self, plan, forest, model, calibration=None):
+        self.plan = plan
+        self.forest = forest
+        self.model = model
+        self.calibration = calibration
+        self._explainer = None
+        report_plan_mismatches(plan)
+
+    @classmethod
+    def from_pipeline(cls, pipeline, features=None, source_sha256=None, calibration_path=CALIBRATION_PATH):
+        return cls(
+            plan=PreprocessPlan.from_pipeline(pipeline, features),
+            forest=CompiledForest.from_pipeline(pipeline, source_sha256),
+            model=pipeline.named_steps["model"],
+            calibration=load_calibration(source_sha256, calibration_path),
+        )
+
+    @property
+    def version(self):
+        """sha256 of the pickle the model comes from, and of the calibration (keys the prediction cache)."""
+        if self.forest is not None and self.forest.source_sha256:
+            version = self.forest.source_sha256
+        else:
+            version = f"scorer-{id(self)}"
+        return f"{version}+{self.calibration.version}" if self.calibration is not None else version
+
+    def risk_bands(self, proba):
+        """risk_band_codes() of probabilities returned by this scorer.
+
+        Calibrated probabilities are compared with the calibrated images of the
+        raw band limits: with a strictly increasing table (Platt), the band of a
+        user does not depend on the calibration.
+        """
+        if self.calibration is None or not self.calibration.risk_limits:
+            return risk_band_codes(risk_score(proba))
+        return self.calibration.risk_bands(proba)
+
+    @property
+    def explainer(self):
+        """Per-user explanations (explanations.py), precomputed on first use."""
+        if self._explainer is None:
+            self._explainer = ForestExplainer.from_scorer(self)
+        return self._explainer
+
+    def explain_row(self, row):
+        """explainer.explain_row() in units of the probability this scorer returns."""
+        explanation = self.explainer.explain_row(row)
+        return explanation if self.calibration is None else explanation.calibrated(self.calibration)
+
+    def encode_one(self, answers):
+        return self.plan.encode_one(answers)
+
+    def predict_encoded(self, X):
+        """Positive-class probability for already preprocessed rows."""
+        X = np.atleast_2d(X)
+        # Batch workers carry only one of the two (memory-mapped forest or sklearn model)
+        if self.model is None or (self.forest is not None and len(X) <= FAST_PATH_MAX_ROWS):
+            return self.calibrate(self.forest.predict_positive(X))
+        return self.calibrate(self.model.predict_proba(X)[:, 1])
+
+    def calibrate(self, proba):
+        """Raw forest probabilities -> the ones served (unchanged without calibration)."""
+        return proba if self.calibration is None else self.calibration.apply(proba)
+
+    def predict_proba_one(self, answers):
+        """Same shape as pipeline.predict_proba on a one-row frame: [[p0, p1]]."""
+        p = self.calibrate(self.forest.predict_positive(self.plan.encode_one(answers)))[0]
+        return np.array([[1.0 - p, p]])
+
+    def predict_frame(self, df):
+        return self.predict_encoded(self.plan.transform(df))
+
+
+def get_scorer(model_registry=registry):
+    return model_registry.derived("scorer", lambda pipeline, features: Scorer.from_pipeline(
+        pipeline, features, model_registry.sha256, model_registry.calibration_path))
@@ -0,0 +1,236 @@
+# Local JSON/HTTP scoring service with request micro-batching
+#
+# POST /predict takes one record (or a list of records) keyed by the 26 raw
+# pipeline features of label_maps.raw_features_for_pipeline_input; categorical
+# fields may be given as the app's French labels or as codes. Concurrent
+# requests are queued and scored together: the batcher waits at most
+# --max-wait-ms after the first queued request (or until --max-batch records)
+# and serves the whole batch with one forest call, run in a worker thread so
+# the event loop keeps accepting requests meanwhile. The risk bands come from
+# the same scorer as the probabilities (with a calibration, its limits are
+# calibrated too).
+#
+# GET /metrics returns latency percentiles and the batch-size histogram,
+# GET /health the model version.
+#
+# Usage: python scoring_service.py [--port 8600] [--max-batch 64] [--max-wait-ms 2]
+
+import argparse
+import asyncio
+import collections
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import tornado.web
+
+from label_maps import validate_raw_features
+from model_bundle import load_scorer
+from scoring import RISK_BANDS, risk_score
+
+DEFAULT_PORT = 8600
+LATENCY_WINDOW = 10_000
+
+
+class ServiceMetrics:
+    """Rolling request latencies and a power-of-two batch-size histogram."""
+
+    def __init__(self, window=LATENCY_WINDOW):
+        self.latencies_ms = collections.deque(maxlen=window)
+        self.batch_sizes = collections.Counter()
+        self.requests = 0
+        self.records = 0
+        self.rejected = 0
+        self.batches = 0
+        self.started_at = time.time()
+
+    def record_batch(self, size):
+        self.batches += 1
+        self.records += size
+        # Bucket upper bounds 1, 2, 4, 8, ...
+        self.batch_sizes[1 << max(size - 1, 0).bit_length()] += 1
+
+    def snapshot(self):
+        latencies = np.asarray(self.latencies_ms)
+        percentiles = {}
+        if len(latencies):
+            p50, p90, p99 = np.percentile(latencies, [50, 90, 99])
+            percentiles = {"p50": p50, "p90": p90, "p99": p99, "max": float(latencies.max())}
+        return {
+            "uptime_s": time.time() - self.started_at,
+            "requests": self.requests,
+            "records": self.records,
+            "rejected": self.rejected,
+            "batches": self.batches,
+            "mean_batch_size": self.records / self.batches if self.batches else 0.0,
+            "latency_ms": {k: round(float(v), 3) for k, v in percentiles.items()},
+            "batch_size_histogram": {f"<={k}": v for k, v in sorted(self.batch_sizes.items())},
+        }
+
+
+class MicroBatcher:
+    """Collects validated records from concurrent requests into scoring batches."""
+
+    def __init__(self, scorer_factory=load_scorer, max_batch=64, max_wait_ms=2.0, metrics=None):
+        self.scorer_factory = scorer_factory
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.metrics = metrics or ServiceMetrics()
+        self._queue = None
+        self._task = None
+        # One thread: batches are scored one at a time, in arrival order
+        self._executor = ThreadPoolExecutor(1, thread_name_prefix="scoring")
+
+    def start(self):
+        self._queue = asyncio.Queue()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+        self._executor.shutdown(wait=False)
+
+    async def submit(self, features):
+        """(probability, risk band code) of one record."""
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((features, future))
+        return await future
+
+    async def _collect(self):
+        batch = [await self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch:
+            # Take what is already queued without yielding, then wait for stragglers
+            while len(batch) < self.max_batch and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            remaining = deadline - time.perf_counter()
+            if len(batch) >= self.max_batch or remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    def _score(self, records):
+        # Fetched per batch so a retrained model or a new bundle is picked up
+        scorer = self.scorer_factory()
+        X = np.empty((len(records), scorer.plan.n_outputs))
+        for row, features in zip(X, records):
+            scorer.plan.encode_one(features, out=row)
+        proba = scorer.predict_encoded(X)
+        return proba, scorer.risk_bands(proba)
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            self.metrics.record_batch(len(batch))
+            try:
+                proba, bands = await loop.run_in_executor(self._executor, self._score, [f for f, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for (_, future), p, band in zip(batch, proba, bands):
+                if not future.done():
+                    future.set_result((float(p), int(band)))
+
+
+def prediction_result(proba, band):
+    return {"probability": proba, "score": int(risk_score(proba)), "risk_band": RISK_BANDS[band]}
+
+
+class PredictHandler(tornado.web.RequestHandler):
+    def initialize(self, batcher, birthcountry_codes):
+        self.batcher = batcher
+        self.birthcountry_codes = birthcountry_codes
+
+    async def post(self):
+        start = time.perf_counter()
+        metrics = self.batcher.metrics
+        metrics.requests += 1
+        try:
+            payload = json.loads(self.request.body)
+        except ValueError:
+            metrics.rejected += 1
+            self.set_status(400)
+            return self.finish({"error": "JSON invalide"})
+
+        records = payload if isinstance(payload, list) else [payload]
+        validated, errors = [], {}
+        for i, record in enumerate(records):
+            features, record_errors = (validate_raw_features(record, self.birthcountry_codes)
+                                       if isinstance(record, dict) else (None, {"record": "objet JSON attendu"}))
+            if record_errors:
+                errors[i] = record_errors
+            validated.append(features)
+        if errors:
+            metrics.rejected += 1
+            self.set_status(400)
+            return self.finish({"errors": errors if isinstance(payload, list) else errors[0]})
+
+        scored = await asyncio.gather(*(self.batcher.submit(features) for features in validated))
+        results = [prediction_result(p, band) for p, band in scored]
+        metrics.latencies_ms.append((time.perf_counter() - start) * 1000)
+        self.set_header("Content-Type", "application/json")
+        self.finish(json.dumps(results if isinstance(payload, list) else results[0]))
+
+
+class MetricsHandler(tornado.web.RequestHandler):
+    def initialize(self, batcher):
+        self.batcher = batcher
+
+    def get(self):
+        self.finish(self.batcher.metrics.snapshot())
+
+
+class HealthHandler(tornado.web.RequestHandler):
+    def get(self):
+        scorer = load_scorer()
+        forest = scorer.forest
+        self.finish({"status": "ok", "model_sha256": forest.source_sha256 if forest is not None else None})
+
+
+def make_app(batcher):
+    # Country codes the fitted one-hot encoder knows, on top of the app's own list
+    plan = batcher.scorer_factory().plan
+    birthcountry_codes = {c for col, _, cats, _ in plan.onehot if col == "Birthcountry" for c in cats.tolist()}
+    return tornado.web.Application([
+        (r"/predict", PredictHandler, {"batcher": batcher, "birthcountry_codes": birthcountry_codes}),
+        (r"/metrics", MetricsHandler, {"batcher": batcher}),
+        (r"/health", HealthHandler),
+    ])
+
+
+async def serve(port=DEFAULT_PORT, max_batch=64, max_wait_ms=2.0, address="127.0.0.1"):
+    batcher = MicroBatcher(max_batch=max_batch, max_wait_ms=max_wait_ms)
+    batcher.start()
+    app = make_app(batcher)
+    app.listen(port, address=address)
+    print(f"✅ Service de scoring sur http://{address}:{port}/predict "
+          f"(lots de {max_batch} max, attente {max_wait_ms} ms)", flush=True)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await batcher.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the cancer risk model over HTTP with micro-batching.")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--address", default="127.0.0.1")
+    parser.add_argument("--max-batch", type=int, default=64, help="records scored together at most")
+    parser.add_argument("--max-wait-ms", type=float, default=2.0,
+                        help="how long the first queued request waits for others (0: no batching delay)")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args.port, args.max_batch, args.max_wait_ms, args.address))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
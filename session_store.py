@@ -0,0 +1,199 @@
+# Compact per-session answers, idle-session eviction and memory accounting
+#
+# Every Streamlit session keeps its questionnaire in st.session_state.inputs.
+# CompactAnswers stores it as one int16 vector: categorical answers as their
+# position in the mapping dicts of label_maps.py (read back as the French
+# label, so the app code is unchanged), integer answers as themselves. Only
+# the weight, the height (floats, they feed the BMI exactly) and the first
+# name are kept as Python objects.
+#
+# The session registry records, at every rerun, when each session was last
+# active and how much its session state weighs. Sessions idle for longer than
+# FIGHTCANCER_SESSION_IDLE_TTL seconds (default 1800, 0 disables) get their
+# answers cleared, and start over at their next rerun. Streamlit drops
+# sessions whose browser is gone on its own (server.disconnectedSessionTTL);
+# this covers tabs left open. The registry holds weak references only.
+#
+# Usage: st.session_state.inputs = CompactAnswers(); session_registry.track(...)
+
+import collections.abc
+import os
+import sys
+import threading
+import time
+import weakref
+
+import numpy as np
+
+from label_maps import (BirthSex_map, bool_map, diff_map, ethnie_map, etude_map, fruits_map, fumeur_num,
+                        legumes_map, revenu_map, sante_general_map, stress_map)
+
+# key in st.session_state.inputs -> labels in code order (categorical) or None (integer)
+ANSWER_CODES = {
+    "BirthSex": list(BirthSex_map), "Age": None, "fumeur": list(fumeur_num), "alcohol": None,
+    "soleil": None, "sommeil_moy": None, "fruits": list(fruits_map), "legumes": list(legumes_map),
+    "sport": None, "diabete": list(bool_map), "cardiaque": list(bool_map), "hypertension": list(bool_map),
+    "poumon": list(bool_map), "depression": list(bool_map), "douleur": list(bool_map),
+    "nervous": list(stress_map), "Sante_general": list(sante_general_map),
+    "FamilyEverHadCancer2": list(bool_map), "revenu": list(revenu_map), "etude": list(etude_map),
+    "enfants": None, "foyer": None, "Diff_financiere": list(diff_map), "Skip_meal": list(diff_map),
+    "ethnie": list(ethnie_map),
+}
+# Answers kept as objects: weight and height (floats), first name
+OBJECT_ANSWERS = ("poids", "taille_m", "prenom")
+# select_slider answers that are numbers sent as strings
+STRING_NUMBERS = ("sport",)
+
+MISSING = -32768
+DEFAULT_IDLE_TTL_SECONDS = 1800
+SWEEP_INTERVAL_SECONDS = 60
+
+_POSITION = {key: list(ANSWER_CODES).index(key) for key in ANSWER_CODES}
+_CODE_OF = {key: {label: code for code, label in enumerate(labels)}
+            for key, labels in ANSWER_CODES.items() if labels is not None}
+
+
+class CompactAnswers(collections.abc.MutableMapping):
+    """Questionnaire answers as int16 codes, read and written with the widgets' values."""
+
+    __slots__ = ("codes", "objects", "evicted", "__weakref__")
+
+    def __init__(self, answers=None):
+        self.codes = np.full(len(ANSWER_CODES), MISSING, dtype=np.int16)
+        self.objects = {}
+        self.evicted = False
+        if answers:
+            self.update(answers)
+
+    def __getitem__(self, key):
+        if key in OBJECT_ANSWERS:
+            return self.objects[key]
+        code = int(self.codes[_POSITION[key]])
+        if code == MISSING:
+            raise KeyError(key)
+        labels = ANSWER_CODES[key]
+        if labels is not None:
+            return labels[code]
+        return str(code) if key in STRING_NUMBERS else code
+
+    def __setitem__(self, key, value):
+        if key in OBJECT_ANSWERS:
+            self.objects[key] = value
+        elif key not in _POSITION:
+            raise KeyError(f"Réponse inconnue : {key}")
+        else:
+            self.codes[_POSITION[key]] = _CODE_OF[key][value] if key in _CODE_OF else int(value)
+
+    def __delitem__(self, key):
+        if key in OBJECT_ANSWERS:
+            del self.objects[key]
+        else:
+            self.codes[_POSITION[key]] = MISSING
+
+    def __iter__(self):
+        yield from (key for key, code in zip(ANSWER_CODES, self.codes) if code != MISSING)
+        yield from self.objects
+
+    def __len__(self):
+        return int((self.codes != MISSING).sum()) + len(self.objects)
+
+    def __repr__(self):
+        return f"CompactAnswers({dict(self)!r})"
+
+    def __getstate__(self):
+        return self.codes, self.objects, self.evicted
+
+    def __setstate__(self, state):
+        self.codes, self.objects, self.evicted = state
+
+    def clear(self):
+        self.codes = np.full(len(ANSWER_CODES), MISSING, dtype=np.int16)
+        self.objects = {}
+
+    def evict(self):
+        """Drop the answers (idle session); the app starts the session over."""
+        self.clear()
+        self.evicted = True
+
+
+def deep_sizeof(obj, _seen=None):
+    """Approximate bytes held by obj and everything it references (shared objects counted once)."""
+    if _seen is None:
+        _seen = set()
+    if id(obj) in _seen:
+        return 0
+    _seen.add(id(obj))
+    # An ndarray that owns its data reports it in getsizeof
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_sizeof(k, _seen) + deep_sizeof(v, _seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(deep_sizeof(v, _seen) for v in obj)
+    elif isinstance(obj, CompactAnswers):
+        size += deep_sizeof(obj.codes, _seen) + deep_sizeof(obj.objects, _seen)
+    return size
+
+
+class SessionRegistry:
+    """Last activity and state size of every session seen by this process."""
+
+    def __init__(self, idle_ttl_seconds=DEFAULT_IDLE_TTL_SECONDS, clock=time.monotonic):
+        self.idle_ttl_seconds = idle_ttl_seconds
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._sessions = {}  # session id -> {"answers": weakref, "last_seen", "step", "bytes"}
+        self._last_sweep = clock()
+        self.evictions = 0
+
+    def track(self, session_id, answers, step, nbytes):
+        """Record a rerun of session_id; evict idle sessions from time to time."""
+        now = self.clock()
+        with self._lock:
+            self._sessions[session_id] = {"answers": weakref.ref(answers), "last_seen": now,
+                                          "step": step, "bytes": nbytes}
+            if now - self._last_sweep >= SWEEP_INTERVAL_SECONDS:
+                self._sweep(now)
+
+    def _sweep(self, now):
+        self._last_sweep = now
+        for session_id, entry in list(self._sessions.items()):
+            answers = entry["answers"]()
+            if answers is None:
+                # The session is gone (Streamlit dropped it)
+                del self._sessions[session_id]
+            elif self.idle_ttl_seconds and now - entry["last_seen"] > self.idle_ttl_seconds:
+                answers.evict()
+                self.evictions += 1
+                del self._sessions[session_id]
+
+    def sweep(self):
+        with self._lock:
+            self._sweep(self.clock())
+
+    def sessions(self):
+        """One row per live session: id prefix, step, idle seconds, state size."""
+        now = self.clock()
+        with self._lock:
+            return [{"session": session_id[:8], "étape": entry["step"],
+                     "inactive (s)": round(now - entry["last_seen"]), "octets": entry["bytes"]}
+                    for session_id, entry in self._sessions.items() if entry["answers"]() is not None]
+
+    def stats(self):
+        sizes = np.array([row["octets"] for row in self.sessions()], dtype=np.float64)
+        return {
+            "sessions": len(sizes),
+            "idle_ttl_seconds": self.idle_ttl_seconds,
+            "evictions": self.evictions,
+            "total_kb": round(float(sizes.sum()) / 1024, 1),
+            "mean_bytes": round(float(sizes.mean()), 0) if len(sizes) else 0,
+            "p95_bytes": round(float(np.percentile(sizes, 95)), 0) if len(sizes) else 0,
+        }
+
+
+def _env_int(name, default):
+    value = os.environ.get(name)
+    return default if value in (None, "") else int(value)
+
+
+# Shared instance used by the app (one per Python process)
+session_registry = SessionRegistry(idle_ttl_seconds=_env_int("FIGHTCANCER_SESSION_IDLE_TTL", DEFAULT_IDLE_TTL_SECONDS))
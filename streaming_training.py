@@ -0,0 +1,258 @@
+# Out-of-core training mode of model_resample.py (--streaming)
+#
+# For HINTS pools larger than RAM (several cycles / years). The extract is read
+# once, chunk by chunk (CSV: pd.read_csv(chunksize=...), Parquet: record
+# batches), and only the training columns are parsed. During that pass:
+#   - a reservoir per class keeps a uniform random sample of n_per_class rows
+#     (replaces cancer_oui.sample(n=1073) / cancer_non.sample(n=1073), which
+#     need the whole DataFrame in memory);
+#   - the StandardScaler is fitted incrementally (partial_fit) on every row of
+#     the extract, not only on the sample;
+#   - the categories of the ordinal variables and of Birthcountry are
+#     collected, and the encoders are built with these explicit categories.
+# Memory is bounded by one chunk plus the two reservoirs, whatever the size of
+# the extract. The forest is then fitted on the balanced sample (2 x
+# n_per_class rows, as in the in-memory mode) and the peak RSS of the process
+# is printed and saved in the training report.
+#
+# As in the in-memory mode, rows with missing answers are dropped after the
+# sampling, so the sample can hold slightly fewer than 2 x n_per_class rows,
+# and the calibration (--calibration) is moved to the EverHadCancer rate of the
+# whole extract, counted during the same pass.
+#
+# Usage: python model_resample.py --streaming --data data/df2.parquet [--chunk-size 100000] [--no-search]
+
+import resource
+
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import train_test_split
+from sklearn.preprocessing import StandardScaler
+
+from codebook import report_plan_mismatches
+from model_registry import file_sha256
+from model_resample import (
+    DEFAULT_PARAMS, RANDOM_STATE, StageTimer, birthsex_var, binary_vars, build_pipeline, calibrate, continuous_vars,
+    evaluate, feature_importances, features_raw, final_feature_names, n_jobs_params, ordinal_categorical_vars,
+    save_artifacts, save_report, search_hyperparameters, string_categorical_vars, target,
+)
+from preprocess_plan import PreprocessPlan
+
+NUMERIC_COLUMNS = ordinal_categorical_vars + birthsex_var + continuous_vars + binary_vars
+
+
+# --- Chunked reading ---
+def iter_chunks(data_path, chunk_size=100_000):
+    """DataFrames of at most chunk_size rows with the training columns only."""
+    columns = features_raw + [target]
+    if data_path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(data_path).iter_batches(batch_size=chunk_size, columns=columns):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(data_path, usecols=columns, chunksize=chunk_size)
+
+
+def chunk_arrays(chunk):
+    """Column arrays of a chunk: float64 (NaN for missing) and object for Birthcountry."""
+    arrays = {c: chunk[c].to_numpy(dtype=np.float64, na_value=np.nan) for c in NUMERIC_COLUMNS + [target]}
+    for c in string_categorical_vars:
+        values = chunk[c].astype(object)
+        arrays[c] = values.where(values.notna(), None).to_numpy()
+    return arrays
+
+
+# --- Reservoir sampling ---
+class Reservoir:
+    """Uniform sample of `size` rows from a stream (Algorithm R, one chunk at a time)."""
+
+    def __init__(self, size, rng):
+        self.size = size
+        self.rng = rng
+        self.seen = 0
+        self.columns = {}
+
+    def add(self, arrays):
+        n = len(next(iter(arrays.values())))
+        if n == 0:
+            return
+        if not self.columns:
+            self.columns = {c: np.empty(self.size, dtype=a.dtype) for c, a in arrays.items()}
+        # Stream position of each row; row i is kept with probability size / (position + 1)
+        positions = self.seen + np.arange(n)
+        slots = np.where(positions < self.size, positions, self.rng.integers(0, positions + 1))
+        kept = np.flatnonzero(slots < self.size)
+        # Several rows of the chunk may replace the same slot: the last one wins, as row by row
+        last = len(kept) - 1 - np.unique(slots[kept][::-1], return_index=True)[1]
+        kept = kept[last]
+        for c, a in arrays.items():
+            self.columns[c][slots[kept]] = a[kept]
+        self.seen += n
+
+    def to_frame(self):
+        if self.seen < self.size:
+            raise ValueError(f"Seulement {self.seen} lignes pour cette classe, {self.size} demandées (--n-per-class)")
+        return pd.DataFrame(self.columns)
+
+    def nbytes(self):
+        return sum(a.nbytes for a in self.columns.values())
+
+
+# --- Single pass over the extract ---
+class StreamStats:
+    """What the training needs from the whole extract, gathered chunk by chunk."""
+
+    def __init__(self, n_per_class, random_state=RANDOM_STATE):
+        rng = np.random.default_rng(random_state)
+        self.reservoirs = {1: Reservoir(n_per_class, rng), 0: Reservoir(n_per_class, rng)}
+        self.scaler = StandardScaler()
+        self.categories = {c: set() for c in ordinal_categorical_vars + string_categorical_vars}
+        self.rows = 0
+        self.chunks = 0
+
+    def update(self, chunk):
+        arrays = chunk_arrays(chunk)
+        y = arrays[target]
+        for label, reservoir in self.reservoirs.items():
+            mask = y == label
+            reservoir.add({c: a[mask] for c, a in arrays.items()})
+
+        # NaN are ignored by partial_fit, as by fit
+        self.scaler.partial_fit(pd.DataFrame({c: arrays[c] for c in continuous_vars}))
+        for c in ordinal_categorical_vars:
+            values = arrays[c]
+            self.categories[c].update(np.unique(values[~np.isnan(values)]).tolist())
+        for c in string_categorical_vars:
+            self.categories[c].update(v for v in pd.unique(arrays[c]) if v is not None)
+        self.rows += len(y)
+        self.chunks += 1
+
+    def balanced_sample(self, random_state=RANDOM_STATE):
+        """Both reservoirs, shuffled, without the rows with missing answers."""
+        df = pd.concat([self.reservoirs[1].to_frame(), self.reservoirs[0].to_frame()], ignore_index=True)
+        order = np.random.default_rng(random_state).permutation(len(df))
+        return df.iloc[order].reset_index(drop=True)[features_raw + [target]].dropna()
+
+    def class_counts(self):
+        return {label: reservoir.seen for label, reservoir in self.reservoirs.items()}
+
+    def population_rate(self):
+        """Share of EverHadCancer in the whole extract, as model_resample.population_rate."""
+        counts = self.class_counts()
+        return counts[1] / (counts[0] + counts[1])
+
+
+def encoder_categories(stats):
+    """Explicit (sorted) categories, as the encoders would infer them on the whole extract."""
+    return (
+        [sorted(stats.categories[c]) for c in ordinal_categorical_vars],
+        [sorted(stats.categories[c]) for c in string_categorical_vars],
+    )
+
+
+def fit_on_sample(pipeline, stats, X_train, y_train):
+    """Fit the pipeline steps on the sample, with the scaler fitted on the whole stream."""
+    preprocess = pipeline.named_steps['preprocess']
+    preprocess.fit(X_train, y_train)
+    # ColumnTransformer has no "prefit" option: swap the fitted sample scaler
+    # for the one fitted on every row of the extract
+    preprocess.transformers_ = [
+        (name, stats.scaler if name == 'scale' else transformer, columns)
+        for name, transformer, columns in preprocess.transformers_
+    ]
+    X_resampled, y_resampled = pipeline.named_steps['smote'].fit_resample(preprocess.transform(X_train), y_train)
+    pipeline.named_steps['model'].fit(X_resampled, y_resampled)
+    return pipeline
+
+
+def peak_rss_mb():
+    """Peak resident memory of this process (VmHWM, ru_maxrss outside Linux)."""
+    try:
+        with open("/proc/self/status") as f:
+            return int(next(line for line in f if line.startswith("VmHWM")).split()[1]) / 1024
+    except (OSError, StopIteration):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def train_streaming(args):
+    """model_resample.py --streaming: same stages and artifacts as the in-memory mode."""
+    timer = StageTimer()
+
+    with timer("lecture par blocs"):
+        try:
+            data_sha256 = file_sha256(args.data)
+        except FileNotFoundError:
+            print(f"Erreur: Le fichier '{args.data}' n'a pas été trouvé. Veuillez vous assurer qu'il est dans le même répertoire.")
+            return 1
+        stats = StreamStats(args.n_per_class)
+        for chunk in iter_chunks(args.data, args.chunk_size):
+            stats.update(chunk)
+        df_clean = stats.balanced_sample()
+    reservoir_mb = sum(r.nbytes() for r in stats.reservoirs.values()) / 1e6
+    print(f"{stats.rows:,} lignes lues en {stats.chunks} blocs de {args.chunk_size:,}; réservoirs: {reservoir_mb:.1f} MB")
+    print(df_clean['EverHadCancer'].value_counts())
+
+    X = df_clean[features_raw]
+    y = df_clean[target].astype(int)
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=RANDOM_STATE)
+
+    ordinal_categories, country_categories = encoder_categories(stats)
+    pipeline = build_pipeline(smote=args.smote).set_params(preprocess__ord__categories=ordinal_categories,
+                                           preprocess__ohe__categories=country_categories)
+
+    cv_results = None
+    if args.no_search:
+        best_params = dict(DEFAULT_PARAMS)
+    else:
+        # The sample fits in memory: same search as the in-memory mode (the
+        # scaler is refitted on each fold there, only the final model uses the stream scaler)
+        with timer("recherche d'hyperparamètres"):
+            best_params, cv_results = search_hyperparameters(
+                pipeline.set_params(**n_jobs_params(pipeline, 1)), X_train, y_train, args.n_jobs, args.cv, args.scoring)
+        print(f"Meilleurs hyperparamètres ({args.scoring}): {best_params}")
+
+    with timer("entraînement final"):
+        pipeline.set_params(**best_params, **n_jobs_params(pipeline, args.n_jobs))
+        fit_on_sample(pipeline, stats, X_train, y_train)
+        pipeline.set_params(**n_jobs_params(pipeline, None))
+    # Codes of the app's answers that the fitted encoders never saw (see codebook.py)
+    report_plan_mismatches(PreprocessPlan.from_pipeline(pipeline))
+
+    with timer("évaluation"):
+        accuracy = evaluate(pipeline, X_test, y_test)
+
+    calibration, calibration_report = None, None
+    if args.calibration != "none":
+        with timer("calibration"):
+            calibration, calibration_report = calibrate(pipeline, X_test, y_test, stats.population_rate(),
+                                                        args.calibration, plot=not args.no_plot)
+
+    final_feature_names_for_model_input = final_feature_names(pipeline)
+    importance_df = feature_importances(pipeline, final_feature_names_for_model_input, plot=not args.no_plot)
+
+    with timer("export"):
+        save_artifacts(pipeline, final_feature_names_for_model_input, importance_df, args.data, calibration)
+
+    peak_mb = peak_rss_mb()
+    print(f"Pic de mémoire (RSS): {peak_mb:.0f} MB")
+    report = {
+        "mode": "streaming",
+        "data": args.data,
+        "data_sha256": data_sha256,
+        "rows_read": stats.rows,
+        "chunk_size": args.chunk_size,
+        "chunks": stats.chunks,
+        "class_counts": stats.class_counts(),
+        "rows": len(df_clean),
+        "reservoir_mb": round(reservoir_mb, 3),
+        "peak_rss_mb": round(peak_mb, 1),
+        "n_jobs": args.n_jobs,
+        "smote": args.smote,
+        "best_params": best_params,
+        "scoring": args.scoring,
+        "test_accuracy": accuracy,
+        "calibration": calibration_report,
+        "stage_seconds": {name: round(seconds, 3) for name, seconds in timer.seconds.items()},
+    }
+    save_report(report, cv_results, args.scoring)
+    return 0
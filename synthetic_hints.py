@@ -0,0 +1,261 @@
+# Synthetic HINTS-shaped extract: the 26 raw features and EverHadCancer
+#
+# data/df2.csv is not distributed; this generator produces any number of rows
+# with the same columns and codes, to reproduce training (model_resample.py),
+# batch scoring (batch_score.py) and load tests without the survey data.
+#   - categorical answers use the codes of the app's answer lists
+#     (label_maps.py), Birthcountry the values sent by the app plus the ones
+#     of the training extract; numeric answers stay within the bounds of the
+#     app's number inputs (label_maps.NUMERIC_RANGES: age 18-120, ...);
+#   - marginals are close to the 2,146-row training sample (age ~57 +/- 17,
+#     BMI ~28, overdispersed alcohol and sunburn counts, ...);
+#   - correlations come from three latent factors (age, socio-economic
+#     status, health) shared by the answers (Gaussian copula); `correlation`
+#     scales them from 0 (independent answers) to 1;
+#   - EverHadCancer is drawn from a logistic model (age, family history,
+#     general health, smoking, chronic conditions) whose intercept is solved
+#     for the requested positive_rate (class imbalance);
+#   - missing_rate blanks that share of the feature cells, like the
+#     unanswered questions dropped by training.
+# Every column is drawn with one vectorized call per chunk of chunk_rows rows
+# and written with pyarrow (CSV or Parquet, from the file extension), so memory
+# is bounded by one chunk whatever the number of rows.
+#
+# Usage: python synthetic_hints.py data/df2.csv [--rows 100000] [--positive-rate 0.15] [--correlation 0.5]
+#        python synthetic_hints.py big_extract.parquet --rows 20000000 --missing-rate 0.02
+
+import argparse
+import functools
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pyarrow as pa
+from scipy import stats
+from scipy.special import expit, ndtri
+
+from label_maps import (
+    BirthSex_map, NUMERIC_RANGES, diff_map, ethnie_map, etude_map, fruits_map, fumeur_num,
+    raw_features_for_pipeline_input, revenu_map, sante_general_map, stress_map,
+)
+
+TARGET = "EverHadCancer"
+COLUMNS = raw_features_for_pipeline_input + [TARGET]
+
+# Birthcountry values: the app's (label_maps.ethnie_map) and the training extract's
+COUNTRIES = list(dict.fromkeys(list(ethnie_map.values()) + ["Mexican", "OthHisp", "PuertoRican"]))
+COUNTRY_WEIGHTS = {"White": 0.62, "Black": 0.13, "Mexican": 0.07, "OthHisp": 0.04, "PuertoRican": 0.02,
+                   "AmerInd": 0.01, "AsInd": 0.02, "Chinese": 0.02, "Filipino": 0.02, "Japanese": 0.005,
+                   "Korean": 0.005, "Vietnamese": 0.01, "OthAsian": 0.01, "OthPacIsl": 0.005, "Other": 0.015}
+
+
+def _codes(mapping):
+    return np.array(sorted(set(mapping.values())))
+
+
+# Discrete answers: codes, marginal probabilities, loadings on the (age, ses, health) factors
+DISCRETE = {
+    "SmokeNow": (_codes(fumeur_num), [0.83, 0.05, 0.12], (-0.1, -0.4, -0.3)),
+    "GeneralHealth": (_codes(sante_general_map), [0.05, 0.2, 0.4, 0.27, 0.08], (-0.2, 0.3, 0.8)),
+    "Nervous": (_codes(stress_map), [0.45, 0.35, 0.12, 0.08], (-0.3, -0.2, -0.5)),
+    "IncomeRanges": (_codes(revenu_map), [0.08, 0.07, 0.08, 0.13, 0.13, 0.17, 0.13, 0.15, 0.06], (0.0, 0.9, 0.2)),
+    "Education": (_codes(etude_map), [0.03, 0.07, 0.2, 0.3, 0.22, 0.14, 0.04], (-0.1, 0.8, 0.1)),
+    "Fruit2": (_codes(fruits_map), [0.1, 0.2, 0.25, 0.25, 0.12, 0.05, 0.03], (0.1, 0.3, 0.3)),
+    "Vegetables2": (_codes(fruits_map), [0.05, 0.15, 0.25, 0.3, 0.15, 0.06, 0.04], (0.1, 0.3, 0.3)),
+    "CutSkipMeals2": (_codes(diff_map), [0.85, 0.1, 0.05], (-0.2, -0.7, -0.2)),
+    "DiffPayMedBills": (_codes(diff_map), [0.75, 0.17, 0.08], (-0.1, -0.6, -0.3)),
+    "BirthSex": (_codes(BirthSex_map), [0.01, 0.58, 0.41], (0.0, 0.0, 0.0)),
+    "SleepWeekdayHr": (np.arange(3, 13), [0.01, 0.03, 0.1, 0.25, 0.3, 0.2, 0.06, 0.03, 0.01, 0.01], (0.1, 0.1, 0.3)),
+    "TimesStrengthTraining": (np.arange(8), [0.5, 0.1, 0.12, 0.11, 0.06, 0.06, 0.02, 0.03], (-0.3, 0.2, 0.5)),
+    "ChildrenInHH": (np.arange(6), [0.76, 0.12, 0.08, 0.03, 0.007, 0.003], (-0.7, 0.0, 0.0)),
+    "TotalHousehold": (np.arange(1, 9), [0.27, 0.4, 0.13, 0.11, 0.05, 0.02, 0.01, 0.01], (-0.5, 0.1, 0.0)),
+}
+
+# Count answers: negative binomial (mean, standard deviation), loadings
+COUNTS = {
+    "TimesSunburned": (1.06, 3.96, (-0.5, 0.2, 0.0)),
+    "Drink_nb_PerMonth": (24.6, 43.3, (-0.2, 0.3, 0.1)),
+}
+
+# Yes/no answers: share of "Oui", loadings
+FLAGS = {
+    "MedConditions_Diabetes": (0.2, (0.4, -0.2, -0.5)),
+    "MedConditions_HighBP": (0.42, (0.6, -0.1, -0.4)),
+    "MedConditions_HeartCondition": (0.1, (0.5, -0.1, -0.5)),
+    "MedConditions_LungDisease": (0.13, (0.2, -0.2, -0.5)),
+    "MedConditions_Depression": (0.22, (-0.2, -0.3, -0.6)),
+    "FamilyEverHadCancer2": (0.7, (0.1, 0.1, 0.0)),
+    "HealthLimits_Pain": (0.35, (0.3, -0.3, -0.6)),
+}
+
+# BMI: log-normal around 27.4, loadings
+BMI_LOADINGS = (0.1, -0.2, -0.4)
+
+# Log-odds of EverHadCancer per standardized answer (intercept solved for positive_rate)
+TARGET_WEIGHTS = {"Age": 1.1, "FamilyEverHadCancer2": 0.45, "GeneralHealth": -0.25, "SmokeNow": 0.15,
+                  "MedConditions_HighBP": 0.15, "MedConditions_LungDisease": 0.15, "BMI": 0.05,
+                  "TimesSunburned": 0.1}
+
+
+# Standard normal quantiles of 65,536 equiprobable bins: indexing it with random
+# uint16 draws gives normal variates ~3x faster than rng.standard_normal
+_NORMAL_TABLE = ndtri((np.arange(65536) + 0.5) / 65536).astype(np.float32)
+
+
+def _normals(rng, shape):
+    return _NORMAL_TABLE[rng.integers(0, 65536, size=shape, dtype=np.uint16)]
+
+
+def _bucket(latent, thresholds):
+    """Index of the interval of each latent score (thresholds on the standard normal scale)."""
+    if len(thresholds) > 16:
+        return np.searchsorted(thresholds, latent)
+    # A few comparisons are faster than a binary search per row
+    index = np.zeros(len(latent), dtype=np.int16)
+    for threshold in thresholds:
+        index += latent > threshold
+    return index
+
+
+@functools.lru_cache(maxsize=None)
+def _thresholds(probs):
+    """Standard normal quantiles splitting it into the given probabilities."""
+    return ndtri(np.cumsum(probs)[:-1] / sum(probs)).astype(np.float32)
+
+
+@functools.lru_cache(maxsize=None)
+def _count_thresholds(mean, sd, high):
+    # scipy's nbinom(r, p): mean r(1-p)/p, variance r(1-p)/p^2
+    p = mean / sd ** 2
+    r = mean * p / (1 - p)
+    return ndtri(stats.nbinom(r, p).cdf(np.arange(high))).astype(np.float32)
+
+
+def _draw(n, rng, correlation):
+    """Feature columns (int8 codes, int16 age and counts, float64 BMI, Birthcountry as indices into COUNTRIES).
+
+    Each answer is a threshold of a latent normal score, so the marginals are
+    exact whatever the correlation (Gaussian copula); no per-row Python code.
+    """
+    latent_columns = list(DISCRETE) + list(COUNTS) + list(FLAGS) + ["BMI"]
+    loadings = [spec[-1] for spec in DISCRETE.values()] + [spec[-1] for spec in COUNTS.values()]
+    loadings += [spec[-1] for spec in FLAGS.values()] + [BMI_LOADINGS]
+    # Unit-variance scores: correlation * (loadings . factors) + independent noise, one row per answer
+    w = (correlation * np.asarray(loadings)).astype(np.float32)
+    noise_scale = np.sqrt(np.maximum(1.0 - (w ** 2).sum(axis=1), 0.0)).astype(np.float32)
+    z = _normals(rng, (3, n))
+    latent = w @ z
+    latent += noise_scale[:, np.newaxis] * _normals(rng, (len(latent_columns), n))
+    latent = dict(zip(latent_columns, latent))
+
+    out = {}
+    for col, (codes, probs, _) in DISCRETE.items():
+        out[col] = codes.astype(np.int8)[_bucket(latent[col], _thresholds(tuple(probs)))]
+    for col, (mean, sd, _) in COUNTS.items():
+        out[col] = _bucket(latent[col], _count_thresholds(mean, sd, int(NUMERIC_RANGES[col][1]))).astype(np.int16)
+    for col, (share, _) in FLAGS.items():
+        out[col] = (latent[col] > ndtri(1 - share)).astype(np.int8)
+
+    age_low, age_high = NUMERIC_RANGES["Age"]
+    out["Age"] = np.clip(np.rint(57.5 + 17.0 * z[0]), age_low, age_high).astype(np.int16)
+    bmi = np.exp(np.log(27.4) + 0.21 * latent["BMI"].astype(np.float64))
+    out["BMI"] = np.round(np.clip(bmi, 12.0, 80.0), 2)
+    weights = np.array([COUNTRY_WEIGHTS[c] for c in COUNTRIES])
+    out["Birthcountry"] = _bucket(rng.random(n, dtype=np.float32), np.cumsum(weights / weights.sum())[:-1]).astype(np.int8)
+    return out
+
+
+@functools.lru_cache(maxsize=None)
+def _calibration(positive_rate, correlation, pilot_rows=200_000):
+    """Standardization of the TARGET_WEIGHTS answers and intercept giving positive_rate, on a pilot sample."""
+    pilot = _draw(pilot_rows, np.random.default_rng(0), correlation)
+    scaling = {col: (pilot[col].mean(), pilot[col].std()) for col in TARGET_WEIGHTS}
+    linear = _linear_predictor(pilot, scaling)
+    low, high = -20.0, 20.0
+    for _ in range(60):  # bisection
+        middle = (low + high) / 2
+        low, high = (middle, high) if expit(middle + linear).mean() < positive_rate else (low, middle)
+    return scaling, (low + high) / 2
+
+
+def _linear_predictor(features, scaling):
+    return sum(weight * (features[col] - scaling[col][0]) / scaling[col][1] for col, weight in TARGET_WEIGHTS.items())
+
+
+def generate(n, seed=0, positive_rate=0.15, correlation=0.5, missing_rate=0.0, extra_columns=0):
+    """n rows as a pyarrow Table: COLUMNS (+ Q00.. unused survey columns)."""
+    if not 0.0 < positive_rate < 1.0:
+        raise ValueError(f"positive_rate doit être entre 0 et 1 (reçu {positive_rate})")
+    rng = np.random.default_rng(seed)
+    features = _draw(n, rng, correlation)
+    scaling, intercept = _calibration(positive_rate, correlation)
+    y = rng.random(n) < expit(intercept + _linear_predictor(features, scaling))
+
+    columns = {}
+    for col in raw_features_for_pipeline_input:
+        mask = rng.random(n) < missing_rate if missing_rate else None
+        if col == "Birthcountry":
+            indices = pa.array(features[col], mask=mask)
+            columns[col] = pa.DictionaryArray.from_arrays(indices, pa.array(COUNTRIES))
+        else:
+            columns[col] = pa.array(features[col], mask=mask)
+    columns[TARGET] = pa.array(y.astype(np.int8))
+    for i in range(extra_columns):
+        columns[f"Q{i:02d}"] = pa.array(rng.integers(1, 6, n, dtype=np.int8))
+    return pa.table(columns)
+
+
+def generate_frame(n, seed=0, **kwargs):
+    """generate() as a pandas DataFrame (Birthcountry as strings, missing answers as NaN)."""
+    df = generate(n, seed, **kwargs).to_pandas()
+    df["Birthcountry"] = df["Birthcountry"].astype(object)
+    return df
+
+
+def write(path, rows, seed=0, chunk_rows=1_000_000, **kwargs):
+    """Write `rows` rows to a .csv or .parquet file, one chunk at a time.
+
+    Chunk k+1 is generated while a writer thread encodes chunk k (pyarrow
+    and NumPy release the GIL), so at most two chunks are in memory.
+    """
+    import pyarrow.csv as pa_csv
+    import pyarrow.parquet as pq
+
+    writer = None
+    pending = None
+    try:
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            for chunk, start in enumerate(range(0, rows, chunk_rows)):
+                # Chunk seeds derived from `seed`: the output only depends on (seed, chunk_rows)
+                table = generate(min(chunk_rows, rows - start), seed=[seed, chunk], **kwargs)
+                if writer is None:
+                    writer = (pq.ParquetWriter(path, table.schema) if path.endswith(".parquet")
+                              else pa_csv.CSVWriter(path, table.schema))
+                if pending is not None:
+                    pending.result()
+                pending = pool.submit(writer.write_table, table)
+            if pending is not None:
+                pending.result()
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write a synthetic HINTS-shaped extract (CSV or Parquet).")
+    parser.add_argument("path", help="output file, .csv or .parquet")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--positive-rate", type=float, default=0.15, help="share of EverHadCancer = 1")
+    parser.add_argument("--correlation", type=float, default=0.5, help="strength of the shared factors, 0 to 1")
+    parser.add_argument("--missing-rate", type=float, default=0.0, help="share of blank feature cells")
+    parser.add_argument("--extra-columns", type=int, default=0, help="unused survey columns Q00, Q01, ...")
+    parser.add_argument("--chunk-rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    write(args.path, args.rows, seed=args.seed, chunk_rows=args.chunk_rows, positive_rate=args.positive_rate,
+          correlation=args.correlation, missing_rate=args.missing_rate, extra_columns=args.extra_columns)
+    seconds = time.perf_counter() - start
+    print(f"✅ {args.rows:,} lignes écrites en {seconds:.1f} s ({args.rows / seconds:,.0f} lignes/s) -> {args.path}")
@@ -0,0 +1,73 @@
+# Compiled forest (forest_engine.py) against the pickled sklearn pipeline
+#
+# The app and batch scoring serve CompiledForest.predict_positive in place of
+# pipeline.predict_proba: both must give bit-identical probabilities, on
+# questionnaires encoded as the app encodes them and on rows sitting on both
+# sides of the split thresholds, in float32 as sklearn compares them.
+#
+# Usage: python -m pytest tests
+
+import os
+import warnings
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+
+from codebook import CATEGORICAL, answers_frame_to_features
+from forest_engine import CompactForest, CompiledForest
+from label_maps import ANSWER_FIELDS
+from model_registry import MODEL_PATH
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+NUMERIC_RANGES = {"Age": (18, 90), "sommeil_moy": (3, 12), "sport": (0, 7), "alcohol": (0, 60),
+                  "enfants": (0, 5), "foyer": (1, 8), "soleil": (0, 10)}
+
+
+@pytest.fixture(scope="module")
+def pipeline():
+    return joblib.load(os.path.join(ROOT, MODEL_PATH))
+
+
+def random_answers(n, seed=0):
+    """n complete questionnaires, with the answer labels of the form."""
+    rng = np.random.default_rng(seed)
+    data = {key: rng.choice(np.array(labels, dtype=object), n) for key, labels in CATEGORICAL.values()}
+    for feature, (key, mapping) in ANSWER_FIELDS.items():
+        if mapping is None:
+            low, high = NUMERIC_RANGES[key]
+            data[key] = rng.integers(low, high + 1, n)
+    data["poids"] = np.round(rng.normal(75, 12, n).clip(35, 180), 1)
+    data["taille_m"] = np.round(rng.normal(1.70, 0.09, n).clip(1.2, 2.2), 2)
+    return pd.DataFrame(data)
+
+
+def test_same_probabilities_as_pipeline(pipeline):
+    features = answers_frame_to_features(random_answers(5000))
+    with warnings.catch_warnings():
+        # Birth countries the app sends but training never saw (Japanese, Other)
+        warnings.filterwarnings("ignore", message="Found unknown categories")
+        expected = pipeline.predict_proba(features)[:, 1]
+        X = pipeline.named_steps["preprocess"].transform(features)
+    forest = CompiledForest.from_pipeline(pipeline)
+    np.testing.assert_array_equal(forest.predict_positive(X), expected)
+    np.testing.assert_array_equal(CompactForest.from_compiled(forest).predict_positive(X), expected)
+
+
+def test_same_probabilities_on_thresholds(pipeline):
+    model = pipeline.named_steps["model"]
+    forest = CompiledForest.from_pipeline(pipeline)
+    rng = np.random.default_rng(1)
+    split = np.isfinite(forest.threshold)
+    X = np.zeros((2000, forest.n_features))
+    for j in range(forest.n_features):
+        thresholds = forest.threshold[split & (forest.feature == j)]
+        if len(thresholds):
+            # A threshold rounded to float32 (the dtype sklearn compares in), or the next float32 above it
+            values = rng.choice(thresholds, len(X)).astype(np.float32)
+            X[:, j] = np.where(rng.random(len(X)) < 0.5, values, np.nextafter(values, np.float32(np.inf)))
+    with warnings.catch_warnings():
+        warnings.filterwarnings("ignore", message="X does not have valid feature names")
+        expected = model.predict_proba(X)[:, 1]
+    np.testing.assert_array_equal(forest.predict_positive(X), expected)
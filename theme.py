@@ -0,0 +1,100 @@
+# Compiled stylesheet of the Streamlit cancer risk application
+#
+# theme.css is the readable source. It is compiled once per process: the
+# custom properties of its :root block are substituted into the rules (and
+# the block dropped), comments and whitespace are removed. The result
+# (~3 KB) is sent once per browser session by a zero-height component
+# whose script appends it to the page <head>; later reruns send nothing,
+# the <style> element outlives the component. Before, a ~6.5 KB inline
+# block went out as an st.markdown element on every rerun.
+#
+# A .css file cannot be served by Streamlit's static file server instead:
+# anything but images, fonts, PDF, XML and JSON is sent as text/plain with
+# nosniff, which browsers refuse as a stylesheet.
+#
+# FIGHTCANCER_THEME_DELIVERY=inline sends the compiled stylesheet on every
+# rerun instead (st.html, outside the page layout), for hosts where the
+# component iframe cannot reach the page.
+#
+# Usage: apply_theme() at the top of the app; python theme.py prints the sizes
+
+import functools
+import gzip
+import hashlib
+import json
+import os
+import re
+
+THEME_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "theme.css")
+THEME_DELIVERY_ENV = "FIGHTCANCER_THEME_DELIVERY"
+SESSION_KEY = "_theme_version"
+ELEMENT_PREFIX = "fightcancer-theme-"
+
+_COMMENT = re.compile(r"/\*.*?\*/", re.S)
+_ROOT_BLOCK = re.compile(r":root\s*\{(.*?)\}", re.S)
+_CUSTOM_PROPERTY = re.compile(r"(--[\w-]+)\s*:\s*([^;]+);")
+_VAR = re.compile(r"var\((--[\w-]+)\)")
+
+
+def compile_css(source):
+    """Minified stylesheet with the :root custom properties resolved."""
+    css = _COMMENT.sub("", source)
+    root = _ROOT_BLOCK.search(css)
+    if root:
+        variables = {name: value.strip() for name, value in _CUSTOM_PROPERTY.findall(root.group(1))}
+        css = css[:root.start()] + css[root.end():]
+        # Unknown properties (set by Streamlit itself) are left as var()
+        css = _VAR.sub(lambda m: variables.get(m.group(1), m.group(0)), css)
+    css = re.sub(r"\s+", " ", css)
+    css = re.sub(r"\s*([{};,>])\s*", r"\1", css)
+    # Only declarations have a space after a colon (":hover p" keeps its combinator)
+    css = re.sub(r":\s+", ":", css)
+    css = re.sub(r"\s*!important", "!important", css)
+    css = re.sub(r";+", ";", css).replace(";}", "}")
+    return css.strip()
+
+
+@functools.lru_cache(maxsize=None)
+def compiled_theme(path=THEME_PATH):
+    """(minified css, version) of the stylesheet, compiled once per process."""
+    with open(path, encoding="utf-8") as f:
+        css = compile_css(f.read())
+    return css, hashlib.sha256(css.encode()).hexdigest()[:12]
+
+
+def injection_html(css, version):
+    """Component body appending the stylesheet to the page once (and dropping older versions)."""
+    element_id = ELEMENT_PREFIX + version
+    return f"""<script>
+const doc = window.parent.document;
+doc.querySelectorAll('style[id^="{ELEMENT_PREFIX}"]').forEach(s => {{ if (s.id !== "{element_id}") s.remove(); }});
+if (!doc.getElementById("{element_id}")) {{
+  const style = doc.createElement("style");
+  style.id = "{element_id}";
+  style.textContent = {json.dumps(css)};
+  doc.head.appendChild(style);
+}}
+</script>"""
+
+
+def apply_theme():
+    """Send the stylesheet if this session has not received this version yet."""
+    import streamlit as st
+    import streamlit.components.v1 as components
+
+    css, version = compiled_theme()
+    if os.environ.get(THEME_DELIVERY_ENV, "component") == "inline":
+        st.html(f"<style>{css}</style>")
+        return
+    if st.session_state.get(SESSION_KEY) == version:
+        return
+    components.html(injection_html(css, version), height=0)
+    st.session_state[SESSION_KEY] = version
+
+
+if __name__ == "__main__":
+    with open(THEME_PATH, "rb") as f:
+        source = f.read()
+    css, version = compiled_theme()
+    print(f"theme.css : {len(source):,} octets (gzip {len(gzip.compress(source)):,})")
+    print(f"compilé   : {len(css.encode()):,} octets (gzip {len(gzip.compress(css.encode())):,}), version {version}")
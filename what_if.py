@@ -0,0 +1,45 @@
+# "What-if" simulator of the result page
+#
+# Scores variants of the user's answers (quitting smoking, another weight,
+# fewer drinks, ...) without going through the pipeline again: the encoded
+# row of the submitted answers is copied once per variant and only the
+# columns of the changed fields are rewritten, then all the variants go
+# through the forest in a single batch. Sweeping one field over its whole
+# range (e.g. the 171 weights of the form, with the other changes applied)
+# is one call, a few milliseconds (benchmarks/bench_what_if.py).
+#
+# Usage: WhatIf(scorer, row).sweep("BMI", bmi_grid, changes={"SmokeNow": 0})
+
+import numpy as np
+
+
+class WhatIf:
+    """Variants of one encoded row, scored in one batch."""
+
+    def __init__(self, scorer, row):
+        self.scorer = scorer
+        self.row = np.asarray(row, dtype=np.float64)
+
+    def variant(self, changes):
+        """Copy of the row with the raw fields in `changes` (feature -> value) re-encoded."""
+        row = self.row.copy()
+        for feature, value in changes.items():
+            idx, encoded = self.scorer.plan.encode_column(feature, [value])
+            row[idx] = encoded[0]
+        return row
+
+    def score(self, changes):
+        """Probability of the row with `changes` applied."""
+        return float(self.scorer.predict_encoded(self.variant(changes))[0])
+
+    def sweep(self, feature, values, changes=None):
+        """Probabilities of the row (with `changes`) for every value of `feature`, shape (len(values),)."""
+        idx, encoded = self.scorer.plan.encode_column(feature, values)
+        batch = np.repeat(self.variant(changes or {})[None, :], len(encoded), axis=0)
+        batch[:, idx] = encoded
+        return self.scorer.predict_encoded(batch)
+
+
+def changed_features(base, features):
+    """Raw fields whose value differs between two answers_to_features() dicts."""
+    return {feature: value for feature, value in features.items() if base.get(feature) != value}